@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟 Elasticsearch 服务
+按指定规模生成 _cat/indices、_cat/shards、_nodes/stats、_search 等接口的数据
+(或回放录制的响应文件)，支持注入延迟，并像 ES 一样处理 filter_path / h= 参数
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any
+from urllib.parse import urlparse, parse_qs
+
+SERVICES = [
+    "iroom-prd", "message-center-prd", "guardian-prd", "travel-ship-prd", "platform-coupon-api-prd",
+    "website-platform-api-common-prd", "product-room-api-prd", "platform-int-int", "order-center-prd",
+    "payment-gateway-prd", "member-center-prd", "search-api-prd",
+]
+
+DATE_IN_PATTERN = re.compile(r'^\*?([^*]*?)(\d{4}-\d{2}-\d{2})\*?$')
+
+# 录制的响应文件名 (位于 --payload-dir 下)，存在时直接回放
+RECORDED_PAYLOADS = {
+    "_cat/indices": "cat_indices.json",
+    "_cat/shards": "cat_shards.json",
+    "_nodes/stats": "nodes_stats.json",
+    "_search": "search.json",
+}
+
+
+def apply_filter_path(value: Any, patterns: List[List[str]]) -> Any:
+    """按 ES 的 filter_path 规则保留匹配的字段，* 匹配任意一级键名"""
+    if any(not pattern for pattern in patterns):
+        return value
+    if isinstance(value, list):
+        items = [apply_filter_path(item, patterns) for item in value]
+        return [item for item in items if item not in (None, {}, [])]
+    if not isinstance(value, dict):
+        return None
+
+    result = {}
+    for key, item in value.items():
+        sub = [pattern[1:] for pattern in patterns if fnmatch.fnmatchcase(key, pattern[0])]
+        if sub:
+            filtered = apply_filter_path(item, sub)
+            if filtered not in (None, {}, []):
+                result[key] = filtered
+    return result
+
+
+class StubCluster:
+    def __init__(self, indices: int = 1000, days: int = 30, nodes: int = 50, docs: int = 20,
+                 payload_dir: str = None, seed: int = 42):
+        self.random = random.Random(seed)
+        self.node_names = [f"es-node-{i:02d}" for i in range(nodes)]
+        self.docs = docs
+        self.started = time.time()
+        self.recorded = {}
+        if payload_dir:
+            for key, filename in RECORDED_PAYLOADS.items():
+                path = os.path.join(payload_dir, filename)
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        self.recorded[key] = json.load(f)
+
+        today = datetime.now()
+        dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+        per_day = max(1, indices // days)
+        self.indices: List[Dict[str, str]] = []
+        self.by_date: Dict[str, List[Dict[str, str]]] = {date: [] for date in dates}
+        for date in dates:
+            for i in range(per_day):
+                service = SERVICES[i % len(SERVICES)]
+                suffix = f"-{i // len(SERVICES)}" if i >= len(SERVICES) else ""
+                pri = self.random.choice((1, 1, 1, 2, 3))
+                size = int(self.random.lognormvariate(20, 2))
+                row = {
+                    "index": f"logstash-loghub-logs-{service}{suffix}-{date}",
+                    "status": "open",
+                    "health": "green",
+                    "pri": str(pri),
+                    "rep": "1",
+                    "docs.count": str(size // 500),
+                    "store.size": str(size),
+                    "pri.store.size": str(size // 2),
+                    "creation.date": str(int(datetime.strptime(date, "%Y-%m-%d").timestamp() * 1000)),
+                }
+                self.indices.append(row)
+                self.by_date[date].append(row)
+
+    def match_indices(self, pattern: str) -> List[Dict[str, str]]:
+        if not pattern:
+            return self.indices
+        rows = []
+        for part in pattern.split(","):
+            match = DATE_IN_PATTERN.match(part)
+            candidates = self.by_date.get(match.group(2), []) if match else self.indices
+            rows.extend(row for row in candidates if fnmatch.fnmatchcase(row["index"], part))
+        return rows
+
+    def cat_indices(self, pattern: str, params: Dict[str, str]) -> List[Dict[str, str]]:
+        rows = self.match_indices(pattern)
+        sort = params.get("s", "")
+        if sort.startswith("store.size"):
+            rows = sorted(rows, key=lambda r: int(r["store.size"]), reverse=sort.endswith(":desc"))
+        return rows
+
+    def cat_shards(self, pattern: str) -> List[Dict[str, str]]:
+        shards = []
+        for row in self.match_indices(pattern):
+            pri = int(row["pri"])
+            shard_size = int(row["store.size"]) // (pri * 2)
+            shard_docs = int(row["docs.count"]) // pri
+            for shard in range(pri):
+                for prirep in ("p", "r"):
+                    shards.append({
+                        "index": row["index"], "shard": str(shard), "prirep": prirep, "state": "STARTED",
+                        "docs": str(shard_docs), "store": str(shard_size),
+                        "node": self.node_names[hash((row["index"], shard, prirep)) % len(self.node_names)],
+                    })
+        return shards
+
+    def nodes_stats(self) -> Dict[str, Any]:
+        """生成接近真实大小的节点统计文档 (含大量未被工具使用的字段)"""
+        elapsed = time.time() - self.started
+        nodes = {}
+        for i, name in enumerate(self.node_names):
+            pools = {pool: {"threads": 8, "queue": 0, "active": self.random.randint(0, 2), "rejected": 0,
+                            "largest": 8, "completed": int(elapsed * 100)}
+                     for pool in ("analyze", "fetch_shard_started", "flush", "force_merge", "generic", "get",
+                                  "listener", "management", "refresh", "search", "search_throttled",
+                                  "snapshot", "warmer", "write")}
+            indices = {
+                section: {f"{section}_{metric}": int(elapsed * (i + 1) * 10) for metric in (
+                    "total", "time_in_millis", "current", "failed", "throttle_time_in_millis")}
+                for section in ("docs", "store", "get", "refresh", "flush", "warmer", "query_cache",
+                                "fielddata", "completion", "segments", "translog", "request_cache", "recovery")
+            }
+            indices.update({
+                "indexing": {"index_total": int(elapsed * 1000 * (i + 1)), "index_time_in_millis": 1},
+                "search": {"query_total": int(elapsed * 300 * (i + 1)), "query_time_in_millis": 1},
+                "merges": {"total_size_in_bytes": int(elapsed * 5_000_000), "total": int(elapsed)},
+            })
+            nodes[f"node-id-{i:04d}"] = {
+                "timestamp": int(time.time() * 1000),
+                "name": name,
+                "transport_address": f"10.0.{i // 250}.{i % 250}:9300",
+                "host": f"10.0.{i // 250}.{i % 250}",
+                "roles": ["data", "ingest", "master"],
+                "attributes": {"node-type": "hot" if i % 2 else "warm", "xpack.installed": "true"},
+                "indices": indices,
+                "os": {
+                    "timestamp": int(time.time() * 1000),
+                    "cpu": {"percent": self.random.randint(5, 90),
+                            "load_average": {"1m": round(self.random.uniform(0, 8), 2),
+                                             "5m": round(self.random.uniform(0, 8), 2),
+                                             "15m": round(self.random.uniform(0, 8), 2)}},
+                    "mem": {"total_in_bytes": 64 * 1024 ** 3, "free_in_bytes": self.random.randint(1, 32) * 1024 ** 3,
+                            "used_in_bytes": 32 * 1024 ** 3, "free_percent": 50, "used_percent": 50},
+                    "swap": {"total_in_bytes": 0, "free_in_bytes": 0, "used_in_bytes": 0},
+                    "cgroup": {"cpuacct": {"control_group": "/", "usage_nanos": int(elapsed * 1e9)},
+                               "cpu": {"control_group": "/", "cfs_period_micros": 100000, "cfs_quota_micros": -1}},
+                },
+                "process": {"timestamp": int(time.time() * 1000), "open_file_descriptors": 4000,
+                            "max_file_descriptors": 65535, "cpu": {"percent": 10, "total_in_millis": 1},
+                            "mem": {"total_virtual_in_bytes": 100 * 1024 ** 3}},
+                "jvm": {
+                    "timestamp": int(time.time() * 1000),
+                    "uptime_in_millis": int(elapsed * 1000),
+                    "mem": {"heap_used_in_bytes": self.random.randint(8, 28) * 1024 ** 3,
+                            "heap_used_percent": self.random.randint(25, 90),
+                            "heap_committed_in_bytes": 31 * 1024 ** 3, "heap_max_in_bytes": 31 * 1024 ** 3,
+                            "non_heap_used_in_bytes": 300 * 1024 ** 2, "non_heap_committed_in_bytes": 320 * 1024 ** 2,
+                            "pools": {pool: {"used_in_bytes": 1, "max_in_bytes": 1, "peak_used_in_bytes": 1,
+                                             "peak_max_in_bytes": 1} for pool in ("young", "survivor", "old")}},
+                    "threads": {"count": 300, "peak_count": 320},
+                    "gc": {"collectors": {"young": {"collection_count": int(elapsed), "collection_time_in_millis": int(elapsed * 20)},
+                                          "old": {"collection_count": 0, "collection_time_in_millis": 0}}},
+                    "buffer_pools": {pool: {"count": 10, "used_in_bytes": 1, "total_capacity_in_bytes": 1}
+                                     for pool in ("mapped", "direct", "mapped - 'non-volatile memory'")},
+                    "classes": {"current_loaded_count": 20000, "total_loaded_count": 20000, "total_unloaded_count": 0},
+                },
+                "thread_pool": pools,
+                "fs": {
+                    "timestamp": int(time.time() * 1000),
+                    "total": {"total_in_bytes": 4 * 1024 ** 4, "free_in_bytes": 2 * 1024 ** 4,
+                              "available_in_bytes": self.random.randint(1, 3) * 1024 ** 4},
+                    "data": [{"path": f"/data{d}/nodes/0", "mount": f"/data{d}", "type": "ext4",
+                              "total_in_bytes": 1024 ** 4, "free_in_bytes": 1024 ** 3,
+                              "available_in_bytes": 1024 ** 3} for d in range(4)],
+                    "io_stats": {"devices": [{"device_name": f"sd{c}", "operations": 1, "read_operations": 1,
+                                              "write_operations": 1, "read_kilobytes": 1, "write_kilobytes": 1}
+                                             for c in "abcd"]},
+                },
+                "transport": {"server_open": 100, "rx_count": 1, "rx_size_in_bytes": 1, "tx_count": 1, "tx_size_in_bytes": 1},
+                "http": {"current_open": 10, "total_opened": 1000},
+                "breakers": {b: {"limit_size_in_bytes": 1, "estimated_size_in_bytes": 1, "overhead": 1.0, "tripped": 0}
+                             for b in ("request", "fielddata", "in_flight_requests", "accounting", "parent")},
+            }
+        return {"_nodes": {"total": len(nodes), "successful": len(nodes), "failed": 0},
+                "cluster_name": "stub", "nodes": nodes}
+
+    def search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        size = min(body.get("size", 10), self.docs)
+        now = datetime.utcnow()
+        hits = []
+        for i in range(size):
+            code = f"{self.random.randint(0, 999999):06d}"
+            timestamp = (now - timedelta(seconds=i * 7)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            request_body = json.dumps({"receiver": "13812345678", "content": f"【测试】您的验证码是{code}，5分钟内有效"},
+                                      ensure_ascii=False)
+            hits.append({
+                "_index": "logstash-loghub-logs-message-center-prd", "_id": str(i), "_score": None,
+                "_source": {"@timestamp": timestamp, "time": timestamp, "level": "INFO",
+                            "message": f"send sms code {code} to 13812345678",
+                            "msgObj": {"object": {"requestBody": request_body}}},
+                "sort": [i],
+            })
+        return {"took": 3, "timed_out": False, "_shards": {"total": 5, "successful": 5, "skipped": 0, "failed": 0},
+                "hits": {"total": {"value": self.docs, "relation": "eq"}, "max_score": None, "hits": hits}}
+
+    def field_caps(self) -> Dict[str, Any]:
+        return {"indices": [], "fields": {
+            "@timestamp": {"date": {"type": "date", "searchable": True, "aggregatable": True}},
+            "time": {"date": {"type": "date", "searchable": True, "aggregatable": True}},
+            "message": {"text": {"type": "text", "searchable": True, "aggregatable": False}},
+        }}
+
+    def health(self) -> Dict[str, Any]:
+        active = sum(int(row["pri"]) * 2 for row in self.indices)
+        return {"cluster_name": "stub", "status": "green", "timed_out": False,
+                "number_of_nodes": len(self.node_names), "number_of_data_nodes": len(self.node_names),
+                "active_primary_shards": active // 2, "active_shards": active, "relocating_shards": 0,
+                "initializing_shards": 0, "unassigned_shards": 0, "delayed_unassigned_shards": 0,
+                "number_of_pending_tasks": 0, "number_of_in_flight_fetch": 0,
+                "task_max_waiting_in_queue_millis": 0, "active_shards_percent_as_number": 100.0}
+
+
+def make_handler(cluster: StubCluster, latency: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, body: Any, code: int = 200):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_body(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length)) if length else {}
+
+        def do_GET(self):
+            self.route()
+
+        def do_POST(self):
+            self.route()
+
+        def do_PUT(self):
+            self.route()
+
+        def do_DELETE(self):
+            self.route()
+
+        def route(self):
+            if latency:
+                time.sleep(latency)
+            url = urlparse(self.path)
+            path = url.path.strip("/")
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            body = self.read_body()
+
+            for key, payload in cluster.recorded.items():
+                if key in path:
+                    return self.send_json(self.shape(payload, params))
+
+            if path.startswith("_cat/indices"):
+                result = cluster.cat_indices(path[len("_cat/indices"):].strip("/"), params)
+            elif path.startswith("_cat/shards"):
+                result = cluster.cat_shards(path[len("_cat/shards"):].strip("/"))
+            elif path.startswith("_nodes/stats"):
+                result = cluster.nodes_stats()
+            elif path.startswith("_nodes"):
+                result = {"nodes": {f"node-id-{i:04d}": {"os": {"allocated_processors": 16}}
+                                    for i in range(len(cluster.node_names))}}
+            elif path.startswith("_cluster/health"):
+                result = cluster.health()
+            elif path.endswith("_field_caps"):
+                result = cluster.field_caps()
+            elif path.endswith("_search"):
+                result = cluster.search(body)
+            else:
+                result = {"acknowledged": True}
+            self.send_json(self.shape(result, params))
+
+        def shape(self, result: Any, params: Dict[str, str]) -> Any:
+            if isinstance(result, list) and params.get("h"):
+                columns = params["h"].split(",")
+                return [{column: row.get(column) for column in columns} for row in result]
+            if isinstance(result, dict) and params.get("filter_path"):
+                return apply_filter_path(result, [p.split(".") for p in params["filter_path"].split(",")])
+            return result
+
+    return StubHandler
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="本地模拟 Elasticsearch 服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=9299, help="监听端口 (默认9299)")
+    parser.add_argument("--indices", type=int, default=1000, help="索引总数 (默认1000)")
+    parser.add_argument("--days", type=int, default=30, help="索引分布的天数 (默认30)")
+    parser.add_argument("--nodes", type=int, default=50, help="节点数 (默认50)")
+    parser.add_argument("--docs", type=int, default=20, help="每次搜索的命中数 (默认20)")
+    parser.add_argument("--latency", type=float, default=0, help="每个请求注入的延迟毫秒数")
+    parser.add_argument("--payload-dir", help="录制的响应文件目录，存在的文件优先回放")
+    args = parser.parse_args()
+
+    cluster = StubCluster(args.indices, args.days, args.nodes, args.docs, args.payload_dir)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cluster, args.latency / 1000))
+    print(f"模拟ES已启动: http://{args.host}:{args.port} "
+          f"({len(cluster.indices)} 个索引, {args.nodes} 个节点, 延迟 {args.latency:g}ms)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
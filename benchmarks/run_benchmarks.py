@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES工具基准测试
+为每个规模启动一个本地模拟ES (es_stub_server.py)，端到端测量各功能的耗时、吞吐量和内存峰值：
+    python3 benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --nodes 50 --latency 5
+输出的功能日志被丢弃，结果以表格显示，可用 --json 保存以便比较不同版本
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Callable, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from es_index_logger import ESIndexLogger  # noqa: E402
+from es_manager import ESManager  # noqa: E402
+from sms_query import SMSQuery  # noqa: E402
+
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "es_stub_server.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def stub_server(indices: int, days: int, nodes: int, latency: float, payload_dir: str = None):
+    """启动模拟ES子进程，等待端口可用后返回地址"""
+    port = free_port()
+    command = [sys.executable, STUB_SERVER, "--port", str(port), "--indices", str(indices),
+               "--days", str(days), "--nodes", str(nodes), "--latency", str(latency)]
+    if payload_dir:
+        command += ["--payload-dir", payload_dir]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"模拟ES启动失败: {process.stderr.read().decode()}")
+            with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                break
+            time.sleep(0.1)
+        else:
+            raise RuntimeError("模拟ES启动超时")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[List[float], int]:
+    """执行 repeat 次记录耗时，再在 tracemalloc 下执行一次记录内存峰值，功能输出全部丢弃"""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return timings, peak
+
+
+def build_cases(es_url: str, workdir: str, days: int, indices: int, nodes: int) -> List[Tuple[str, Callable, int]]:
+    """返回 (名称, 函数, 每次处理的条目数)"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    per_day = max(1, indices // days)
+    manager = ESManager(es_url)
+    sms = SMSQuery(es_url, cache_ttl=0)
+
+    def batch_append():
+        # 每次都从空历史库开始，补充 days-1 天
+        os.chdir(workdir)
+        for name in ("es_index_history.db", "es_index_monitor.md"):
+            if os.path.exists(name):
+                os.remove(name)
+        logger = ESIndexLogger(es_url)
+        seed_date = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        logger.store.save_day(logger.process_indices_data([], seed_date))
+        original_input = builtins.input
+        builtins.input = lambda *args: "y"
+        try:
+            logger.batch_append_missing_dates()
+        finally:
+            builtins.input = original_input
+            logger.store.close()
+
+    return [
+        ("get_indices_info", lambda: manager.get_indices_info(f"*{today}*"), per_day),
+        ("get_shards_info", lambda: manager.get_shards_info(today), per_day),
+        ("get_system_stats", manager.get_system_stats, nodes),
+        ("batch_append_missing_dates", batch_append, per_day * (days - 1)),
+        ("search_sms_codes", lambda: sms.search_sms_codes("13812345678"), 1),
+    ]
+
+
+def run(sizes: List[int], days: int, nodes: int, latency: float, repeat: int, payload_dir: str = None,
+        only: List[str] = None) -> List[Dict[str, Any]]:
+    results = []
+    cwd = os.getcwd()
+    for size in sizes:
+        print(f"\n▶ 规模: {size:,} 个索引, {nodes} 个节点, 延迟 {latency:g}ms", flush=True)
+        with stub_server(size, days, nodes, latency, payload_dir) as es_url, \
+                tempfile.TemporaryDirectory() as workdir:
+            try:
+                for name, func, items in build_cases(es_url, workdir, days, size, nodes):
+                    if only and name not in only:
+                        continue
+                    timings, peak = measure(func, repeat)
+                    median = statistics.median(timings)
+                    result = {
+                        'indices': size, 'nodes': nodes, 'latency_ms': latency, 'case': name,
+                        'median_s': median, 'min_s': min(timings), 'max_s': max(timings),
+                        'calls_per_s': 1 / median if median else 0,
+                        'items_per_s': items / median if median else 0,
+                        'peak_mb': peak / 1024 ** 2,
+                    }
+                    results.append(result)
+                    print(f"   {name:<28} {median * 1000:>9.1f}ms  {result['items_per_s']:>12,.0f} 条/秒  "
+                          f"峰值内存 {result['peak_mb']:>7.1f}MB", flush=True)
+            finally:
+                os.chdir(cwd)
+    return results
+
+
+def print_summary(results: List[Dict[str, Any]]):
+    print("\n" + "=" * 96)
+    print(f"{'索引数':>8} {'功能':<28} {'中位数':>10} {'最小':>10} {'最大':>10} {'条/秒':>12} {'内存峰值':>10}")
+    print("=" * 96)
+    for r in results:
+        print(f"{r['indices']:>8,} {r['case']:<28} {r['median_s'] * 1000:>8.1f}ms {r['min_s'] * 1000:>8.1f}ms "
+              f"{r['max_s'] * 1000:>8.1f}ms {r['items_per_s']:>12,.0f} {r['peak_mb']:>8.1f}MB")
+    print("=" * 96)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES工具基准测试")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="索引规模，逗号分隔 (默认1000,10000,100000)")
+    parser.add_argument("--days", type=int, default=30, help="索引分布的天数 (默认30)")
+    parser.add_argument("--nodes", type=int, default=50, help="节点数 (默认50)")
+    parser.add_argument("--latency", type=float, default=5, help="每个请求注入的延迟毫秒数 (默认5)")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数 (默认3)")
+    parser.add_argument("--only", help="只运行指定功能，逗号分隔")
+    parser.add_argument("--payload-dir", help="录制的响应文件目录，传给模拟ES回放")
+    parser.add_argument("--json", help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    only = [name.strip() for name in args.only.split(",")] if args.only else None
+    results = run(sizes, args.days, args.nodes, args.latency, args.repeat, args.payload_dir, only)
+    print_summary(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'time': datetime.now().isoformat(timespec='seconds'), 'results': results}, f, indent=2)
+        print(f"💾 结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+_cat 结果列式模型
+_cat/indices、_cat/shards 统一使用 bytes=b 和固定的 h= 列，
+加载到 array 列中，总计在加载时一次遍历完成，排序和 TOP N 只比较数值列；
+分片数很多时可用 ShardSummary 边接收边统计，只保留需要显示的行
+"""
+
+import heapq
+from array import array
+from typing import List, Dict, Any, Iterable, Callable, Tuple
+
+from es_request_spec import RequestSpec
+
+BYTES_PER_GB = 1024 ** 3
+
+INDICES_COLUMNS = "index,pri,rep,docs.count,store.size"
+SHARDS_COLUMNS = "index,shard,prirep,state,docs,store,node"
+
+
+def cat_indices_endpoint(pattern: str = None, sort: str = "store.size:desc", columns: str = INDICES_COLUMNS) -> str:
+    """生成 _cat/indices 请求路径 (字节单位、固定列)"""
+    spec = RequestSpec("_cat/indices/{target}", columns=columns.split(","), params={"bytes": "b"})
+    return spec.endpoint(pattern, s=sort)
+
+
+def cat_shards_endpoint(pattern: str = None, columns: str = SHARDS_COLUMNS) -> str:
+    """生成 _cat/shards 请求路径 (字节单位、固定列)"""
+    spec = RequestSpec("_cat/shards/{target}", columns=columns.split(","), params={"bytes": "b"})
+    return spec.endpoint(pattern)
+
+
+def convert_size_to_gb(size_str: str) -> float:
+    """转换存储大小字符串到GB (兼容未使用 bytes=b 的 "3.2gb" 形式)"""
+    return to_bytes(size_str) / BYTES_PER_GB
+
+
+def to_bytes(value) -> int:
+    """将 _cat 返回的大小转换为字节数，bytes=b 时为纯数字字符串，已关闭的索引为 null"""
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    value = value.lower().strip()
+    if value.isdigit():
+        return int(value)
+
+    units = (('tb', 1024 ** 4), ('gb', 1024 ** 3), ('mb', 1024 ** 2), ('kb', 1024), ('b', 1))
+    try:
+        for suffix, factor in units:
+            if value.endswith(suffix):
+                return int(float(value[:-len(suffix)]) * factor)
+        return int(float(value))
+    except ValueError:
+        return 0
+
+
+def to_int(value) -> int:
+    """_cat 数值列转换，null / 非数字按 0 处理"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def format_bytes(num_bytes: int) -> str:
+    """字节数转换为便于阅读的字符串"""
+    size = float(num_bytes)
+    for unit in ('b', 'kb', 'mb', 'gb'):
+        if size < 1024:
+            return f"{size:.1f}{unit}" if unit != 'b' else f"{int(size)}b"
+        size /= 1024
+    return f"{size:.1f}tb"
+
+
+class IndexTable:
+    """_cat/indices 结果的列式表示"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.pri = array('l')
+        self.rep = array('l')
+        self.docs = array('q')
+        self.store_bytes = array('q')
+        self.total_docs = 0
+        self.total_bytes = 0
+        self.total_shards = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'IndexTable':
+        """加载 _cat/indices 行，同时累计总计"""
+        table = cls()
+        for row in rows:
+            table.append(row)
+        return table
+
+    def append(self, row: Dict[str, Any]):
+        """追加一行"""
+        pri = to_int(row.get('pri'))
+        rep = to_int(row.get('rep'))
+        docs = to_int(row.get('docs.count'))
+        store = to_bytes(row.get('store.size'))
+
+        self.names.append(row.get('index', 'N/A'))
+        self.pri.append(pri)
+        self.rep.append(rep)
+        self.docs.append(docs)
+        self.store_bytes.append(store)
+
+        self.total_docs += docs
+        self.total_bytes += store
+        self.total_shards += pri + rep
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def total_size_gb(self) -> float:
+        return self.total_bytes / BYTES_PER_GB
+
+    def shards(self, i: int) -> int:
+        """第 i 行的总分片数 (主+副)"""
+        return self.pri[i] + self.rep[i]
+
+    def size_gb(self, i: int) -> float:
+        """第 i 行的存储大小 (GB)"""
+        return self.store_bytes[i] / BYTES_PER_GB
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """第 i 行的汇总字典"""
+        return {
+            'index': self.names[i],
+            'size_gb': self.size_gb(i),
+            'shards': self.shards(i),
+            'docs': self.docs[i],
+        }
+
+    def top_n(self, n: int, column: str = 'store_bytes') -> List[int]:
+        """按数值列取前 N 行的行号 (降序)"""
+        values = getattr(self, column)
+        return heapq.nlargest(n, range(len(self)), key=values.__getitem__)
+
+    def order_by(self, column: str = 'store_bytes', reverse: bool = True) -> List[int]:
+        """按数值列排序后的全部行号"""
+        values = getattr(self, column)
+        return sorted(range(len(self)), key=values.__getitem__, reverse=reverse)
+
+    def select(self, predicate: Callable[[str], bool]) -> 'IndexTable':
+        """按索引名筛选出新表"""
+        table = IndexTable()
+        for i, name in enumerate(self.names):
+            if predicate(name):
+                table.names.append(name)
+                table.pri.append(self.pri[i])
+                table.rep.append(self.rep[i])
+                table.docs.append(self.docs[i])
+                table.store_bytes.append(self.store_bytes[i])
+                table.total_docs += self.docs[i]
+                table.total_bytes += self.store_bytes[i]
+                table.total_shards += self.pri[i] + self.rep[i]
+        return table
+
+
+class ShardTable:
+    """_cat/shards 结果的列式表示"""
+
+    def __init__(self):
+        self.indices: List[str] = []
+        self.shard = array('l')
+        self.prirep: List[str] = []
+        self.states: List[str] = []
+        self.docs = array('q')
+        self.store_bytes = array('q')
+        self.nodes: List[str] = []
+        self.primary_count = 0
+        self.replica_count = 0
+        self.total_docs = 0
+        self.total_bytes = 0
+        self.state_counts: Dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'ShardTable':
+        """加载 _cat/shards 行，同时累计主副分片数、文档数和状态分布"""
+        table = cls()
+        for row in rows:
+            table.append(row)
+        return table
+
+    def append(self, row: Dict[str, Any]):
+        """追加一行"""
+        prirep = row.get('prirep', '?')
+        state = row.get('state', 'UNKNOWN')
+        docs = to_int(row.get('docs'))
+        store = to_bytes(row.get('store'))
+
+        self.indices.append(row.get('index', 'N/A'))
+        self.shard.append(to_int(row.get('shard')))
+        self.prirep.append(prirep)
+        self.states.append(state)
+        self.docs.append(docs)
+        self.store_bytes.append(store)
+        self.nodes.append(row.get('node') or 'N/A')
+
+        if prirep == 'p':
+            self.primary_count += 1
+        elif prirep == 'r':
+            self.replica_count += 1
+        self.total_docs += docs
+        self.total_bytes += store
+        self.state_counts[state] = self.state_counts.get(state, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+
+class _Descending:
+    """反转比较方向，使 heapq 的最小堆按最大值出堆"""
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other: '_Descending') -> bool:
+        return self.key > other.key
+
+
+class ShardSummary:
+    """_cat/shards 流式统计
+
+    逐行累计主副分片数、文档数、状态分布和各服务的分片数，
+    只用定长堆保留按 (索引名, 分片号) 排序的前 keep 行，内存占用与分片总数无关
+    """
+
+    def __init__(self, keep: int = 51):
+        self.keep = keep
+        self.count = 0
+        self.primary_count = 0
+        self.replica_count = 0
+        self.total_docs = 0
+        self.total_bytes = 0
+        self.state_counts: Dict[str, int] = {}
+        self.service_counts: Dict[str, int] = {}
+        self._heap: List[_Descending] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], keep: int = 51) -> 'ShardSummary':
+        summary = cls(keep)
+        for row in rows:
+            summary.add(row)
+        return summary
+
+    def add(self, row: Dict[str, Any]):
+        """累计一行，行只在进入前 keep 名时才保留"""
+        index = row.get('index', 'N/A')
+        prirep = row.get('prirep', '?')
+        state = row.get('state', 'UNKNOWN')
+        docs = to_int(row.get('docs'))
+        store = to_bytes(row.get('store'))
+
+        self.count += 1
+        if prirep == 'p':
+            self.primary_count += 1
+        elif prirep == 'r':
+            self.replica_count += 1
+        self.total_docs += docs
+        self.total_bytes += store
+        self.state_counts[state] = self.state_counts.get(state, 0) + 1
+
+        if 'logstash-loghub-' in index:
+            parts = index.split('-')
+            service = parts[3] if len(parts) > 3 else 'unknown'
+            self.service_counts[service] = self.service_counts.get(service, 0) + 1
+
+        if self.keep <= 0:
+            return
+        key = (index, to_int(row.get('shard')), prirep)
+        if len(self._heap) < self.keep:
+            heapq.heappush(self._heap, _Descending(key + (state, docs, store, row.get('node') or 'N/A')))
+        elif key < self._heap[0].key[:3]:
+            heapq.heapreplace(self._heap, _Descending(key + (state, docs, store, row.get('node') or 'N/A')))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def first_rows(self) -> List[Tuple[str, int, str, str, int, int, str]]:
+        """按 (索引名, 分片号) 排序的前 keep 行: (索引, 分片, 主副, 状态, 文档数, 字节数, 节点)"""
+        return sorted(item.key for item in self._heap)
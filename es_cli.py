@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES 命令行入口
+供 cron 和告警脚本调用的非交互子命令，默认输出 JSON 便于管道处理：
+    python3 es_cli.py health
+    python3 es_cli.py indices --date 2025-07-28 --top 10
+    python3 es_cli.py sms 13812345678 | jq '.messages[].code'
+模块只导入标准库，子命令用到的模块在执行时才导入；不做额外的 _cluster/health 探测，
+请求失败或没有数据时退出码为 1，--text 时输出与交互菜单相同的表格
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+from datetime import datetime
+from typing import Dict, Any
+
+
+def node_summary(node: Dict[str, Any]) -> Dict[str, Any]:
+    """单个节点的资源使用率 (与系统资源统计的计算方式一致)"""
+    os_stats = node.get('os', {})
+    cpu = os_stats.get('cpu', {})
+    load_avg = cpu.get('load_average') or {}
+    mem = os_stats.get('mem', {})
+    heap = node.get('jvm', {}).get('mem', {})
+    disk = node.get('fs', {}).get('total', {})
+
+    def percent(used: float, total: float) -> float:
+        return round(used / total * 100, 1) if total > 0 else 0
+
+    return {
+        'name': node.get('name', 'unknown'),
+        'cpu_percent': cpu.get('percent', 0),
+        'load_1m': load_avg.get('1m', 0),
+        'load_5m': load_avg.get('5m', 0),
+        'mem_percent': percent(mem.get('total_in_bytes', 0) - mem.get('free_in_bytes', 0), mem.get('total_in_bytes', 0)),
+        'heap_percent': percent(heap.get('heap_used_in_bytes', 0), heap.get('heap_max_in_bytes', 0)),
+        'disk_percent': percent(disk.get('total_in_bytes', 0) - disk.get('available_in_bytes', 0), disk.get('total_in_bytes', 0)),
+        'disk_available_bytes': disk.get('available_in_bytes', 0),
+    }
+
+
+def date_pattern(date: str = None) -> str:
+    return f"*{date or datetime.now().strftime('%Y-%m-%d')}*"
+
+
+def manager_for(args):
+    from es_manager import ESManager
+    from es_transport import DEFAULT_ES_URL
+    return ESManager(args.es_url or DEFAULT_ES_URL)
+
+
+def cmd_health(args) -> Any:
+    manager = manager_for(args)
+    if args.text:
+        return manager.check_cluster_health()
+    return manager.request("health")
+
+
+def cmd_indices(args) -> Any:
+    pattern = args.pattern or date_pattern(args.date)
+    manager = manager_for(args)
+    if args.text:
+        return manager.get_indices_info(pattern)
+
+    from es_cat_model import IndexTable, cat_indices_endpoint
+    rows = manager.make_request(cat_indices_endpoint(pattern))
+    if not rows:
+        return None
+    indices = IndexTable.from_rows(rows)
+    order = indices.top_n(args.top) if args.top else indices.order_by()
+    return {
+        'pattern': pattern,
+        'total_indices': len(indices),
+        'total_size_gb': round(indices.total_size_gb, 2),
+        'total_shards': indices.total_shards,
+        'total_docs': indices.total_docs,
+        'indices': [indices.row(i) for i in order],
+    }
+
+
+def cmd_shards(args) -> Any:
+    manager = manager_for(args)
+    if args.text:
+        manager.get_shards_info(args.date)
+        return True
+
+    from es_cat_model import ShardSummary, cat_shards_endpoint
+    pattern = date_pattern(args.date)
+    rows = manager.stream_request(cat_shards_endpoint(pattern))
+    if args.rows:
+        # 每个分片一行 JSON，边接收边输出
+        count = 0
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False), file=args.out)
+            count += 1
+        return count or None
+
+    summary = ShardSummary.from_rows(rows, keep=0)
+    if not summary:
+        return None
+    return {
+        'pattern': pattern,
+        'total_shards': len(summary),
+        'primary': summary.primary_count,
+        'replica': summary.replica_count,
+        'total_docs': summary.total_docs,
+        'total_bytes': summary.total_bytes,
+        'states': summary.state_counts,
+        'services': summary.service_counts,
+    }
+
+
+def cmd_stats(args) -> Any:
+    manager = manager_for(args)
+    if args.text:
+        return manager.get_system_stats()
+    nodes = (manager.request("nodes_stats") or {}).get('nodes', {})
+    return {'nodes': [node_summary(node) for node in nodes.values()]} if nodes else None
+
+
+def cmd_sms(args) -> Any:
+    from es_transport import DEFAULT_ES_URL
+    from sms_query import SMSQuery
+    sms_query = SMSQuery(args.es_url or DEFAULT_ES_URL)
+    if args.text:
+        hits = sms_query.search_sms_codes(args.phone)
+        sms_query.display_results(hits)
+        return True
+
+    if not sms_query.validate_phone_number(args.phone):
+        print(f"❌ 手机号格式不正确: {args.phone}")
+        return None
+    from sms_code_extractor import get_message_content
+    result = sms_query.query_sms_codes(sms_query.clean_phone_number(args.phone), args.minutes)
+    messages = []
+    for hit in result['hits']:
+        source = hit.get('_source', {})
+        content, receiver = get_message_content(source)
+        has_content = content and content != 'N/A'
+        messages.append({
+            'time': source.get('time', source.get('@timestamp', source.get('timestamp'))),
+            'receiver': receiver,
+            'code': sms_query.extract_verification_code(content) if has_content else None,
+            'message': content if has_content else None,
+        })
+    return {
+        'phone': result['phone'],
+        'start_time': result['start_time'],
+        'end_time': result['end_time'],
+        'total': result['total'],
+        'messages': messages,
+    }
+
+
+def cmd_env(args) -> Any:
+    from es_env_query import EnvSnapshot, show_env
+    snapshot = EnvSnapshot(manager_for(args))
+    if not snapshot.load():
+        return None
+    if args.text:
+        for env in args.envs:
+            show_env(snapshot, env, args.top)
+            print()
+        return True
+
+    result = {}
+    for env in args.envs:
+        group = snapshot.group(env)
+        indices = group['indices']
+        result[env] = {
+            'total_indices': len(indices),
+            'total_size_gb': round(indices.total_size_gb, 2),
+            'total_shards': indices.total_shards,
+            'total_docs': indices.total_docs,
+            'primary': group['primary'],
+            'replica': group['replica'],
+            'states': group['states'],
+            'indices': [indices.row(i) for i in indices.top_n(args.top)],
+        }
+    return result
+
+
+def cmd_log(args) -> Any:
+    from es_index_logger import ESIndexLogger
+    from es_transport import DEFAULT_ES_URL
+    logger = ESIndexLogger(args.es_url or DEFAULT_ES_URL)
+    if args.scheduled:
+        ok = logger.run_scheduled(args.checkpoint, args.max_attempts, args.include_today)
+        return {'scheduled': True, 'ok': ok} if ok else None
+
+    date = args.date or datetime.now().strftime("%Y-%m-%d")
+    data = logger.get_indices_data(date_pattern(date))
+    logger.append_to_md(data)
+    if 'error' in data:
+        return None
+    return {key: value for key, value in data.items() if key != 'indices'}
+
+
+COMMANDS = {
+    "health": cmd_health,
+    "indices": cmd_indices,
+    "shards": cmd_shards,
+    "stats": cmd_stats,
+    "env": cmd_env,
+    "sms": cmd_sms,
+    "log": cmd_log,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--es-url", help="ES地址 (默认 http://192.168.0.93:9201)")
+    common.add_argument("--text", action="store_true", help="输出表格而不是 JSON")
+    common.add_argument("--profile", action="store_true", help="执行后在 stderr 显示耗时分析 (ES端/网络/JSON解析/Python处理)")
+    common.add_argument("--metrics", help="把请求统计写入文件 (.json 为JSON，否则为 Prometheus 文本)")
+
+    parser = argparse.ArgumentParser(description="ES 命令行工具 (非交互，默认输出 JSON)")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    subparsers.add_parser("health", parents=[common], help="集群健康状态")
+
+    indices = subparsers.add_parser("indices", parents=[common], help="索引大小/分片/文档数")
+    indices.add_argument("--date", help="查询日期 (默认今天)")
+    indices.add_argument("--pattern", help="索引模式，优先于 --date")
+    indices.add_argument("--top", type=int, default=0, help="只输出最大的N个索引 (默认全部)")
+
+    shards = subparsers.add_parser("shards", parents=[common], help="分片统计")
+    shards.add_argument("--date", help="查询日期 (默认今天)")
+    shards.add_argument("--rows", action="store_true", help="逐行输出每个分片 (NDJSON)")
+
+    subparsers.add_parser("stats", parents=[common], help="节点资源使用率")
+
+    env = subparsers.add_parser("env", parents=[common], help="按环境关键词汇总索引和分片")
+    env.add_argument("envs", nargs="*", default=["prd", "dev", "test", "int", "staging"], help="环境关键词 (默认全部常用环境)")
+    env.add_argument("--top", type=int, default=20, help="每个环境输出的索引数 (默认20)")
+
+    sms = subparsers.add_parser("sms", parents=[common], help="验证码短信查询")
+    sms.add_argument("phone", help="手机号")
+    sms.add_argument("--minutes", type=int, default=15, help="查询过去N分钟 (默认15)")
+
+    log = subparsers.add_parser("log", parents=[common], help="记录索引数据到历史库和MD")
+    log.add_argument("date", nargs="?", help="记录指定日期 (默认今天)")
+    log.add_argument("--scheduled", action="store_true", help="按检查点增量处理 (同 es_index_logger.py --scheduled)")
+    log.add_argument("--checkpoint", default="es_index_checkpoint.json", help="检查点文件")
+    log.add_argument("--max-attempts", type=int, default=6, help="单个日期最多尝试次数 (默认6)")
+    log.add_argument("--include-today", action="store_true", help="定时任务模式下同时记录今天")
+    return parser
+
+
+def main():
+    """主函数"""
+    parser = build_parser()
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        sys.exit(2)
+    if args.command == "log" and args.date:
+        try:
+            datetime.strptime(args.date, "%Y-%m-%d")
+        except ValueError:
+            parser.error("日期格式错误，请使用 YYYY-MM-DD 格式")
+
+    args.out = sys.stdout
+    # es_metrics 依赖 es_request_spec，只在需要时导入
+    profile = None
+    if args.profile:
+        from es_metrics import Profile
+        profile = Profile(file=sys.stderr).start()
+    try:
+        if args.text:
+            result = COMMANDS[args.command](args)
+        else:
+            # JSON 模式下过程提示写到 stderr，stdout 只有结果
+            with contextlib.redirect_stdout(sys.stderr):
+                result = COMMANDS[args.command](args)
+            if result and not isinstance(result, int):
+                print(json.dumps(result, ensure_ascii=False, default=str))
+    except Exception as e:
+        print(f"❌ 执行失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profile:
+            profile.stop()
+        if args.metrics:
+            from es_metrics import METRICS
+            METRICS.write(args.metrics)
+    if not result:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
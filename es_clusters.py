@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多集群并发执行
+集群列表来自环境变量 ES_CLUSTERS (名称=地址，逗号分隔)，未设置时使用 DEFAULT_CLUSTERS；
+同一命令在所有集群上并发执行，每个集群的输出单独捕获，完成后按集群顺序合并显示并附汇总表：
+    python3 es_clusters.py health stats
+    python3 es_clusters.py close --close-days 42 --clusters es-95 --dry-run
+"""
+
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional
+from urllib.parse import urlparse
+
+DEFAULT_CLUSTERS = {
+    "es-93": "http://192.168.0.93:9201",
+    "es-94": "http://192.168.0.94:9200",
+    "es-95": "http://192.168.0.95:9200",
+}
+
+COMMANDS = ("health", "indices", "stats", "close", "delete")
+
+
+def load_clusters(spec: str = None) -> Dict[str, str]:
+    """解析集群列表 "名称=地址,..."，只写地址时以 主机:端口 作为名称"""
+    spec = spec if spec is not None else os.environ.get("ES_CLUSTERS", "")
+    clusters = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, url = item.rpartition("=")
+        if not name:
+            parsed = urlparse(url if "//" in url else f"http://{url}")
+            name = parsed.netloc
+        clusters[name] = url if "//" in url else f"http://{url}"
+    return clusters or dict(DEFAULT_CLUSTERS)
+
+
+def select_clusters(clusters: Dict[str, str], names: str = None) -> Dict[str, str]:
+    """按名称 (逗号分隔) 选出部分集群，名称不存在时抛出 ValueError"""
+    if not names:
+        return clusters
+    selected = {}
+    for name in (n.strip() for n in names.split(",") if n.strip()):
+        if name not in clusters:
+            raise ValueError(f"未知集群: {name} (可选: {', '.join(clusters)})")
+        selected[name] = clusters[name]
+    return selected
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """按线程分流 print 输出：设置了缓冲区的线程写入自己的缓冲区，其它线程写入原 stdout"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def target(self):
+        return getattr(self.local, 'buffer', None) or self.stream
+
+    def write(self, text: str) -> int:
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+
+def fan_out(clusters: Dict[str, str], func: Callable[[Any], Any], max_workers: int = None) -> List[Dict[str, Any]]:
+    """在每个集群上并发执行 func(ESManager)，返回按集群顺序排列的结果
+
+    每个结果包含 name、url、value、error、elapsed 和捕获的 output
+    """
+    from es_manager import ESManager
+
+    proxy = _ThreadLocalStdout(sys.stdout)
+
+    def run(name: str, url: str) -> Dict[str, Any]:
+        buffer = io.StringIO()
+        proxy.local.buffer = buffer
+        start_time = time.time()
+        value, error = None, None
+        try:
+            value = func(ESManager(url))
+        except Exception as e:
+            error = str(e)
+        finally:
+            proxy.local.buffer = None
+        return {'name': name, 'url': url, 'value': value, 'error': error,
+                'elapsed': time.time() - start_time, 'output': buffer.getvalue()}
+
+    original = sys.stdout
+    sys.stdout = proxy
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or max(1, len(clusters))) as executor:
+            futures = [executor.submit(run, name, url) for name, url in clusters.items()]
+            return [future.result() for future in futures]
+    finally:
+        sys.stdout = original
+
+
+def print_outputs(results: List[Dict[str, Any]]):
+    """按集群顺序显示各集群捕获的输出"""
+    for result in results:
+        print(f"\n{'━' * 20} [{result['name']}] {result['url']} ({result['elapsed']:.2f}秒) {'━' * 20}")
+        print(result['output'].rstrip("\n"))
+        if result['error']:
+            print(f"❌ 执行失败: {result['error']}")
+
+
+def summarize(command: str, value: Any) -> str:
+    """各命令返回值的一行摘要，用于汇总表"""
+    if not value:
+        return "无数据"
+    if command == "health":
+        return (f"{value.get('status', 'unknown').upper():<6} 节点 {value.get('number_of_nodes', 0)}, "
+                f"活跃分片 {value.get('active_shards', 0)}, 未分配 {value.get('unassigned_shards', 0)}")
+    if command == "indices":
+        return f"{len(value)} 个索引, {value.total_size_gb:.2f} GB, {value.total_shards} 个分片"
+    if command == "stats":
+        nodes = list(value.get('nodes', {}).values())
+        if not nodes:
+            return "无数据"
+        heap = [n.get('jvm', {}).get('mem', {}) for n in nodes]
+        max_heap = max((h.get('heap_used_in_bytes', 0) / h['heap_max_in_bytes'] * 100
+                        for h in heap if h.get('heap_max_in_bytes')), default=0)
+        max_cpu = max(n.get('os', {}).get('cpu', {}).get('percent', 0) for n in nodes)
+        return f"{len(nodes)} 个节点, 最高CPU {max_cpu}%, 最高堆内存 {max_heap:.1f}%"
+    if command in ("close", "delete"):
+        if 'total' in value:
+            return f"成功 {value['success']}/{value['total']}" + (f", 失败 {len(value['failed'])}" if value['failed'] else "")
+        return f"待处理 {len(value[command])} 个索引"
+    return str(value)
+
+
+def print_summary(command: str, results: List[Dict[str, Any]]):
+    """显示所有集群的汇总表"""
+    print("\n" + "=" * 100)
+    print(f"🌐 多集群汇总: {command} ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
+    print("=" * 100)
+    for result in results:
+        mark = "❌" if result['error'] or not result['value'] else "✅"
+        detail = result['error'] or summarize(command, result['value'])
+        print(f"{mark} {result['name']:<10} {result['url']:<30} {result['elapsed']:>6.2f}秒  {detail}")
+    print("=" * 100)
+
+
+def run_command(command: str, clusters: Dict[str, str], date: str = None) -> List[Dict[str, Any]]:
+    """在所有集群上执行查询类命令并显示合并报告"""
+    pattern = f"*{date}*" if date else None
+    funcs = {
+        "health": lambda manager: manager.check_cluster_health(),
+        "indices": lambda manager: manager.get_indices_info(pattern),
+        "stats": lambda manager: manager.get_system_stats(),
+    }
+    results = fan_out(clusters, funcs[command])
+    print_outputs(results)
+    print_summary(command, results)
+    return results
+
+
+def run_lifecycle(action: str, clusters: Dict[str, str], days: int, dry_run: bool = False,
+                  yes: bool = False, workers: int = 4, catch_up: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """先在所有集群上并发规划，合并显示并确认一次后再并发执行"""
+    from es_lifecycle import LifecycleEngine, print_plan
+
+    def plan(manager) -> Dict[str, Any]:
+        engine = LifecycleEngine(manager)
+        rows = engine.snapshot()
+        if not rows:
+            raise RuntimeError("无法获取索引列表")
+        planned = engine.plan(rows, catch_up=catch_up, **{f"{action}_days": days})
+        print_plan(action, planned[action])
+        return planned
+
+    plans = fan_out(clusters, plan)
+    print_outputs(plans)
+    print_summary(action, plans)
+
+    names = {p['name']: [name for name, _ in p['value'][action]] for p in plans if p['value']}
+    pending = {name: clusters[name] for name, indices in names.items() if indices}
+    if not pending:
+        print("✅ 没有需要处理的索引")
+        return None
+    if dry_run:
+        return None
+    if not yes:
+        total = sum(len(names[name]) for name in pending)
+        confirm = input(f"确认在 {len(pending)} 个集群上{'关闭' if action == 'close' else '删除'} {total} 个索引? (y/N): ")
+        if confirm.strip().lower() not in ['y', 'yes']:
+            print("❌ 操作已取消")
+            return None
+
+    names_by_url = {url.rstrip('/'): names[name] for name, url in pending.items()}
+
+    def execute(manager) -> Dict[str, Any]:
+        result = LifecycleEngine(manager, max_workers=workers).execute(action, names_by_url[manager.es_url])
+        if result['failed']:
+            print(f"❌ 失败的索引: {', '.join(result['failed'])}")
+        return result
+
+    results = fan_out(pending, execute)
+    print_outputs(results)
+    print_summary(action, results)
+    return results
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="多集群并发执行")
+    parser.add_argument("commands", nargs="*", help=f"要执行的命令，可同时指定多个 ({', '.join(COMMANDS)})")
+    parser.add_argument("--clusters", help="只在指定集群上执行 (名称逗号分隔)")
+    parser.add_argument("--date", help="indices 命令查询的日期 (默认今天)")
+    parser.add_argument("--close-days", type=int, default=42, help="close: 关闭N天前当天的索引 (默认42)")
+    parser.add_argument("--delete-days", type=int, default=180, help="delete: 删除N天前当天的索引 (默认180)")
+    parser.add_argument("--catch-up", action="store_true", help="close/delete 同时处理阈值日期之前漏掉的索引")
+    parser.add_argument("--workers", type=int, default=4, help="close/delete 每个集群的并发批次数 (默认4)")
+    parser.add_argument("--dry-run", action="store_true", help="close/delete 只显示计划，不执行")
+    parser.add_argument("-y", "--yes", action="store_true", help="close/delete 跳过确认")
+    parser.add_argument("--list", action="store_true", help="显示已配置的集群")
+    args = parser.parse_args()
+
+    clusters = load_clusters()
+    if args.list:
+        for name, url in clusters.items():
+            print(f"{name:<10} {url}")
+    elif not args.commands:
+        parser.print_help()
+        return
+    unknown = [command for command in args.commands if command not in COMMANDS]
+    if unknown:
+        parser.error(f"未知命令: {', '.join(unknown)} (可选: {', '.join(COMMANDS)})")
+    try:
+        clusters = select_clusters(clusters, args.clusters)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    for command in args.commands:
+        if command in ("close", "delete"):
+            days = args.close_days if command == "close" else args.delete_days
+            run_lifecycle(command, clusters, days, args.dry_run, args.yes, args.workers, args.catch_up)
+        else:
+            run_command(command, clusters, args.date)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+环境快速查询
+替代 start.sh 中每次生成临时脚本、按 *-<环境>-* 重新扫描的做法：
+一次获取全部索引和分片的快照，按环境关键词 (prd/dev/test/int/staging) 分组，
+常驻的交互循环中切换环境直接读取快照，超过有效期或输入 r 时才重新获取
+"""
+
+import argparse
+import time
+from typing import Dict, Any
+
+from es_cat_model import IndexTable, ShardTable, cat_indices_endpoint, cat_shards_endpoint
+from es_transport import DEFAULT_ES_URL
+
+ENVIRONMENTS = {
+    "prd": "生产环境",
+    "dev": "开发环境",
+    "test": "测试环境",
+    "int": "集成环境",
+    "staging": "预发环境",
+}
+
+# 快照有效期 (秒)
+DEFAULT_SNAPSHOT_TTL = 300
+
+
+class EnvSnapshot:
+    """全部索引/分片的快照，按环境关键词缓存分组结果"""
+
+    def __init__(self, manager, ttl: float = DEFAULT_SNAPSHOT_TTL):
+        self.manager = manager
+        self.ttl = ttl
+        self.loaded_at = 0.0
+        self.indices = IndexTable()
+        self.shards = ShardTable()
+        self.groups: Dict[str, Dict[str, Any]] = {}
+
+    def is_expired(self) -> bool:
+        return time.time() - self.loaded_at > self.ttl
+
+    def load(self) -> bool:
+        """获取快照 (索引 + 分片状态两个请求)，并预先分好常用环境"""
+        rows = self.manager.make_request(cat_indices_endpoint())
+        if not rows:
+            return False
+        try:
+            shards = ShardTable.from_rows(self.manager.stream_request(cat_shards_endpoint(columns="index,prirep,state")))
+        except Exception as e:
+            print(f"❌ 获取分片数据失败: {e}")
+            return False
+        self.indices = IndexTable.from_rows(rows)
+        self.shards = shards
+        self.loaded_at = time.time()
+        self.groups = {}
+        for env in ENVIRONMENTS:
+            self.group(env)
+        return True
+
+    def ensure_loaded(self, force: bool = False) -> bool:
+        if force or self.is_expired():
+            return self.load()
+        return True
+
+    def group(self, env: str) -> Dict[str, Any]:
+        """环境对应的索引表和分片统计 (与 *-<env>-* 匹配规则一致)，结果按环境缓存"""
+        cached = self.groups.get(env)
+        if cached is not None:
+            return cached
+
+        token = f"-{env}-"
+        indices = self.indices.select(lambda name: token in name)
+        primary = replica = 0
+        state_counts: Dict[str, int] = {}
+        for i, name in enumerate(self.shards.indices):
+            if token not in name:
+                continue
+            if self.shards.prirep[i] == 'p':
+                primary += 1
+            elif self.shards.prirep[i] == 'r':
+                replica += 1
+            state = self.shards.states[i]
+            state_counts[state] = state_counts.get(state, 0) + 1
+
+        result = {'indices': indices, 'primary': primary, 'replica': replica, 'states': state_counts}
+        self.groups[env] = result
+        return result
+
+
+def show_env(snapshot: EnvSnapshot, env: str, top: int = 20):
+    """显示单个环境的索引TOP N 和分片统计"""
+    group = snapshot.group(env)
+    indices = group['indices']
+    print(f"🔍 查询模式: *-{env}-*  (快照 {time.time() - snapshot.loaded_at:.0f} 秒前)")
+    if not len(indices):
+        print(f"❌ 未找到匹配 *-{env}-* 的索引")
+        return
+
+    print(f"✅ 找到 {len(indices)} 个索引:")
+    print("=" * 90)
+    print(f"{'序号':<4} {'索引名称':<50} {'大小(GB)':<10} {'分片数':<8} {'文档数':<12}")
+    print("=" * 90)
+    for rank, i in enumerate(indices.top_n(top), 1):
+        display_name = indices.names[i][:50]
+        print(f"{rank:<4} {display_name:<50} {indices.size_gb(i):>8.2f}  {indices.shards(i):>6}   {indices.docs[i]:>10,}")
+    if len(indices) > top:
+        print(f"... 还有 {len(indices) - top} 个索引")
+    print("=" * 90)
+    print(f"📊 总计: {len(indices)} 个索引, {indices.total_size_gb:.2f} GB, {indices.total_shards} 个分片, {indices.total_docs:,} 个文档")
+
+    print(f"\n🔧 分片统计:")
+    print(f"   总分片数: {group['primary'] + group['replica']}")
+    print(f"   主分片: {group['primary']}")
+    print(f"   副本分片: {group['replica']}")
+    print(f"   分片状态:")
+    for state, count in group['states'].items():
+        emoji = "✅" if state == "STARTED" else "⚠️"
+        print(f"     {emoji} {state}: {count}")
+
+
+def show_overview(snapshot: EnvSnapshot):
+    """各常用环境的汇总对比"""
+    print("=" * 70)
+    print(f"{'环境':<10} {'说明':<10} {'索引数':>8} {'大小(GB)':>12} {'分片数':>8} {'异常分片':>8}")
+    print("=" * 70)
+    for env, label in ENVIRONMENTS.items():
+        group = snapshot.group(env)
+        indices = group['indices']
+        abnormal = sum(count for state, count in group['states'].items() if state != "STARTED")
+        print(f"{env:<10} {label:<10} {len(indices):>8} {indices.total_size_gb:>12.2f} {indices.total_shards:>8} {abnormal:>8}")
+    print("=" * 70)
+
+
+def repl(snapshot: EnvSnapshot, top: int = 20):
+    """常驻查询循环，切换环境只读取快照"""
+    print("🔍 环境快速查询")
+    print("================")
+    print("常用环境关键词:")
+    for env, label in ENVIRONMENTS.items():
+        print(f"  {env:<8} - {label} (*-{env}-*)")
+    print("其它命令: a 全部环境汇总, r 刷新快照, q 退出")
+    print()
+
+    while True:
+        try:
+            keyword = input("请输入环境关键词: ").strip()
+        except (KeyboardInterrupt, EOFError):
+            print()
+            break
+
+        if keyword == "q":
+            break
+        if not keyword:
+            print("❌ 环境关键词不能为空")
+            continue
+
+        force = keyword == "r"
+        if not snapshot.ensure_loaded(force):
+            print("❌ 无法获取索引数据")
+            continue
+        if force:
+            print(f"🔄 快照已刷新: {len(snapshot.indices)} 个索引, {len(snapshot.shards)} 个分片")
+        elif keyword == "a":
+            show_overview(snapshot)
+        else:
+            show_env(snapshot, keyword, top)
+        print()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="环境快速查询")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("envs", nargs="*", help="要查询的环境关键词，不指定时进入交互查询")
+    parser.add_argument("--top", type=int, default=20, help="每个环境显示的索引数 (默认20)")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_SNAPSHOT_TTL, help=f"快照有效期秒数 (默认{DEFAULT_SNAPSHOT_TTL})")
+    args = parser.parse_args()
+
+    from es_manager import ESManager
+    snapshot = EnvSnapshot(ESManager(args.es_url), ttl=args.ttl)
+
+    if not args.envs:
+        repl(snapshot, args.top)
+        return
+
+    if not snapshot.ensure_loaded():
+        print(f"❌ 无法获取索引数据: {args.es_url}")
+        return
+    for env in args.envs:
+        if env == "a":
+            show_overview(snapshot)
+        else:
+            show_env(snapshot, env, args.top)
+        print()
+
+
+if __name__ == "__main__":
+    main()
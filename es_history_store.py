@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES索引历史存储
+以 SQLite 保存每日索引快照，(date, index) 为主键，
+供 es_index_logger.py 查询最新日期、按天对比和单个索引的历史趋势
+"""
+
+import os
+import re
+import sqlite3
+from typing import List, Dict, Any, Optional
+
+DATE_SUFFIX_PATTERN = re.compile(r'-?\d{4}[-.]\d{2}[-.]\d{2}$')
+
+# es_reindex_shrink.py 收缩后的索引名后缀 (原索引名 + 后缀)
+SHRUNK_SUFFIX = "-shrunk"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_summary (
+    date TEXT PRIMARY KEY,
+    query_time TEXT NOT NULL,
+    total_indices INTEGER NOT NULL,
+    total_size_gb REAL NOT NULL,
+    total_shards INTEGER NOT NULL,
+    total_docs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_stats (
+    date TEXT NOT NULL,
+    index_name TEXT NOT NULL,
+    series TEXT NOT NULL,
+    size_gb REAL NOT NULL,
+    shards INTEGER NOT NULL,
+    docs INTEGER NOT NULL,
+    PRIMARY KEY (date, index_name)
+);
+CREATE INDEX IF NOT EXISTS idx_index_stats_series ON index_stats (series, date);
+"""
+
+
+def index_series(index_name: str) -> str:
+    """去掉索引名末尾的日期，得到跨天可比较的索引序列名"""
+    return DATE_SUFFIX_PATTERN.sub('', index_name)
+
+
+class IndexHistoryStore:
+    def __init__(self, db_file: str = "es_index_history.db"):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def is_empty(self) -> bool:
+        """是否还没有任何记录"""
+        return self.conn.execute("SELECT 1 FROM daily_summary LIMIT 1").fetchone() is None
+
+    def save_day(self, data: Dict[str, Any]):
+        """写入(覆盖)某一天的快照，重复写入同一天不会产生重复记录"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO daily_summary VALUES (?, ?, ?, ?, ?, ?)",
+                (data['date'], data['query_time'], data['total_indices'],
+                 data['total_size_gb'], data['total_shards'], data['total_docs'])
+            )
+            self.conn.execute("DELETE FROM index_stats WHERE date = ?", (data['date'],))
+            self.conn.executemany(
+                "INSERT INTO index_stats VALUES (?, ?, ?, ?, ?, ?)",
+                [(data['date'], idx['index'], index_series(idx['index']),
+                  idx['size_gb'], idx['shards'], idx['docs']) for idx in data['indices']]
+            )
+
+    def has_date(self, date: str) -> bool:
+        """是否已有该日期的记录"""
+        row = self.conn.execute("SELECT 1 FROM daily_summary WHERE date = ?", (date,)).fetchone()
+        return row is not None
+
+    def latest_date(self) -> Optional[str]:
+        """最新记录日期 (走主键索引，不扫描全表)"""
+        row = self.conn.execute("SELECT MAX(date) FROM daily_summary").fetchone()
+        return row[0] if row else None
+
+    def list_dates(self) -> List[str]:
+        """全部已记录日期 (升序)"""
+        return [row[0] for row in self.conn.execute("SELECT date FROM daily_summary ORDER BY date")]
+
+    def recent_summaries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """最近N天的汇总 (日期降序)"""
+        rows = self.conn.execute(
+            "SELECT * FROM daily_summary ORDER BY date DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_day(self, date: str) -> Optional[Dict[str, Any]]:
+        """读取某一天的快照，格式与 ESIndexLogger.get_indices_data 返回值一致"""
+        summary = self.conn.execute("SELECT * FROM daily_summary WHERE date = ?", (date,)).fetchone()
+        if summary is None:
+            return None
+
+        rows = self.conn.execute(
+            "SELECT index_name, size_gb, shards, docs FROM index_stats WHERE date = ? ORDER BY size_gb DESC",
+            (date,)
+        ).fetchall()
+        data = dict(summary)
+        data['indices'] = [
+            {'index': row['index_name'], 'size_gb': row['size_gb'], 'shards': row['shards'], 'docs': row['docs']}
+            for row in rows
+        ]
+        return data
+
+    def compare_days(self, date_a: str, date_b: str) -> Dict[str, Any]:
+        """对比两天的汇总和各索引序列的大小变化"""
+        summaries = {
+            row['date']: dict(row) for row in self.conn.execute(
+                "SELECT * FROM daily_summary WHERE date IN (?, ?)", (date_a, date_b)
+            )
+        }
+        if date_a not in summaries or date_b not in summaries:
+            return {"error": "缺少对比日期的记录"}
+
+        rows = self.conn.execute(
+            """
+            SELECT b.series AS series,
+                   IFNULL(a.size_gb, 0) AS size_a, b.size_gb AS size_b,
+                   IFNULL(a.docs, 0) AS docs_a, b.docs AS docs_b
+            FROM index_stats b
+            LEFT JOIN index_stats a ON a.series = b.series AND a.date = ?
+            WHERE b.date = ?
+            ORDER BY (b.size_gb - IFNULL(a.size_gb, 0)) DESC
+            """,
+            (date_a, date_b)
+        ).fetchall()
+
+        totals = {}
+        for key in ('total_indices', 'total_size_gb', 'total_shards', 'total_docs'):
+            totals[key] = summaries[date_b][key] - summaries[date_a][key]
+
+        return {
+            'date_a': date_a,
+            'date_b': date_b,
+            'totals_delta': totals,
+            'indices': [dict(row) for row in rows],
+        }
+
+    def index_trend(self, series: str, limit: int = 30) -> List[Dict[str, Any]]:
+        """某个索引序列最近N天的变化 (日期升序)，series 可传入带日期的完整索引名"""
+        rows = self.conn.execute(
+            "SELECT date, size_gb, shards, docs FROM index_stats WHERE series = ? ORDER BY date DESC LIMIT ?",
+            (index_series(series), limit)
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def import_markdown(self, md_file: str) -> int:
+        """从旧的MD监控文档导入历史记录 (MD中只有TOP20索引明细)，返回导入天数"""
+        if not os.path.exists(md_file):
+            return 0
+
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        imported = 0
+        for section in re.split(r'^## ', content, flags=re.MULTILINE)[1:]:
+            date_match = re.match(r'(\d{4}-\d{2}-\d{2})', section)
+            if not date_match:
+                continue
+
+            def field(label, default="0"):
+                match = re.search(r'\*\*' + label + r'\*\*: ([^\n]*?)\s*$', section, re.MULTILINE)
+                return match.group(1) if match else default
+
+            indices = []
+            for row in re.finditer(r'^\| \d+ \| (\S+) \| ([\d.]+) \| (\d+) \| ([\d,]+) \|$', section, re.MULTILINE):
+                indices.append({
+                    'index': row.group(1),
+                    'size_gb': float(row.group(2)),
+                    'shards': int(row.group(3)),
+                    'docs': int(row.group(4).replace(',', '')),
+                })
+
+            self.save_day({
+                'date': date_match.group(1),
+                'query_time': field('查询时间', ''),
+                'total_indices': int(re.sub(r'\D', '', field('总索引数')) or 0),
+                'total_size_gb': float(re.sub(r'[^\d.]', '', field('总大小')) or 0),
+                'total_shards': int(re.sub(r'\D', '', field('总分片')) or 0),
+                'total_docs': int(re.sub(r'\D', '', field('总文档')) or 0),
+                'indices': indices,
+            })
+            imported += 1
+
+        return imported
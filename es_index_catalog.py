@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引名称目录
+缓存集群全部索引名，按 logstash-loghub-<类型>-<服务>-<日期> 规则解析服务名和日期，
+使用三元组(trigram)倒排索引做子串匹配，有序列表做前缀匹配
+"""
+
+import bisect
+import json
+import os
+import re
+import time
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+INDEX_NAME_PATTERN = re.compile(
+    r'^logstash-loghub-(?P<kind>[a-z]+)-(?P<service>.+)-(?P<date>\d{4}-\d{2}-\d{2})$'
+)
+
+CATALOG_VERSION = 2
+DEFAULT_TTL = 3600
+GRAM_SIZE = 3
+
+
+def parse_index_name(index_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """解析索引名，返回 (服务名, 日期)，不符合命名规则时返回 (None, None)"""
+    match = INDEX_NAME_PATTERN.match(index_name)
+    if not match:
+        return None, None
+    return match.group('service'), match.group('date')
+
+
+def _grams(text: str) -> set:
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class IndexCatalog:
+    def __init__(self, cache_file: str = ".es_indices_cache.json", ttl: int = DEFAULT_TTL):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.last_update = 0.0
+        # 索引名 -> (状态, 创建时间毫秒)
+        self.entries: Dict[str, Tuple[str, int]] = {}
+        self.by_service: Dict[str, List[str]] = {}
+        self.by_date: Dict[str, List[str]] = {}
+        # 三元组倒排索引和有序名称列表，首次查询时再构建
+        self._grams: Optional[Dict[str, set]] = None
+        self._sorted_names: Optional[List[str]] = None
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def is_expired(self) -> bool:
+        """目录是否超过有效期"""
+        return not self.entries or time.time() - self.last_update > self.ttl
+
+    def load(self):
+        """加载本地目录文件，兼容旧版 {"indices": [...], "last_update": "..."} 格式"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"加载缓存失败: {e}")
+            return
+
+        if data.get("version") == CATALOG_VERSION:
+            names = data.get("names", [])
+            statuses = data.get("status", "")
+            creations = data.get("creation", [])
+            for i, name in enumerate(names):
+                status = "open" if i >= len(statuses) or statuses[i] == "o" else "close"
+                creation = creations[i] if i < len(creations) else 0
+                self._add(name, status, creation)
+            self.last_update = data.get("last_update", 0.0)
+        else:
+            # 旧格式只有索引名，视为已过期，下次使用时刷新
+            for name in data.get("indices", []):
+                self._add(name, "open", 0)
+
+    def save(self):
+        """以列式紧凑JSON保存目录 (无缩进，状态压缩为单字符)"""
+        names = list(self.entries)
+        data = {
+            "version": CATALOG_VERSION,
+            "last_update": self.last_update,
+            "names": names,
+            "status": "".join("o" if self.entries[name][0] == "open" else "c" for name in names),
+            "creation": [self.entries[name][1] for name in names],
+        }
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"保存缓存失败: {e}")
+
+    def refresh(self, fetch: Callable[[str], Any]) -> Tuple[int, int]:
+        """从 _cat/indices 增量刷新目录，只为新增索引建索引，返回 (新增数, 删除数)"""
+        rows = fetch("_cat/indices?format=json&h=index,status,creation.date")
+        if not rows:
+            return 0, 0
+
+        current = {}
+        for row in rows:
+            name = row.get('index')
+            if name:
+                current[name] = (row.get('status') or 'open', int(row.get('creation.date') or 0))
+
+        removed = [name for name in self.entries if name not in current]
+        for name in removed:
+            self._remove(name)
+
+        added = 0
+        for name, (status, creation) in current.items():
+            if name in self.entries:
+                self.entries[name] = (status, creation)
+            else:
+                self._add(name, status, creation)
+                added += 1
+
+        self.last_update = time.time()
+        self.save()
+        return added, len(removed)
+
+    def _add(self, name: str, status: str, creation: int):
+        self.entries[name] = (status, creation)
+        service, date = parse_index_name(name)
+        if service:
+            self.by_service.setdefault(service, []).append(name)
+            self.by_date.setdefault(date, []).append(name)
+        if self._grams is not None:
+            for gram in _grams(name):
+                self._grams.setdefault(gram, set()).add(name)
+        if self._sorted_names is not None:
+            bisect.insort(self._sorted_names, name)
+
+    def _remove(self, name: str):
+        del self.entries[name]
+        service, date = parse_index_name(name)
+        if service:
+            self.by_service[service].remove(name)
+            self.by_date[date].remove(name)
+        if self._grams is not None:
+            for gram in _grams(name):
+                self._grams[gram].discard(name)
+        if self._sorted_names is not None:
+            pos = bisect.bisect_left(self._sorted_names, name)
+            del self._sorted_names[pos]
+
+    def _ensure_indexes(self):
+        if self._grams is None:
+            grams: Dict[str, set] = {}
+            for name in self.entries:
+                for gram in _grams(name):
+                    grams.setdefault(gram, set()).add(name)
+            self._grams = grams
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.entries)
+
+    def search(self, keyword: str, limit: int = 10) -> List[str]:
+        """子串匹配索引名 (不区分大小写)"""
+        keyword = keyword.lower()
+        if not keyword:
+            return []
+        self._ensure_indexes()
+
+        if len(keyword) < GRAM_SIZE:
+            candidates = (name for name in self._sorted_names if keyword in name)
+            return [name for _, name in zip(range(limit), candidates)]
+
+        postings = sorted((self._grams.get(gram, set()) for gram in _grams(keyword)), key=len)
+        matched = set(postings[0])
+        for posting in postings[1:]:
+            matched &= posting
+            if not matched:
+                return []
+        # 三元组全部命中不代表连续出现，需再校验一次子串
+        return sorted(name for name in matched if keyword in name)[:limit]
+
+    def prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """前缀匹配索引名"""
+        self._ensure_indexes()
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        result = []
+        for name in self._sorted_names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            result.append(name)
+        return result
+
+    def indices_for(self, service: str = None, date: str = None) -> List[str]:
+        """按服务名和/或日期查找索引"""
+        if service and date:
+            return [name for name in self.by_service.get(service, []) if parse_index_name(name)[1] == date]
+        if service:
+            return list(self.by_service.get(service, []))
+        if date:
+            return list(self.by_date.get(date, []))
+        return list(self.entries)
+
+    def services(self) -> List[str]:
+        """全部服务名"""
+        return sorted(service for service, names in self.by_service.items() if names)
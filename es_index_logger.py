@@ -2,64 +2,116 @@
 # -*- coding: utf-8 -*-
 """
 ES索引监控记录工具
-基于es_manager.py的索引查询功能，将结果追加到MD文档中
+基于es_manager.py的索引查询功能，将结果追加到MD文档中；
+--scheduled 为定时任务模式：非交互，按检查点只处理上次之后的日期，失败的日期按退避间隔重试
 """
 
+import argparse
+import contextlib
+import fcntl
 import json
 import requests
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import calendar
 import re
 
+from es_cat_model import IndexTable, cat_indices_endpoint
+from es_history_store import IndexHistoryStore
+from es_metrics import METRICS, Profile, decode_json
+from es_transport import get_transport
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+# 按日期通配合并查询时的最大日期数，超过后改为扫描全部索引
+MAX_RANGE_PATTERNS = 60
+
+# 定时任务的检查点和锁文件
+CHECKPOINT_FILE = "es_index_checkpoint.json"
+LOCK_FILE = "es_index_logger.lock"
+
+# 失败日期的重试: 第N次失败后等待 RETRY_BASE_MINUTES * 2^(N-1) 分钟，最长 RETRY_MAX_MINUTES，
+# 超过 MAX_ATTEMPTS 次后放弃
+RETRY_BASE_MINUTES = 30
+RETRY_MAX_MINUTES = 24 * 60
+MAX_ATTEMPTS = 6
+
+
+def log(message: str):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """读取检查点，文件不存在或损坏时返回空检查点"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        checkpoint = {}
+    checkpoint.setdefault('last_date', None)
+    checkpoint.setdefault('failed', {})
+    checkpoint.setdefault('md_date', None)
+    checkpoint.setdefault('md_size', None)
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    """原子写入检查点，中途退出不会留下写了一半的文件"""
+    checkpoint['updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+
+@contextlib.contextmanager
+def exclusive_lock(path: str):
+    """非阻塞文件锁，已被其它进程持有时返回 False"""
+    with open(path, 'w') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 class ESIndexLogger:
     def __init__(self, es_url: str = "http://192.168.0.93:9201"):
         self.es_url = es_url.rstrip('/')
+        self.transport = get_transport(self.es_url)
         self.md_file = "es_index_monitor.md"
+        self.history_db = "es_index_history.db"
+        self.store = IndexHistoryStore(self.history_db)
+        
+        # 首次使用历史库时导入已有的MD记录
+        if self.store.is_empty() and os.path.exists(self.md_file):
+            imported = self.store.import_markdown(self.md_file)
+            if imported:
+                print(f"📥 已从 {self.md_file} 导入 {imported} 天的历史记录到 {self.history_db}")
     
     def make_request(self, endpoint: str, method: str = "GET", data: dict = None, return_json: bool = True):
         """发送 HTTP 请求到 ES"""
-        url = f"{self.es_url}/{endpoint}"
         try:
-            if method == "GET":
-                response = requests.get(url, timeout=30)
-            elif method == "POST":
-                response = requests.post(url, json=data, timeout=30)
-            else:
+            if method not in ("GET", "POST", "PUT", "DELETE"):
                 raise ValueError(f"不支持的 HTTP 方法: {method}")
+            response = self.transport.request(endpoint, method, data)
             
             response.raise_for_status()
             
             if return_json:
-                return response.json()
+                return decode_json(response)
             else:
                 return response.text
         except requests.exceptions.RequestException as e:
             print(f"请求失败: {e}")
             return {} if return_json else ""
     
-    def convert_size_to_gb(self, size_str: str) -> float:
-        """转换存储大小字符串到GB"""
-        if not size_str or size_str == "0":
-            return 0.0
-        
-        size_str = size_str.lower().strip()
-        if size_str.endswith('gb'):
-            return float(size_str[:-2])
-        elif size_str.endswith('mb'):
-            return float(size_str[:-2]) / 1024
-        elif size_str.endswith('kb'):
-            return float(size_str[:-2]) / (1024 * 1024)
-        elif size_str.endswith('b'):
-            return float(size_str[:-1]) / (1024 * 1024 * 1024)
-        else:
-            try:
-                return float(size_str) / (1024 * 1024 * 1024)
-            except:
-                return 0.0
-    
     def get_weekday_name(self, date_str: str) -> str:
         """获取日期对应的中文星期名称"""
         try:
@@ -83,61 +135,86 @@ class ESIndexLogger:
         
         try:
             # 获取JSON格式的索引信息，按存储大小降序排列
-            indices_data = self.make_request(f"_cat/indices/{pattern}?format=json&h=index,pri,rep,docs.count,store.size&s=store.size:desc")
+            indices_data = self.make_request(cat_indices_endpoint(pattern))
             if not indices_data:
                 return {"error": "无法获取索引数据"}
             
-            # 处理数据
-            processed_data = []
-            for idx in indices_data:
-                index_name = idx.get('index', 'N/A')
-                size_str = idx.get('store.size', '0')
-                size_gb = self.convert_size_to_gb(size_str)
-                primary_shards = int(idx.get('pri', 0))
-                replica_shards = int(idx.get('rep', 0))
-                total_shards = primary_shards + replica_shards
-                docs_count = int(idx.get('docs.count', 0))
-                
-                processed_data.append({
-                    'index': index_name,
-                    'size_gb': size_gb,
-                    'shards': total_shards,
-                    'docs': docs_count
-                })
-            
-            # 统计总计
-            total_size = sum(item['size_gb'] for item in processed_data)
-            total_docs = sum(item['docs'] for item in processed_data)
-            total_shards = sum(item['shards'] for item in processed_data)
-            
-            return {
-                'date': query_date,
-                'query_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'total_indices': len(processed_data),
-                'total_size_gb': total_size,
-                'total_shards': total_shards,
-                'total_docs': total_docs,
-                'indices': processed_data
-            }
+            return self.process_indices_data(indices_data, query_date)
             
         except Exception as e:
             return {"error": f"查询索引信息失败: {e}"}
     
-    def create_md_header_if_not_exists(self):
-        """如果MD文件不存在，创建文件头"""
-        if not os.path.exists(self.md_file):
-            header = """# ES索引监控记录
+    def process_indices_data(self, indices_data: List[Dict[str, Any]], query_date: str) -> Dict[str, Any]:
+        """将 _cat/indices 的原始行整理为单日记录"""
+        # 列式加载，总计在加载时一次遍历完成
+        indices = IndexTable.from_rows(indices_data)
+        
+        return {
+            'date': query_date,
+            'query_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'total_indices': len(indices),
+            'total_size_gb': indices.total_size_gb,
+            'total_shards': indices.total_shards,
+            'total_docs': indices.total_docs,
+            'indices': [indices.row(i) for i in indices.order_by()]
+        }
+    
+    def get_indices_data_range(self, dates: List[str]) -> Dict[str, Dict[str, Any]]:
+        """一次 _cat/indices 请求获取多个日期的索引数据，按索引名中的日期分组"""
+        if not dates:
+            return {}
+        
+        # 日期较少时按日期通配缩小返回量，过多时直接扫描全部索引，避免URL过长
+        if len(dates) <= MAX_RANGE_PATTERNS:
+            pattern = ",".join(f"*{date}*" for date in dates)
+        else:
+            pattern = None
+        
+        indices_data = self.make_request(cat_indices_endpoint(pattern))
+        if not indices_data:
+            # 单次请求失败时回退为按日期并发查询
+            return self.get_indices_data_parallel(dates)
+        
+        # 单次遍历按日期分桶，服务端已按大小降序，桶内顺序保持不变
+        wanted = set(dates)
+        buckets = {date: [] for date in dates}
+        for idx in indices_data:
+            date_match = DATE_PATTERN.search(idx.get('index', ''))
+            if date_match and date_match.group(1) in wanted:
+                buckets[date_match.group(1)].append(idx)
+        
+        results = {}
+        for date in dates:
+            if buckets[date]:
+                results[date] = self.process_indices_data(buckets[date], date)
+            else:
+                results[date] = {"error": "未找到该日期的索引"}
+        return results
+    
+    def get_indices_data_parallel(self, dates: List[str], max_workers: int = 4) -> Dict[str, Dict[str, Any]]:
+        """使用有界线程池按日期并发查询"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {date: executor.submit(self.get_indices_data, f"*{date}*") for date in dates}
+            return {date: future.result() for date, future in futures.items()}
+    
+    def build_md_header(self) -> str:
+        """生成MD文件头"""
+        return """# ES索引监控记录
 
 > 本文档记录Elasticsearch集群的索引监控数据  
 > 自动生成时间: {datetime}  
 > 集群地址: {es_url}
 
 """.format(
-                datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                es_url=self.es_url
-            )
+            datetime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            es_url=self.es_url
+        )
+    
+    def create_md_header_if_not_exists(self):
+        """如果MD文件不存在，创建文件头"""
+        if not os.path.exists(self.md_file):
             with open(self.md_file, 'w', encoding='utf-8') as f:
-                f.write(header)
+                f.write(self.build_md_header())
     
     def append_to_md(self, data: Dict[str, Any]):
         """将数据追加到MD文档"""
@@ -145,10 +222,37 @@ class ESIndexLogger:
             print(f"❌ {data['error']}")
             return
         
+        # 先写入历史库，MD只是历史库的展示视图
+        self.store.save_day(data)
+        
         # 确保MD文件存在
         self.create_md_header_if_not_exists()
         
-        # 准备MD内容
+        # 追加到文件
+        with open(self.md_file, 'a', encoding='utf-8') as f:
+            f.write(self.build_md_section(data))
+        
+        print(f"✅ 数据已成功追加到 {self.md_file}")
+        print(f"📊 记录: {data['total_indices']}个索引, {data['total_size_gb']:.2f}GB, {data['total_docs']:,}个文档")
+    
+    def append_sections_to_md(self, data_list: List[Dict[str, Any]]):
+        """将多天的数据一次性写入MD文档"""
+        if not data_list:
+            return
+        
+        for data in data_list:
+            self.store.save_day(data)
+        
+        self.create_md_header_if_not_exists()
+        
+        content = "".join(self.build_md_section(data) for data in data_list)
+        with open(self.md_file, 'a', encoding='utf-8') as f:
+            f.write(content)
+        
+        print(f"✅ {len(data_list)} 天的数据已写入 {self.md_file}")
+    
+    def build_md_section(self, data: Dict[str, Any]) -> str:
+        """生成单日记录的MD内容"""
         weekday = self.get_weekday_name(data['date'])
         date_display = f"{data['date']} ({weekday})" if weekday else data['date']
         
@@ -170,42 +274,74 @@ class ESIndexLogger:
             display_name = idx['index']
             md_content += f"| {i} | {display_name} | {idx['size_gb']:.2f} | {idx['shards']} | {idx['docs']:,} |\n"
         
-        # 如果还有更多索引，显示省略信息
-        if len(data['indices']) > 20:
-            remaining = len(data['indices']) - 20
+        # 如果还有更多索引，显示省略信息 (从MD导入的历史记录只有TOP20明细，以总数为准)
+        if data['total_indices'] > 20:
+            remaining = data['total_indices'] - 20
             md_content += f"\n*... 还有 {remaining} 个索引（按大小降序排列）*\n"
         
         md_content += "\n---\n\n"
+        return md_content
+    
+    def render_md_from_store(self):
+        """根据历史库重新生成完整的MD报告"""
+        dates = self.store.list_dates()
+        tmp_file = f"{self.md_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(self.build_md_header())
+            for date in dates:
+                f.write(self.build_md_section(self.store.get_day(date)))
+        os.replace(tmp_file, self.md_file)
         
-        # 追加到文件
-        with open(self.md_file, 'a', encoding='utf-8') as f:
-            f.write(md_content)
+        print(f"✅ 已根据 {self.history_db} 重新生成 {self.md_file} ({len(dates)} 天)")
+    
+    def show_recent_records(self, limit: int = 10):
+        """显示历史库中最近的记录"""
+        summaries = self.store.recent_summaries(limit)
+        if not summaries:
+            print("❌ 历史库中暂无记录")
+            return
         
-        print(f"✅ 数据已成功追加到 {self.md_file}")
-        print(f"📊 记录: {data['total_indices']}个索引, {data['total_size_gb']:.2f}GB, {data['total_docs']:,}个文档")
+        print(f"📄 最近 {len(summaries)} 天记录 ({self.history_db}):")
+        print("=" * 80)
+        print(f"{'日期':<12} {'星期':<6} {'索引数':>8} {'大小(GB)':>12} {'分片数':>8} {'文档数':>18}")
+        print("=" * 80)
+        for item in summaries:
+            weekday = self.get_weekday_name(item['date'])
+            print(f"{item['date']:<12} {weekday:<6} {item['total_indices']:>8} {item['total_size_gb']:>12.2f} {item['total_shards']:>8} {item['total_docs']:>18,}")
+        print("=" * 80)
     
-    def parse_latest_date_from_md(self) -> str:
-        """解析MD文件获取最新日期"""
-        if not os.path.exists(self.md_file):
-            return None
+    def show_day_comparison(self, date_a: str, date_b: str, top: int = 10):
+        """对比两天的数据"""
+        result = self.store.compare_days(date_a, date_b)
+        if 'error' in result:
+            print(f"❌ {result['error']}")
+            return
         
-        try:
-            with open(self.md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 查找所有日期格式 ## YYYY-MM-DD
-            date_pattern = r'## (\d{4}-\d{2}-\d{2})'
-            dates = re.findall(date_pattern, content)
-            
-            if not dates:
-                return None
-            
-            # 返回最新的日期（按字符串排序，日期格式YYYY-MM-DD可以直接排序）
-            return max(dates)
-            
-        except Exception as e:
-            print(f"❌ 解析MD文件失败: {e}")
-            return None
+        delta = result['totals_delta']
+        print(f"📊 {date_a} → {date_b} 变化:")
+        print(f"   索引数: {delta['total_indices']:+d}")
+        print(f"   总大小: {delta['total_size_gb']:+.2f} GB")
+        print(f"   分片数: {delta['total_shards']:+d}")
+        print(f"   文档数: {delta['total_docs']:+,}")
+        
+        print(f"\n📈 大小增长 TOP{top}:")
+        for item in result['indices'][:top]:
+            print(f"   {item['series']:<60} {item['size_a']:>8.2f} → {item['size_b']:>8.2f} GB ({item['size_b'] - item['size_a']:+.2f})")
+    
+    def show_index_trend(self, index_name: str, days: int = 30):
+        """显示单个索引序列的历史趋势"""
+        trend = self.store.index_trend(index_name, days)
+        if not trend:
+            print(f"❌ 历史库中没有 {index_name} 的记录")
+            return
+        
+        print(f"📈 {index_name} 最近 {len(trend)} 天趋势:")
+        print("=" * 60)
+        print(f"{'日期':<12} {'大小(GB)':>12} {'分片数':>8} {'文档数':>18}")
+        print("=" * 60)
+        for item in trend:
+            print(f"{item['date']:<12} {item['size_gb']:>12.2f} {item['shards']:>8} {item['docs']:>18,}")
+        print("=" * 60)
     
     def generate_missing_dates(self, start_date: str) -> List[str]:
         """生成从start_date到今天之间缺失的日期列表"""
@@ -230,13 +366,13 @@ class ESIndexLogger:
         """批量查询并追加缺失日期的数据"""
         print("🔍 正在检查缺失的日期...")
         
-        # 获取MD文件中的最新日期
-        latest_date = self.parse_latest_date_from_md()
+        # 获取历史库中的最新日期
+        latest_date = self.store.latest_date()
         if not latest_date:
-            print("❌ 无法从MD文件中找到日期信息，请先手动添加一条记录")
+            print("❌ 历史库中没有记录，请先手动添加一条记录")
             return
         
-        print(f"📅 MD文件中最新日期: {latest_date}")
+        print(f"📅 历史库中最新日期: {latest_date}")
         
         # 生成缺失的日期列表
         missing_dates = self.generate_missing_dates(latest_date)
@@ -252,35 +388,131 @@ class ESIndexLogger:
             print("❌ 操作已取消")
             return
         
-        # 批量查询并追加
-        success_count = 0
-        failed_dates = []
+        # 一次请求获取整个日期范围，再统一写入
+        print(f"\n🔍 正在查询 {missing_dates[0]} 到 {missing_dates[-1]} 的索引...")
+        results = self.get_indices_data_range(missing_dates)
         
-        for i, date in enumerate(missing_dates, 1):
-            print(f"\n🔍 [{i}/{len(missing_dates)}] 正在查询 {date} 的索引...")
-            
-            pattern = f"*{date}*"
-            data = self.get_indices_data(pattern)
-            
+        success_data = []
+        failed_dates = []
+        for date in missing_dates:
+            data = results[date]
             if 'error' in data:
                 print(f"❌ {date}: {data['error']}")
                 failed_dates.append(date)
             else:
-                self.append_to_md(data)
-                success_count += 1
+                print(f"📊 {date}: {data['total_indices']}个索引, {data['total_size_gb']:.2f}GB, {data['total_docs']:,}个文档")
+                success_data.append(data)
+        
+        self.append_sections_to_md(success_data)
         
         # 显示总结
         print("\n" + "="*60)
-        print(f"✅ 补充完成! 成功: {success_count}个, 失败: {len(failed_dates)}个")
+        print(f"✅ 补充完成! 成功: {len(success_data)}个, 失败: {len(failed_dates)}个")
         if failed_dates:
             print(f"❌ 失败的日期: {', '.join(failed_dates)}")
         print("="*60)
     
-    def interactive_mode(self):
-        """交互模式"""
+    def due_dates(self, checkpoint: Dict[str, Any], include_today: bool = False) -> List[str]:
+        """本次需要处理的日期：检查点之后的新日期加上已到重试时间的失败日期"""
+        end_date = datetime.now().date() if include_today else datetime.now().date() - timedelta(days=1)
+        last_date = checkpoint['last_date'] or self.store.latest_date()
+        if last_date:
+            current = datetime.strptime(last_date, "%Y-%m-%d").date() + timedelta(days=1)
+        else:
+            current = end_date  # 首次运行只记录最近一天
+        
+        dates = set()
+        while current <= end_date:
+            dates.add(current.strftime("%Y-%m-%d"))
+            current += timedelta(days=1)
+        
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        dates.update(date for date, info in checkpoint['failed'].items() if info['next_retry'] <= now)
+        return sorted(dates)
+    
+    def record_failure(self, checkpoint: Dict[str, Any], date: str, error: str, max_attempts: int):
+        """记录失败日期和下次重试时间，超过最大次数后放弃"""
+        info = checkpoint['failed'].get(date, {'attempts': 0})
+        attempts = info['attempts'] + 1
+        if attempts >= max_attempts:
+            checkpoint['failed'].pop(date, None)
+            log(f"❌ {date}: {error} (已失败 {attempts} 次，放弃重试)")
+            return
+        
+        delay = min(RETRY_BASE_MINUTES * 2 ** (attempts - 1), RETRY_MAX_MINUTES)
+        next_retry = (datetime.now() + timedelta(minutes=delay)).strftime("%Y-%m-%d %H:%M:%S")
+        checkpoint['failed'][date] = {'attempts': attempts, 'next_retry': next_retry, 'error': error}
+        log(f"⚠️  {date}: {error} (第 {attempts} 次失败，{next_retry} 后重试)")
+    
+    def sync_md(self, checkpoint: Dict[str, Any], saved_dates: List[str]):
+        """按检查点增量更新MD
+        
+        文件大小与上次记录一致且新日期都晚于已写入的日期时只追加新章节；
+        否则 (中途崩溃、手工修改、补到了更早的日期) 根据历史库原子重写整个文件，
+        两种情况都不会产生重复章节
+        """
+        md_size = os.path.getsize(self.md_file) if os.path.exists(self.md_file) else None
+        appendable = (
+            md_size is not None and md_size == checkpoint['md_size']
+            and all(checkpoint['md_date'] and date > checkpoint['md_date'] for date in saved_dates)
+        )
+        
+        if appendable:
+            if saved_dates:
+                with open(self.md_file, 'a', encoding='utf-8') as f:
+                    f.write("".join(self.build_md_section(self.store.get_day(date)) for date in saved_dates))
+                checkpoint['md_date'] = saved_dates[-1]
+                log(f"📝 已追加 {len(saved_dates)} 天到 {self.md_file}")
+        else:
+            self.render_md_from_store()
+            checkpoint['md_date'] = self.store.latest_date()
+        checkpoint['md_size'] = os.path.getsize(self.md_file)
+    
+    def run_scheduled(self, checkpoint_file: str = CHECKPOINT_FILE, max_attempts: int = MAX_ATTEMPTS,
+                      include_today: bool = False) -> bool:
+        """定时任务模式：非交互、增量处理，返回本次是否全部成功"""
+        with exclusive_lock(LOCK_FILE) as locked:
+            if not locked:
+                log("⏭️  另一个记录任务正在运行，本次跳过")
+                return True
+            
+            checkpoint = load_checkpoint(checkpoint_file)
+            dates = self.due_dates(checkpoint, include_today)
+            if not dates:
+                log("✅ 没有需要处理的日期")
+                self.sync_md(checkpoint, [])
+                save_checkpoint(checkpoint_file, checkpoint)
+                return True
+            
+            log(f"🔍 待处理 {len(dates)} 个日期: {dates[0]} 到 {dates[-1]}")
+            results = self.get_indices_data_range(dates)
+            
+            # 先写历史库 (按日期覆盖，重复执行幂等)，再更新MD，最后保存检查点
+            saved_dates = []
+            for date in dates:
+                data = results[date]
+                if 'error' in data:
+                    self.record_failure(checkpoint, date, data['error'], max_attempts)
+                    continue
+                self.store.save_day(data)
+                checkpoint['failed'].pop(date, None)
+                saved_dates.append(date)
+                log(f"📊 {date}: {data['total_indices']}个索引, {data['total_size_gb']:.2f}GB, {data['total_docs']:,}个文档")
+            
+            self.sync_md(checkpoint, saved_dates)
+            checkpoint['last_date'] = max(filter(None, [checkpoint['last_date'], dates[-1]]))
+            save_checkpoint(checkpoint_file, checkpoint)
+            
+            log(f"{'✅' if len(saved_dates) == len(dates) else '⚠️'} 完成: 成功 {len(saved_dates)}/{len(dates)}, "
+                f"待重试 {len(checkpoint['failed'])} 个日期")
+            return len(saved_dates) == len(dates)
+    
+    def interactive_mode(self, profile: bool = False):
+        """交互模式，profile=True 时每个操作执行后显示耗时分析"""
         print("🚀 ES索引监控记录工具")
         print(f"连接地址: {self.es_url}")
         print(f"输出文件: {self.md_file}")
+        print(f"历史库: {self.history_db}")
         print("-" * 60)
         
         while True:
@@ -288,56 +520,61 @@ class ESIndexLogger:
             print("1. 查询今天的索引并追加到MD")
             print("2. 查询指定日期的索引并追加到MD")
             print("3. 自动补充缺失日期的数据")
-            print("4. 查看MD文档内容")
+            print("4. 查看最近记录")
+            print("5. 对比两天的数据")
+            print("6. 查看索引历史趋势")
+            print("7. 根据历史库重新生成MD")
             print("0. 退出")
             
             try:
-                choice = input("请选择 [0-4]: ").strip()
+                choice = input("请选择 [0-7]: ").strip()
                 
                 if choice == "0":
                     print("👋 再见!")
                     break
-                elif choice == "1":
-                    print("🔍 正在查询今天的索引...")
-                    data = self.get_indices_data()
-                    self.append_to_md(data)
-                elif choice == "2":
-                    date_input = input("请输入日期 (格式: YYYY-MM-DD): ").strip()
-                    if not date_input:
-                        print("❌ 日期不能为空")
-                        continue
+                
+                with Profile(profile) as timer:
+                    if choice == "1":
+                        print("🔍 正在查询今天的索引...")
+                        data = self.get_indices_data()
+                        self.append_to_md(data)
+                    elif choice == "2":
+                        date_input = timer.input("请输入日期 (格式: YYYY-MM-DD): ").strip()
+                        if not date_input:
+                            print("❌ 日期不能为空")
+                            continue
                     
-                    # 验证日期格式
-                    try:
-                        datetime.strptime(date_input, "%Y-%m-%d")
-                    except ValueError:
-                        print("❌ 日期格式错误，请使用 YYYY-MM-DD 格式")
-                        continue
+                        # 验证日期格式
+                        try:
+                            datetime.strptime(date_input, "%Y-%m-%d")
+                        except ValueError:
+                            print("❌ 日期格式错误，请使用 YYYY-MM-DD 格式")
+                            continue
                     
-                    pattern = f"*{date_input}*"
-                    print(f"🔍 正在查询 {date_input} 的索引...")
-                    data = self.get_indices_data(pattern)
-                    self.append_to_md(data)
-                elif choice == "3":
-                    self.batch_append_missing_dates()
-                elif choice == "4":
-                    if os.path.exists(self.md_file):
-                        print(f"📄 MD文档内容预览 ({self.md_file}):")
-                        print("=" * 60)
-                        with open(self.md_file, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            # 显示前500个字符
-                            if len(content) > 500:
-                                print(content[:500] + "...")
-                                print(f"\n... 文档共 {len(content)} 字符，完整内容请查看文件")
-                            else:
-                                print(content)
+                        pattern = f"*{date_input}*"
+                        print(f"🔍 正在查询 {date_input} 的索引...")
+                        data = self.get_indices_data(pattern)
+                        self.append_to_md(data)
+                    elif choice == "3":
+                        self.batch_append_missing_dates()
+                    elif choice == "4":
+                        self.show_recent_records()
+                    elif choice == "5":
+                        date_a = timer.input("请输入对比基准日期 (格式: YYYY-MM-DD): ").strip()
+                        date_b = timer.input("请输入对比目标日期 (格式: YYYY-MM-DD): ").strip()
+                        self.show_day_comparison(date_a, date_b)
+                    elif choice == "6":
+                        index_name = timer.input("请输入索引名称 (可不带日期，如 logstash-loghub-logs-iroom-prd): ").strip()
+                        if not index_name:
+                            print("❌ 索引名称不能为空")
+                            continue
+                        self.show_index_trend(index_name)
+                    elif choice == "7":
+                        self.render_md_from_store()
                     else:
-                        print("❌ MD文档不存在")
-                else:
-                    print("❌ 无效选择，请重新输入")
+                        print("❌ 无效选择，请重新输入")
                 
-                if choice in ["1", "2", "3", "4"]:
+                if choice in ["1", "2", "3", "4", "5", "6", "7"]:
                     input("\n按回车键继续...")
                 
             except KeyboardInterrupt:
@@ -349,36 +586,56 @@ class ESIndexLogger:
 
 def main():
     """主函数"""
-    if len(sys.argv) > 1:
-        es_url = sys.argv[1]
-    else:
-        es_url = "http://192.168.0.93:9201"
+    parser = argparse.ArgumentParser(description="ES索引监控记录工具")
+    parser.add_argument("es_url", nargs="?", default="http://192.168.0.93:9201", help="ES地址")
+    parser.add_argument("date", nargs="?", help="直接查询并追加指定日期 (YYYY-MM-DD)")
+    parser.add_argument("--scheduled", action="store_true", help="定时任务模式: 非交互、按检查点增量处理、失败重试")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help=f"检查点文件 (默认{CHECKPOINT_FILE})")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help=f"单个日期最多尝试次数 (默认{MAX_ATTEMPTS})")
+    parser.add_argument("--include-today", action="store_true", help="定时任务模式下同时记录今天 (默认只记录到昨天)")
+    parser.add_argument("--profile", action="store_true", help="每个操作执行后显示耗时分析 (ES端/网络/JSON解析/Python处理)")
+    parser.add_argument("--metrics", help="退出时把请求统计写入文件 (.json 为JSON，否则为 Prometheus 文本)")
+    args = parser.parse_args()
     
+    es_url = args.es_url
     logger = ESIndexLogger(es_url)
     
     try:
         # 测试连接
-        health = logger.make_request("_cluster/health")
+        health = logger.make_request("_cluster/health?filter_path=status")
         if not health:
             print(f"❌ 无法连接到 Elasticsearch: {es_url}")
+            if args.scheduled:
+                sys.exit(1)
             return
         
+        if args.scheduled:
+            with Profile(args.profile):
+                ok = logger.run_scheduled(args.checkpoint, args.max_attempts, args.include_today)
+            if not ok:
+                sys.exit(1)
         # 如果提供了第二个参数作为日期，直接查询并追加
-        if len(sys.argv) > 2:
-            date_param = sys.argv[2]
+        elif args.date:
+            date_param = args.date
             try:
                 datetime.strptime(date_param, "%Y-%m-%d")
                 pattern = f"*{date_param}*"
                 print(f"🔍 查询 {date_param} 的索引...")
-                data = logger.get_indices_data(pattern)
-                logger.append_to_md(data)
+                with Profile(args.profile):
+                    data = logger.get_indices_data(pattern)
+                    logger.append_to_md(data)
             except ValueError:
                 print("❌ 日期格式错误，请使用 YYYY-MM-DD 格式")
         else:
-            logger.interactive_mode()
+            logger.interactive_mode(args.profile)
             
     except Exception as e:
         print(f"❌ 启动失败: {e}")
+        if args.scheduled:
+            sys.exit(1)
+    finally:
+        if args.metrics:
+            METRICS.write(args.metrics)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
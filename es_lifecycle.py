@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES索引生命周期工具
+替代 es定时任务/ 下的关闭/删除脚本：
+基于一次 _cat/indices 快照规划关闭和删除操作，按URL长度打包索引名批量执行，
+批次并发执行，部分失败时只重试失败的索引。
+默认只处理阈值当天的索引 (与原 curl 脚本一致)，--catch-up 时才补处理更早漏掉的索引
+"""
+
+import argparse
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
+
+from es_cat_model import to_int
+from es_manager import ESManager
+from es_transport import DEFAULT_ES_URL, pack_index_names
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+ACTIONS = ("close", "delete")
+
+
+def log(message: str):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+class LifecycleEngine:
+    def __init__(self, manager: ESManager, max_workers: int = 4, max_retries: int = 3):
+        self.manager = manager
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """一次请求获取全部索引的名称、状态和创建时间"""
+        return self.manager.make_request("_cat/indices?format=json&h=index,status,creation.date") or []
+
+    def plan(self, rows: List[Dict[str, Any]], close_days: int = None, delete_days: int = None,
+             catch_up: bool = False) -> Dict[str, List[Tuple[str, str]]]:
+        """按索引名中的日期规划操作，返回 {操作: [(索引名, 日期), ...]}，最早创建的排在前面
+
+        默认只匹配阈值当天的日期，catch_up 为 True 时匹配阈值当天及更早的日期
+        """
+        today = datetime.now()
+        close_before = (today - timedelta(days=close_days)).strftime("%Y-%m-%d") if close_days else None
+        delete_before = (today - timedelta(days=delete_days)).strftime("%Y-%m-%d") if delete_days else None
+
+        def due(index_date: str, threshold: str) -> bool:
+            if not threshold:
+                return False
+            return index_date <= threshold if catch_up else index_date == threshold
+
+        planned = {action: [] for action in ACTIONS}
+        for row in sorted(rows, key=lambda r: to_int(r.get('creation.date'))):
+            index_name = row.get('index', '')
+            date_match = DATE_PATTERN.search(index_name)
+            if not date_match:
+                continue
+
+            index_date = date_match.group(1)
+            if due(index_date, delete_before):
+                planned["delete"].append((index_name, index_date))
+            elif due(index_date, close_before) and row.get('status') == 'open':
+                planned["close"].append((index_name, index_date))
+        return planned
+
+    def _run_batch(self, action: str, batch: List[str]) -> List[str]:
+        """执行一个批次，返回失败的索引名"""
+        joined = ",".join(batch)
+        if action == "close":
+            result = self.manager.make_request(f"{joined}/_close?ignore_unavailable=true", "POST")
+        else:
+            result = self.manager.make_request(f"{joined}?ignore_unavailable=true", "DELETE")
+
+        if result.get('acknowledged'):
+            # 7.x 的关闭接口会返回每个索引的结果
+            per_index = result.get('indices', {})
+            return [name for name in batch if per_index.get(name, {}).get('closed') is False]
+        return self._still_pending(action, batch)
+
+    def _still_pending(self, action: str, names: List[str]) -> List[str]:
+        """批次失败时查询这些索引的当前状态，找出仍需处理的索引"""
+        rows = self.manager.make_request(
+            f"_cat/indices/{','.join(names)}?format=json&h=index,status&ignore_unavailable=true"
+        )
+        if not isinstance(rows, list):
+            return list(names)
+
+        status = {row.get('index'): row.get('status') for row in rows}
+        if action == "close":
+            return [name for name in names if status.get(name) == 'open']
+        return [name for name in names if name in status]
+
+    def execute(self, action: str, names: List[str]) -> Dict[str, Any]:
+        """分批并发执行操作，失败的索引重新打包后重试"""
+        pending = list(names)
+        attempt = 0
+        while pending and attempt <= self.max_retries:
+            if attempt:
+                delay = 2 ** attempt
+                log(f"🔁 第 {attempt} 次重试 {len(pending)} 个失败的索引 ({delay}秒后)...")
+                time.sleep(delay)
+
+            batches = pack_index_names(pending)
+            log(f"📦 {action}: {len(pending)} 个索引分为 {len(batches)} 批，并发 {min(self.max_workers, len(batches))}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                failed_lists = list(executor.map(lambda batch: self._run_batch(action, batch), batches))
+
+            pending = [name for failed in failed_lists for name in failed]
+            attempt += 1
+
+        return {'total': len(names), 'success': len(names) - len(pending), 'failed': pending}
+
+
+def print_plan(action: str, items: List[Tuple[str, str]]):
+    """显示待执行的操作，按日期分组统计"""
+    log(f"📋 待{'关闭' if action == 'close' else '删除'}索引: {len(items)} 个")
+    if not items:
+        return
+    by_date: Dict[str, int] = {}
+    for _, index_date in items:
+        by_date[index_date] = by_date.get(index_date, 0) + 1
+    for index_date in sorted(by_date):
+        log(f"  {index_date}: {by_date[index_date]}个索引")
+
+
+def parse_selection(text: str, count: int) -> List[int]:
+    """解析行号选择 (如: 1 3 5-8)，返回从0开始的下标，超出范围的行号忽略"""
+    selected = []
+    for part in text.split():
+        match = re.match(r'^(\d+)(?:-(\d+))?$', part)
+        if not match:
+            continue
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        for number in range(start, end + 1):
+            if 1 <= number <= count and number - 1 not in selected:
+                selected.append(number - 1)
+    return selected
+
+
+def print_commands(es_url: str, action: str, names: List[str]):
+    """显示等价的 curl 命令，不执行"""
+    for batch in pack_index_names(names):
+        joined = ",".join(batch)
+        if action == "close":
+            print(f"curl -XPOST \"{es_url}/{joined}/_close\" -H \"Content-Type: application/json\" -d'{{}}'")
+        else:
+            print(f"curl -XDELETE \"{es_url}/{joined}\"")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES索引关闭/删除")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("--action", choices=("close", "delete", "all"), default="all", help="执行的操作 (默认all)")
+    parser.add_argument("--close-days", type=int, default=42, help="关闭N天前当天的索引 (默认42)")
+    parser.add_argument("--delete-days", type=int, default=180, help="删除N天前当天的索引 (默认180)")
+    parser.add_argument("--catch-up", action="store_true", help="同时处理阈值日期之前漏掉的索引")
+    parser.add_argument("--workers", type=int, default=4, help="并发批次数 (默认4)")
+    parser.add_argument("--dry-run", action="store_true", help="只显示计划，不执行")
+    parser.add_argument("--list", action="store_true", help="显示计划中的每个索引名 (带行号)")
+    parser.add_argument("--select", action="store_true", help="按行号选择要处理的索引 (如: 1 3 5-8)")
+    parser.add_argument("--print-commands", action="store_true", help="只显示等价的 curl 命令，不执行")
+    parser.add_argument("-y", "--yes", action="store_true", help="跳过确认 (定时任务使用)")
+    args = parser.parse_args()
+
+    engine = LifecycleEngine(ESManager(args.es_url), max_workers=args.workers)
+    rows = engine.snapshot()
+    if not rows:
+        log(f"❌ 无法获取索引列表: {args.es_url}")
+        return
+
+    planned = engine.plan(
+        rows,
+        close_days=args.close_days if args.action in ("close", "all") else None,
+        delete_days=args.delete_days if args.action in ("delete", "all") else None,
+        catch_up=args.catch_up,
+    )
+    actions = [action for action in ACTIONS if planned[action]]
+    log(f"📊 快照共 {len(rows)} 个索引")
+    number = 0
+    for action in ACTIONS:
+        if args.action in (action, "all"):
+            print_plan(action, planned[action])
+            if args.list or args.select:
+                for index_name, index_date in planned[action]:
+                    number += 1
+                    log(f"  {number:>5}  {index_name} ({index_date})")
+
+    if not actions:
+        log("✅ 没有需要处理的索引")
+        return
+    if args.dry_run:
+        return
+    if args.print_commands:
+        for action in actions:
+            print_commands(args.es_url, action, [name for name, _ in planned[action]])
+        return
+    if args.select:
+        items = [(action, item) for action in actions for item in planned[action]]
+        chosen = parse_selection(input("请输入要处理的索引行号 (如: 1 3 5-8): "), len(items))
+        if not chosen:
+            log("❌ 未选择任何索引")
+            return
+        planned = {action: [items[i][1] for i in chosen if items[i][0] == action] for action in ACTIONS}
+        actions = [action for action in ACTIONS if planned[action]]
+        log(f"📋 已选择 {len(chosen)} 个索引")
+    if not args.yes:
+        confirm = input("确认执行以上操作? (y/N): ").strip().lower()
+        if confirm not in ['y', 'yes']:
+            log("❌ 操作已取消")
+            return
+
+    for action in actions:
+        start_time = time.time()
+        result = engine.execute(action, [name for name, _ in planned[action]])
+        log(f"{'✅' if not result['failed'] else '⚠️'} {action}: 成功 {result['success']}/{result['total']}, "
+              f"耗时 {time.time() - start_time:.1f}秒")
+        if result['failed']:
+            log(f"❌ 失败的索引: {', '.join(result['failed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志流式导出
+使用 Point in Time + search_after 分页 (需 ES 7.12+)，逐页写入 NDJSON/CSV，
+内存占用与命中总数无关；可按 slice 拆分由多个线程并行拉取
+"""
+
+import csv
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
+
+DEFAULT_CSV_FIELDS = ["@timestamp", "level", "message"]
+
+
+def get_field(source: Dict[str, Any], field: str) -> Any:
+    """按 a.b.c 形式读取嵌套字段"""
+    value = source
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class LogExporter:
+    def __init__(self, manager, page_size: int = 1000, keep_alive: str = "5m"):
+        self.manager = manager
+        self.page_size = page_size
+        self.keep_alive = keep_alive
+
+    def open_pit(self, index_pattern: str) -> str:
+        """创建 Point in Time，返回 PIT ID"""
+        result = self.manager.make_request(f"{index_pattern}/_pit?keep_alive={self.keep_alive}", "POST")
+        if not result or 'id' not in result:
+            raise RuntimeError(f"创建 PIT 失败: {index_pattern}")
+        return result['id']
+
+    def close_pit(self, pit_id: str):
+        """释放 Point in Time"""
+        self.manager.make_request("_pit", "DELETE", {"id": pit_id})
+
+    def build_query(self, query: str) -> Dict[str, Any]:
+        """构建与 search_logs 一致的查询条件"""
+        return {
+            "query_string": {
+                "query": query,
+                "default_field": "message"
+            }
+        }
+
+    def iter_hits(self, pit_id: str, query: str = "*", source_includes: List[str] = None,
+                  slice_id: int = None, max_slices: int = None) -> Iterator[Dict[str, Any]]:
+        """按 search_after 逐页拉取命中文档，每次只持有一页数据"""
+        body = {
+            "query": self.build_query(query),
+            "size": self.page_size,
+            "pit": {"id": pit_id, "keep_alive": self.keep_alive},
+            # _shard_doc 作为唯一的排序兜底，保证翻页不重复不遗漏
+            "sort": [{"@timestamp": {"order": "desc"}}, {"_shard_doc": "desc"}],
+            "_source": source_includes if source_includes else True,
+            "track_total_hits": False,
+        }
+        if max_slices and max_slices > 1:
+            body["slice"] = {"id": slice_id, "max": max_slices}
+
+        while True:
+            result = self.manager.make_request("_search?filter_path=pit_id,hits.hits._source,hits.hits.sort", "POST", body)
+            if not result:
+                raise RuntimeError("分页查询失败")
+
+            hits = result.get("hits", {}).get("hits", [])
+            if not hits:
+                return
+
+            for hit in hits:
+                yield hit
+
+            if len(hits) < self.page_size:
+                return
+
+            body["search_after"] = hits[-1]["sort"]
+            # PIT ID 在翻页过程中可能变化，始终使用最新的
+            body["pit"]["id"] = result.get("pit_id", body["pit"]["id"])
+
+    def format_page(self, hits: List[Dict[str, Any]], fmt: str, fields: Optional[List[str]]) -> str:
+        """将一页命中文档格式化为 NDJSON 或 CSV 文本"""
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for hit in hits:
+                source = hit.get("_source", {})
+                writer.writerow([get_field(source, field) for field in fields])
+            return buffer.getvalue()
+
+        return "".join(json.dumps(hit.get("_source", {}), ensure_ascii=False) + "\n" for hit in hits)
+
+    def export(self, index_pattern: str, output_path: str, query: str = "*", fmt: str = "ndjson",
+               fields: List[str] = None, slices: int = 1) -> int:
+        """导出查询结果到文件，返回导出条数"""
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        if fmt == "csv" and not fields:
+            fields = DEFAULT_CSV_FIELDS
+
+        pit_id = self.open_pit(index_pattern)
+        lock = threading.Lock()
+        counter = {"count": 0}
+
+        try:
+            with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                if fmt == "csv":
+                    csv.writer(f).writerow(fields)
+
+                def run(slice_id: int = None) -> int:
+                    exported = 0
+                    page = []
+                    for hit in self.iter_hits(pit_id, query, fields, slice_id, slices):
+                        page.append(hit)
+                        if len(page) >= self.page_size:
+                            exported += self._write_page(f, lock, counter, page, fmt, fields)
+                            page = []
+                    if page:
+                        exported += self._write_page(f, lock, counter, page, fmt, fields)
+                    return exported
+
+                if slices <= 1:
+                    run()
+                else:
+                    with ThreadPoolExecutor(max_workers=slices) as executor:
+                        for future in [executor.submit(run, slice_id) for slice_id in range(slices)]:
+                            future.result()
+        finally:
+            self.close_pit(pit_id)
+
+        return counter["count"]
+
+    def _write_page(self, f, lock: threading.Lock, counter: Dict[str, int], page: List[Dict[str, Any]],
+                    fmt: str, fields: Optional[List[str]]) -> int:
+        text = self.format_page(page, fmt, fields)
+        with lock:
+            f.write(text)
+            counter["count"] += len(page)
+            if counter["count"] // 10000 != (counter["count"] - len(page)) // 10000:
+                print(f"   已导出 {counter['count']:,} 条...")
+        return len(page)
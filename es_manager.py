@@ -5,72 +5,124 @@ Elasticsearch 管理工具
 提供集群状态检查、索引查询、分片信息等功能
 """
 
-import json
+import argparse
 import requests
-import os
-import sys
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional
+
+from es_cat_model import (
+    BYTES_PER_GB, IndexTable, ShardTable, ShardSummary, cat_indices_endpoint, cat_shards_endpoint, format_bytes
+)
+from es_clusters import load_clusters, run_command
+from es_index_catalog import IndexCatalog
+from es_log_export import LogExporter
+from es_node_sampler import NodeSampler
+from es_metrics import METRICS, Profile, decode_json, stream_json_array
+from es_request_spec import RequestSpec
+from es_transport import get_transport
+
+# 各命令用到的字段，只传输和解析这些数据
+REQUEST_SPECS = {
+    "health": RequestSpec("_cluster/health", fields=[
+        "cluster_name", "status", "number_of_nodes", "number_of_data_nodes", "active_shards",
+        "active_primary_shards", "relocating_shards", "initializing_shards", "unassigned_shards",
+    ]),
+    "nodes_stats": RequestSpec("_nodes/stats/os,jvm,fs", fields=[
+        "nodes.*.name",
+        "nodes.*.os.cpu.percent",
+        "nodes.*.os.cpu.load_average",
+        "nodes.*.os.mem.total_in_bytes",
+        "nodes.*.os.mem.free_in_bytes",
+        "nodes.*.jvm.mem.heap_used_in_bytes",
+        "nodes.*.jvm.mem.heap_max_in_bytes",
+        "nodes.*.fs.total.total_in_bytes",
+        "nodes.*.fs.total.available_in_bytes",
+    ]),
+    "cluster_load": RequestSpec("_nodes/stats/os,jvm,thread_pool", fields=[
+        "nodes.*.os.cpu.percent",
+        "nodes.*.jvm.mem.heap_used_percent",
+        "nodes.*.thread_pool.force_merge.queue",
+        "nodes.*.thread_pool.force_merge.active",
+    ]),
+    "task": RequestSpec("_tasks/{target}", fields=["completed", "error", "response", "task.status"]),
+    "search": RequestSpec("{target}/_search", fields=["took", "hits.total", "hits.hits._source"], method="POST"),
+}
+
+# search_logs 显示用到的 _source 字段
+LOG_SOURCE_FIELDS = ["@timestamp", "message", "level", "log_level"]
 
 class ESManager:
     def __init__(self, es_url: str = "http://192.168.0.93:9201"):
         self.es_url = es_url.rstrip('/')
+        self.transport = get_transport(self.es_url)
         self.cache_file = ".es_indices_cache.json"
-        self.indices_cache = self.load_indices_cache()
-    
-    def load_indices_cache(self) -> Dict[str, Any]:
-        """加载本地缓存的索引信息"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"加载缓存失败: {e}")
-        return {"indices": [], "last_update": ""}
+        self.catalog = IndexCatalog(self.cache_file)
     
-    def save_indices_cache(self, indices: List[str]):
-        """保存索引信息到本地缓存"""
-        cache_data = {
-            "indices": indices,
-            "last_update": datetime.now().isoformat()
-        }
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存缓存失败: {e}")
+    def refresh_indices_cache(self, force: bool = False):
+        """刷新本地索引名称目录 (超过有效期或强制刷新时才请求ES)"""
+        if not force and not self.catalog.is_expired():
+            return
+        added, removed = self.catalog.refresh(self.make_request)
+        print(f"🔄 索引目录已刷新: 共 {len(self.catalog)} 个索引 (新增 {added}, 移除 {removed})")
     
     def make_request(self, endpoint: str, method: str = "GET", data: dict = None, return_json: bool = True):
         """发送 HTTP 请求到 ES"""
-        url = f"{self.es_url}/{endpoint}"
         try:
-            if method == "GET":
-                response = requests.get(url, timeout=30)
-            elif method == "POST":
-                response = requests.post(url, json=data, timeout=30)
-            else:
+            if method not in ("GET", "POST", "PUT", "DELETE"):
                 raise ValueError(f"不支持的 HTTP 方法: {method}")
+            response = self.transport.request(endpoint, method, data)
             
             response.raise_for_status()
             
             if return_json:
-                return response.json()
+                return decode_json(response)
             else:
                 return response.text
         except requests.exceptions.RequestException as e:
             print(f"请求失败: {e}")
             return {} if return_json else ""
     
-    def check_cluster_health(self):
-        """检查集群健康状态"""
+    def stream_request(self, endpoint: str) -> Iterator[Dict[str, Any]]:
+        """流式请求返回JSON数组的接口 (如 _cat/shards)，逐个产出元素，异常由调用方处理"""
+        with self.transport.request(endpoint, stream=True) as response:
+            response.raise_for_status()
+            yield from stream_json_array(response)
+    
+    def request(self, name: str, target: str = None, data: dict = None, **params):
+        """按 REQUEST_SPECS 中的声明发送请求"""
+        spec = REQUEST_SPECS[name]
+        return self.make_request(spec.endpoint(target, **params), spec.method, data)
+    
+    def fetch_concurrently(self, endpoints: Dict[str, str]) -> Dict[str, Any]:
+        """并发请求多个接口，返回 {名称: 响应}，总耗时取决于最慢的一个请求"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(endpoints))) as executor:
+            futures = {name: executor.submit(self.make_request, endpoint)
+                       for name, endpoint in endpoints.items()}
+            for name, future in futures.items():
+                results[name] = future.result()
+        return results
+    
+    def check_cluster_health(self) -> Dict[str, Any]:
+        """检查集群健康状态，返回健康信息供多集群汇总使用"""
+        health = self.request("health")
+        if not self._render_cluster_health(health):
+            return health
+        
+        # 添加今天的索引和分片统计
+        self.show_today_stats()
+        return health
+    
+    def _render_cluster_health(self, health: Dict[str, Any]) -> bool:
+        """显示集群健康状态，无数据时返回 False"""
         print("=" * 60)
         print("🔍 集群健康状态检查")
         print("=" * 60)
         
-        health = self.make_request("_cluster/health")
         if not health:
-            return
+            return False
         
         status_colors = {
             "green": "🟢",
@@ -90,51 +142,46 @@ class ESManager:
         
         if health.get('unassigned_shards', 0) > 0:
             print("⚠️  警告: 存在未分配的分片")
-            
-        # 添加今天的索引和分片统计
-        self.show_today_stats()
+        return True
     
     def show_today_stats(self):
         """显示今天的索引和分片统计"""
         today = datetime.now().strftime("%Y-%m-%d")
+        indices_response = self.make_request(cat_indices_endpoint(f"*{today}*", sort=None))
+        shards_response = self.make_request(cat_shards_endpoint(f"*{today}*"))
+        self._render_today_stats(today, indices_response, shards_response)
+    
+    def _render_today_stats(self, today: str, indices_response: List[Dict[str, Any]],
+                            shards_response: List[Dict[str, Any]]):
+        """显示今日索引和分片统计"""
         print(f"\n📅 今日统计 ({today}):")
         print("-" * 40)
         
         try:
-            # 获取今天的索引
-            indices_response = self.make_request(f"_cat/indices/*{today}*?format=json")
             if indices_response:
-                total_indices = len(indices_response)
+                indices = IndexTable.from_rows(indices_response)
                 
                 # 统计不同类型的索引
-                logs_count = len([idx for idx in indices_response if 'logstash-loghub-logs-' in idx.get('index', '')])
-                error_count = len([idx for idx in indices_response if 'logstash-loghub-error-' in idx.get('index', '')])
+                logs_count = sum(1 for name in indices.names if 'logstash-loghub-logs-' in name)
+                error_count = sum(1 for name in indices.names if 'logstash-loghub-error-' in name)
                 
-                print(f"📋 索引总数: {total_indices}")
+                print(f"📋 索引总数: {len(indices)}")
                 print(f"   ├─ 日志索引: {logs_count}")
                 print(f"   └─ 错误索引: {error_count}")
                 
                 # 统计文档数和存储大小
-                total_docs = sum(int(idx.get('docs.count', 0)) for idx in indices_response if idx.get('docs.count', '0').isdigit())
-                print(f"📄 文档总数: {total_docs:,}")
+                print(f"📄 文档总数: {indices.total_docs:,}")
+                print(f"💾 存储总量: {indices.total_size_gb:.2f} GB")
                 
-            # 获取今天的分片信息
-            shards_response = self.make_request(f"_cat/shards/*{today}*?format=json")
             if shards_response:
-                total_shards = len(shards_response)
-                primary_shards = len([s for s in shards_response if s.get('prirep') == 'p'])
-                replica_shards = len([s for s in shards_response if s.get('prirep') == 'r'])
+                shards = ShardTable.from_rows(shards_response)
                 
-                print(f"🔧 分片总数: {total_shards}")
-                print(f"   ├─ 主分片: {primary_shards}")
-                print(f"   └─ 副本分片: {replica_shards}")
+                print(f"🔧 分片总数: {len(shards)}")
+                print(f"   ├─ 主分片: {shards.primary_count}")
+                print(f"   └─ 副本分片: {shards.replica_count}")
                 
                 # 分片状态统计
-                states = {}
-                for shard in shards_response:
-                    state = shard.get('state', 'unknown')
-                    states[state] = states.get(state, 0) + 1
-                
+                states = shards.state_counts
                 if len(states) > 1 or 'STARTED' not in states:
                     print("🔍 分片状态:")
                     for state, count in states.items():
@@ -146,29 +193,8 @@ class ESManager:
         except Exception as e:
             print(f"❌ 获取今日统计失败: {e}")
     
-    def convert_size_to_gb(self, size_str: str) -> float:
-        """转换存储大小字符串到GB"""
-        if not size_str or size_str == "0":
-            return 0.0
-        
-        size_str = size_str.lower().strip()
-        if size_str.endswith('gb'):
-            return float(size_str[:-2])
-        elif size_str.endswith('mb'):
-            return float(size_str[:-2]) / 1024
-        elif size_str.endswith('kb'):
-            return float(size_str[:-2]) / (1024 * 1024)
-        elif size_str.endswith('b'):
-            return float(size_str[:-1]) / (1024 * 1024 * 1024)
-        else:
-            # 尝试直接转换为数字（假设是字节）
-            try:
-                return float(size_str) / (1024 * 1024 * 1024)
-            except:
-                return 0.0
-    
-    def get_indices_info(self, pattern: str = None, refresh_cache: bool = False):
-        """获取索引信息"""
+    def get_indices_info(self, pattern: str = None, refresh_cache: bool = False) -> Optional[IndexTable]:
+        """获取索引信息，返回索引表供多集群汇总使用"""
         print("=" * 60)
         print("📋 索引信息查询")
         print("=" * 60)
@@ -181,47 +207,38 @@ class ESManager:
         else:
             print(f"查询模式: {pattern}")
         
+        if refresh_cache:
+            self.refresh_indices_cache(force=True)
+        
         try:
-            # 获取JSON格式的索引信息，按存储大小降序排列
-            indices_data = self.make_request(f"_cat/indices/{pattern}?format=json&h=index,pri,rep,docs.count,store.size&s=store.size:desc")
+            # 获取JSON格式的索引信息 (字节为单位)，按存储大小降序排列
+            indices_data = self.make_request(cat_indices_endpoint(pattern))
             if not indices_data:
                 print("❌ 无法获取索引数据")
                 return
             
-            print(f"\n找到 {len(indices_data)} 个索引:")
+            indices = IndexTable.from_rows(indices_data)
+            
+            print(f"\n找到 {len(indices)} 个索引:")
             print("=" * 100)
             print(f"{'序号':<4} {'索引名称':<60} {'大小(GB)':<12} {'分片数':<8} {'文档数':<15}")
             print("=" * 100)
             
-            for i, idx in enumerate(indices_data, 1):
-                index_name = idx.get('index', 'N/A')
-                size_str = idx.get('store.size', '0')
-                size_gb = self.convert_size_to_gb(size_str)
-                primary_shards = int(idx.get('pri', 0))
-                replica_shards = int(idx.get('rep', 0))
-                total_shards = primary_shards + replica_shards
-                docs_count = int(idx.get('docs.count', 0))
-                
+            # 只显示前20个，避免输出过多
+            for rank, i in enumerate(indices.top_n(20), 1):
                 # 截断过长的索引名称
-                display_name = index_name[:60] if len(index_name) > 60 else index_name
-                
-                print(f"{i:<4} {display_name:<60} {size_gb:>10.2f}  {total_shards:>6}   {docs_count:>13,}")
-                
-                # 只显示前20个，避免输出过多
-                if i >= 20:
-                    remaining = len(indices_data) - 20
-                    if remaining > 0:
-                        print(f"... 还有 {remaining} 个索引（按大小降序排列）")
-                    break
+                display_name = indices.names[i][:60]
+                print(f"{rank:<4} {display_name:<60} {indices.size_gb(i):>10.2f}  {indices.shards(i):>6}   {indices.docs[i]:>13,}")
             
-            print("=" * 100)
+            remaining = len(indices) - 20
+            if remaining > 0:
+                print(f"... 还有 {remaining} 个索引（按大小降序排列）")
             
-            # 统计总计
-            total_size = sum(self.convert_size_to_gb(idx.get('store.size', '0')) for idx in indices_data)
-            total_docs = sum(int(idx.get('docs.count', 0)) for idx in indices_data)
-            total_shards = sum(int(idx.get('pri', 0)) + int(idx.get('rep', 0)) for idx in indices_data)
+            print("=" * 100)
             
-            print(f"📊 总计: {len(indices_data)} 个索引, {total_size:.2f} GB, {total_shards} 个分片, {total_docs:,} 个文档")
+            # 统计总计 (加载时已累计)
+            print(f"📊 总计: {len(indices)} 个索引, {indices.total_size_gb:.2f} GB, {indices.total_shards} 个分片, {indices.total_docs:,} 个文档")
+            return indices
             
         except Exception as e:
             print(f"❌ 查询索引信息失败: {e}")
@@ -240,64 +257,22 @@ class ESManager:
         print(f"查询日期: {date_pattern}")
         
         try:
-            # 获取JSON格式的分片信息
-            shards_data = self.make_request(f"_cat/shards/{index_pattern}?format=json&h=index,shard,prirep,state,docs,store,node")
-            if not shards_data:
-                print("❌ 无法获取分片数据")
+            # 边接收边解析，逐行累计统计，只保留前51行用于显示
+            print("⏳ 正在流式读取分片数据...")
+            shards = ShardSummary.from_rows(self.stream_request(cat_shards_endpoint(index_pattern)), keep=51)
+            if not shards:
+                print("❌ 没有找到分片数据")
                 return
             
-            print(f"\n找到 {len(shards_data)} 个分片:")
+            print(f"\n找到 {len(shards)} 个分片:")
             print("=" * 120)
             print(f"{'索引名称':<50} {'分片':<4} {'类型':<4} {'状态':<8} {'文档数':<12} {'大小':<10} {'节点':<15}")
             print("=" * 120)
             
-            # 按索引和分片号排序
-            sorted_shards = sorted(shards_data, key=lambda x: (x.get('index', ''), int(x.get('shard', 0))))
-            
-            # 统计信息 - 先遍历所有数据进行统计
-            primary_count = 0
-            replica_count = 0
-            total_docs = 0
-            state_counts = {}
-            index_counts = {}
-            
-            for shard in shards_data:
-                prirep = shard.get('prirep', '?')
-                state = shard.get('state', 'UNKNOWN')
-                docs = shard.get('docs', '0')
-                
-                # 统计
-                if prirep == 'p':
-                    primary_count += 1
-                elif prirep == 'r':
-                    replica_count += 1
-                
-                try:
-                    total_docs += int(docs)
-                except:
-                    pass
-                
-                state_counts[state] = state_counts.get(state, 0) + 1
-                
-                # 提取索引服务名称用于统计
-                index_name = shard.get('index', '')
-                if 'logstash-loghub-' in index_name:
-                    service_name = index_name.split('-')[3] if len(index_name.split('-')) > 3 else 'unknown'
-                    index_counts[service_name] = index_counts.get(service_name, 0) + 1
-            
-            # 显示分片详情（限制数量）
-            for i, shard in enumerate(sorted_shards):
-                index_name = shard.get('index', 'N/A')
-                shard_num = shard.get('shard', '0')
-                prirep = shard.get('prirep', '?')
-                state = shard.get('state', 'UNKNOWN')
-                docs = shard.get('docs', '0')
-                store = shard.get('store', '0')
-                node = shard.get('node', 'N/A')
-                
+            for index_name, shard, prirep, state, docs, store, node in shards.first_rows():
                 # 截断长索引名称
-                display_name = index_name[:50] if len(index_name) > 50 else index_name
-                display_node = node[:15] if len(node) > 15 else node
+                display_name = index_name[:50]
+                display_node = node[:15]
                 
                 # 类型显示
                 type_display = "主" if prirep == 'p' else "副" if prirep == 'r' else prirep
@@ -305,32 +280,31 @@ class ESManager:
                 # 状态颜色
                 state_display = "正常" if state == "STARTED" else state
                 
-                print(f"{display_name:<50} {shard_num:<4} {type_display:<4} {state_display:<8} {docs:>10} {store:>8} {display_node:<15}")
-                
-                # 限制显示数量，避免输出过多
-                if i >= 50:
-                    remaining = len(sorted_shards) - 50
-                    if remaining > 0:
-                        print(f"... 还有 {remaining} 个分片")
-                    break
+                print(f"{display_name:<50} {shard:<4} {type_display:<4} {state_display:<8} {docs:>10} {format_bytes(store):>8} {display_node:<15}")
+            
+            # 限制显示数量，避免输出过多
+            remaining = len(shards) - 51
+            if remaining > 0:
+                print(f"... 还有 {remaining} 个分片")
             
             print("=" * 120)
             
             # 显示统计信息
             print(f"📊 分片统计:")
-            print(f"   总分片数: {len(shards_data)}")
-            print(f"   主分片: {primary_count}")
-            print(f"   副本分片: {replica_count}")
-            print(f"   总文档数: {total_docs:,}")
+            print(f"   总分片数: {len(shards)}")
+            print(f"   主分片: {shards.primary_count}")
+            print(f"   副本分片: {shards.replica_count}")
+            print(f"   总文档数: {shards.total_docs:,}")
+            print(f"   总存储: {shards.total_bytes / BYTES_PER_GB:.2f} GB")
             
             print(f"\n🔍 分片状态:")
-            for state, count in state_counts.items():
+            for state, count in shards.state_counts.items():
                 emoji = "✅" if state == "STARTED" else "⚠️"
                 print(f"   {emoji} {state}: {count}")
             
             # 显示TOP5服务的分片数
-            if index_counts:
-                top_services = sorted(index_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+            if shards.service_counts:
+                top_services = sorted(shards.service_counts.items(), key=lambda x: x[1], reverse=True)[:5]
                 print(f"\n🏆 TOP5 服务分片数:")
                 for service, count in top_services:
                     print(f"   {service}: {count}")
@@ -338,15 +312,20 @@ class ESManager:
         except Exception as e:
             print(f"❌ 查询分片信息失败: {e}")
     
-    def get_system_stats(self):
-        """获取系统资源统计信息"""
+    def get_system_stats(self) -> Dict[str, Any]:
+        """获取系统资源统计信息，返回节点统计供多集群汇总使用"""
+        # 获取节点统计信息
+        nodes_stats = self.request("nodes_stats")
+        self._render_system_stats(nodes_stats)
+        return nodes_stats
+    
+    def _render_system_stats(self, nodes_stats: Dict[str, Any]):
+        """显示节点资源统计"""
         print("=" * 60)
         print("🖥️  系统资源统计")
         print("=" * 60)
         
         try:
-            # 获取节点统计信息
-            nodes_stats = self.make_request("_nodes/stats/os,process,jvm,fs")
             if not nodes_stats:
                 print("❌ 无法获取节点统计数据")
                 return
@@ -463,6 +442,71 @@ class ESManager:
         except Exception as e:
             print(f"❌ 获取系统统计失败: {e}")
     
+    def get_cluster_load(self) -> Dict[str, float]:
+        """获取各节点中最高的 CPU、堆内存使用率和段合并线程池队列，供批量任务控制并发"""
+        nodes_stats = self.request("cluster_load")
+        nodes_data = nodes_stats.get('nodes', {}) if nodes_stats else {}
+        if not nodes_data:
+            return {}
+        
+        nodes = list(nodes_data.values())
+        merge_pools = [node.get('thread_pool', {}).get('force_merge', {}) for node in nodes]
+        return {
+            'max_cpu': max(node.get('os', {}).get('cpu', {}).get('percent', 0) for node in nodes),
+            'max_heap': max(node.get('jvm', {}).get('mem', {}).get('heap_used_percent', 0) for node in nodes),
+            'max_merge_queue': max(pool.get('queue', 0) for pool in merge_pools),
+            'merge_active': sum(pool.get('active', 0) for pool in merge_pools),
+        }
+    
+    def get_task(self, task_id: str) -> Dict[str, Any]:
+        """查询一次 _tasks/<task_id> (只保留完成状态、错误、结果和进度)，失败时返回空字典"""
+        return self.request("task", task_id) or {}
+    
+    def wait_for_task(self, task_id: str, timeout: int = 3600, label: str = None) -> Optional[Dict[str, Any]]:
+        """轮询 _tasks 直到任务完成，间隔根据任务进度自适应调整，超时返回 None"""
+        start_time = time.time()
+        interval = 5.0
+        while time.time() - start_time < timeout:
+            time.sleep(interval)
+            result = self.get_task(task_id)
+            if not result:
+                interval = min(interval * 2, 60)
+                continue
+            if result.get('completed'):
+                return result
+            
+            status = result.get('task', {}).get('status', {})
+            total = status.get('total', 0)
+            done = status.get('created', 0) + status.get('updated', 0) + status.get('deleted', 0)
+            elapsed = time.time() - start_time
+            if total and done:
+                # 按当前速率估算剩余时间，下次在剩余时间的一半左右检查
+                remaining = (total - done) * elapsed / done
+                interval = min(max(remaining / 2, 5), 120)
+                print(f"   {label or task_id}: {done:,} / {total:,} 文档 ({elapsed:.0f}s)", flush=True)
+            else:
+                interval = min(interval * 1.5, 60)
+        return None
+    
+    def show_overview(self):
+        """集群总览：并发获取健康状态、今日索引/分片和节点资源，再统一显示"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        start_time = time.time()
+        
+        results = self.fetch_concurrently({
+            "health": REQUEST_SPECS["health"].endpoint(),
+            "indices": cat_indices_endpoint(f"*{today}*", sort=None),
+            "shards": cat_shards_endpoint(f"*{today}*"),
+            "nodes": REQUEST_SPECS["nodes_stats"].endpoint(),
+        })
+        elapsed = time.time() - start_time
+        
+        if self._render_cluster_health(results["health"]):
+            self._render_today_stats(today, results["indices"], results["shards"])
+        print()
+        self._render_system_stats(results["nodes"])
+        print(f"\n⏱️  数据获取耗时: {elapsed:.2f} 秒 (4 个请求并发)")
+    
     def search_logs(self, index_pattern: str, query: str = "*", size: int = 10):
         """搜索日志"""
         print("=" * 60)
@@ -479,6 +523,7 @@ class ESManager:
             "sort": [
                 {"@timestamp": {"order": "desc"}}
             ],
+            "_source": LOG_SOURCE_FIELDS,
             "size": size
         }
         
@@ -487,7 +532,7 @@ class ESManager:
         print(f"返回数量: {size}")
         print("-" * 40)
         
-        result = self.make_request(f"{index_pattern}/_search", "POST", search_body)
+        result = self.request("search", index_pattern, search_body)
         if not result:
             return
         
@@ -512,17 +557,34 @@ class ESManager:
             print(f"   {message[:200]}{'...' if len(message) > 200 else ''}")
             print("-" * 80)
     
-    def fuzzy_search_indices(self, keyword: str) -> List[str]:
-        """模糊匹配索引名称"""
-        indices = self.indices_cache.get("indices", [])
-        matched = []
+    def export_logs(self, index_pattern: str, output_path: str, query: str = "*", fmt: str = "ndjson",
+                    fields: List[str] = None, slices: int = 1):
+        """流式导出日志到 NDJSON/CSV 文件 (PIT + search_after，内存占用恒定)"""
+        print("=" * 60)
+        print("📤 日志导出")
+        print("=" * 60)
+        print(f"搜索索引: {index_pattern}")
+        print(f"查询条件: {query}")
+        print(f"导出格式: {fmt}, 并行切片: {slices}")
+        if fields:
+            print(f"导出字段: {', '.join(fields)}")
+        print("-" * 40)
         
-        keyword_lower = keyword.lower()
-        for index in indices:
-            if keyword_lower in index.lower():
-                matched.append(index)
+        start_time = time.time()
+        try:
+            count = LogExporter(self).export(index_pattern, output_path, query, fmt, fields, slices)
+        except Exception as e:
+            print(f"❌ 导出失败: {e}")
+            return
         
-        return matched[:10]  # 返回前10个匹配结果
+        elapsed = time.time() - start_time
+        rate = count / elapsed if elapsed > 0 else 0
+        print(f"✅ 导出完成: {count:,} 条 → {output_path} (耗时 {elapsed:.1f} 秒, {rate:,.0f} 条/秒)")
+    
+    def fuzzy_search_indices(self, keyword: str) -> List[str]:
+        """模糊匹配索引名称"""
+        self.refresh_indices_cache()
+        return self.catalog.search(keyword, limit=10)  # 返回前10个匹配结果
     
     def show_menu(self):
         """显示主菜单"""
@@ -533,40 +595,81 @@ class ESManager:
         print("2. 索引信息查询 (按大小排序)")
         print("3. 分片信息查询 (支持日期)")
         print("4. 系统资源统计 (CPU/内存/磁盘)")
+        print("5. 集群总览 (并发获取 1+4)")
+        print("6. 索引名称搜索")
+        print("7. 日志导出 (NDJSON/CSV)")
+        print("8. 节点资源采样 (速率/分位数/堆趋势)")
+        print("9. 多集群巡检 (所有集群并发检查健康+资源)")
         print("0. 退出")
         print("-" * 60)
     
-    def interactive_mode(self):
-        """交互模式"""
+    def interactive_mode(self, profile: bool = False):
+        """交互模式，profile=True 时每个命令执行后显示耗时分析"""
         print("🎯 ES 管理工具启动成功!")
         print(f"连接地址: {self.es_url}")
         
         while True:
             self.show_menu()
             try:
-                choice = input("请选择功能 [0-4]: ").strip()
+                choice = input("请选择功能 [0-9]: ").strip()
                 
                 if choice == "0":
                     print("👋 再见!")
                     break
-                elif choice == "1":
-                    self.check_cluster_health()
-                elif choice == "2":
-                    date_input = input(f"输入日期 (默认今天 {datetime.now().strftime('%Y-%m-%d')}): ").strip()
-                    if date_input:
-                        pattern = f"*{date_input}*"
+                
+                with Profile(profile) as timer:
+                    if choice == "1":
+                        self.check_cluster_health()
+                    elif choice == "2":
+                        date_input = timer.input(f"输入日期 (默认今天 {datetime.now().strftime('%Y-%m-%d')}): ").strip()
+                        if date_input:
+                            pattern = f"*{date_input}*"
+                        else:
+                            pattern = None  # 使用默认的今天
+                        self.get_indices_info(pattern)
+                    elif choice == "3":
+                        date_input = timer.input(f"输入日期 (默认今天 {datetime.now().strftime('%Y-%m-%d')}): ").strip()
+                        if not date_input:
+                            date_input = None
+                        self.get_shards_info(date_input)
+                    elif choice == "4":
+                        self.get_system_stats()
+                    elif choice == "5":
+                        self.show_overview()
+                    elif choice == "6":
+                        keyword = timer.input("输入索引名称关键字: ").strip()
+                        matched = self.fuzzy_search_indices(keyword)
+                        if matched:
+                            print(f"找到 {len(matched)} 个匹配索引 (最多显示10个):")
+                            for index_name in matched:
+                                print(f"   {index_name}")
+                        else:
+                            print("❌ 未找到匹配的索引")
+                    elif choice == "7":
+                        index_pattern = timer.input("输入索引模式 (如 *iroom-prd-2025-07-28*): ").strip()
+                        if not index_pattern:
+                            print("❌ 索引模式不能为空")
+                            continue
+                        query = timer.input("输入查询条件 (默认 *): ").strip() or "*"
+                        fmt = timer.input("导出格式 ndjson/csv (默认 ndjson): ").strip() or "ndjson"
+                        fields_input = timer.input("导出字段，逗号分隔 (默认全部): ").strip()
+                        fields = [field.strip() for field in fields_input.split(",") if field.strip()] or None
+                        slices_input = timer.input("并行切片数 (默认 1): ").strip()
+                        slices = int(slices_input) if slices_input.isdigit() else 1
+                        output_path = timer.input(f"输出文件 (默认 export.{fmt}): ").strip() or f"export.{fmt}"
+                        self.export_logs(index_pattern, output_path, query, fmt, fields, slices)
+                    elif choice == "8":
+                        interval_input = timer.input("采样间隔秒数 (默认 10): ").strip()
+                        count_input = timer.input("采样次数 (默认持续采样，Ctrl+C 停止): ").strip()
+                        interval = float(interval_input) if interval_input else 10
+                        count = int(count_input) if count_input.isdigit() else None
+                        NodeSampler(self, interval=interval).run(count)
+                    elif choice == "9":
+                        clusters = load_clusters()
+                        run_command("health", clusters)
+                        run_command("stats", clusters)
                     else:
-                        pattern = None  # 使用默认的今天
-                    self.get_indices_info(pattern)
-                elif choice == "3":
-                    date_input = input(f"输入日期 (默认今天 {datetime.now().strftime('%Y-%m-%d')}): ").strip()
-                    if not date_input:
-                        date_input = None
-                    self.get_shards_info(date_input)
-                elif choice == "4":
-                    self.get_system_stats()
-                else:
-                    print("❌ 无效选择，请重新输入")
+                        print("❌ 无效选择，请重新输入")
                 
                 input("\n按回车键继续...")
                 
@@ -579,23 +682,28 @@ class ESManager:
 
 def main():
     """主函数"""
-    if len(sys.argv) > 1:
-        es_url = sys.argv[1]
-    else:
-        es_url = "http://192.168.0.93:9201"
+    parser = argparse.ArgumentParser(description="Elasticsearch 管理工具")
+    parser.add_argument("es_url", nargs="?", default="http://192.168.0.93:9201", help="ES地址")
+    parser.add_argument("--profile", action="store_true", help="每个命令执行后显示耗时分析 (ES端/网络/JSON解析/Python处理)")
+    parser.add_argument("--metrics", help="退出时把请求统计写入文件 (.json 为JSON，否则为 Prometheus 文本)")
+    args = parser.parse_args()
     
+    es_url = args.es_url
     manager = ESManager(es_url)
     
     try:
         # 测试连接
-        health = manager.make_request("_cluster/health")
+        health = manager.request("health")
         if not health:
             print(f"❌ 无法连接到 Elasticsearch: {es_url}")
             return
         
-        manager.interactive_mode()
+        manager.interactive_mode(args.profile)
     except Exception as e:
         print(f"❌ 启动失败: {e}")
+    finally:
+        if args.metrics:
+            METRICS.write(args.metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
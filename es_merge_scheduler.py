@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES段合并调度工具
+替代 es定时任务/es-index-segments-merge.sh 的单次通配 _forcemerge：
+按 _cat/segments 统计各索引段数，优先合并单位字节收益最高的索引，
+每次只合并少量索引，节点负载过高时暂停；整个运行有时间上限，
+超过上限或连续多次无法获取节点负载时停止提交，避免定时任务无限等待
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+from es_cat_model import format_bytes, to_bytes
+from es_manager import ESManager
+from es_transport import DEFAULT_ES_URL
+
+LOAD_UNAVAILABLE = "无法获取节点负载"
+
+
+def log(message: str):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+class ForceMergeScheduler:
+    def __init__(self, manager: ESManager, max_parallel: int = 2, max_cpu: float = 70,
+                 max_heap: float = 80, max_merge_queue: int = 0, poll_interval: int = 15,
+                 pause_interval: int = 60, task_timeout: int = 7200, max_runtime: float = 4 * 3600,
+                 max_load_failures: int = 5):
+        self.manager = manager
+        self.max_parallel = max_parallel
+        self.max_cpu = max_cpu
+        self.max_heap = max_heap
+        self.max_merge_queue = max_merge_queue
+        self.poll_interval = poll_interval
+        self.pause_interval = pause_interval
+        self.task_timeout = task_timeout
+        self.max_runtime = max_runtime
+        self.max_load_failures = max_load_failures
+
+    def find_candidates(self, pattern: str) -> List[Dict[str, Any]]:
+        """按 _cat/segments 统计各索引段数，按单位字节可减少的段数降序排列"""
+        rows = self.manager.make_request(
+            f"_cat/segments/{pattern}?format=json&bytes=b&h=index,shard,prirep,segment,size"
+        )
+        if not rows:
+            return []
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            item = stats.setdefault(row.get('index', ''), {'segments': 0, 'size': 0, 'copies': set()})
+            item['segments'] += 1
+            item['size'] += to_bytes(row.get('size'))
+            item['copies'].add((row.get('shard'), row.get('prirep')))
+
+        candidates = []
+        for index_name, item in stats.items():
+            # 每个分片副本合并后只剩1个段
+            excess = item['segments'] - len(item['copies'])
+            if excess <= 0 or item['size'] <= 0:
+                continue
+            candidates.append({
+                'index': index_name,
+                'segments': item['segments'],
+                'excess': excess,
+                'size': item['size'],
+                'benefit': excess / item['size'],
+            })
+
+        candidates.sort(key=lambda c: c['benefit'], reverse=True)
+        return candidates
+
+    def is_overloaded(self) -> str:
+        """节点负载过高时返回原因，否则返回空字符串"""
+        load = self.manager.get_cluster_load()
+        if not load:
+            return LOAD_UNAVAILABLE
+        if load['max_merge_queue'] > self.max_merge_queue:
+            return f"段合并队列积压 {load['max_merge_queue']}"
+        if load['max_cpu'] >= self.max_cpu:
+            return f"CPU {load['max_cpu']}%"
+        if load['max_heap'] >= self.max_heap:
+            return f"堆内存 {load['max_heap']}%"
+        return ""
+
+    def run(self, pattern: str, dry_run: bool = False) -> Dict[str, Any]:
+        """按收益顺序调度段合并，同时最多运行 max_parallel 个合并任务
+
+        超过 max_runtime 秒或连续 max_load_failures 次无法获取节点负载时停止提交并返回，
+        未提交的索引在 pending 中，仍在运行的合并任务在 running 中
+        """
+        candidates = self.find_candidates(pattern)
+        if not candidates:
+            log(f"{pattern} 没有需要段合并的索引")
+            return {'merged': 0, 'failed': 0, 'pending': [], 'running': []}
+
+        total_excess = sum(c['excess'] for c in candidates)
+        total_size = sum(c['size'] for c in candidates)
+        log(f"共 {len(candidates)} 个索引待合并, 可减少 {total_excess:,} 个段, 数据量 {format_bytes(total_size)}")
+        for c in candidates[:20]:
+            log(f"   {c['index']:<60} 段数 {c['segments']:>5}  大小 {format_bytes(c['size']):>9}")
+        if dry_run:
+            return {'merged': 0, 'failed': 0, 'pending': [], 'running': []}
+
+        pending = list(candidates)
+        running: Dict[str, Dict[str, Any]] = {}
+        merged = 0
+        failed = 0
+        load_failures = 0
+        deadline = time.time() + self.max_runtime
+
+        while pending or running:
+            if time.time() > deadline:
+                log(f"⏰ 超过最长运行时间 {self.max_runtime / 3600:.1f} 小时，停止提交")
+                break
+
+            for task_id in list(running):
+                candidate = running[task_id]
+                result = self.manager.get_task(task_id)
+                if result.get('completed'):
+                    running.pop(task_id)
+                    if result.get('error'):
+                        failed += 1
+                        log(f"❌ {candidate['index']} 段合并失败: {result['error']}")
+                    else:
+                        merged += 1
+                        log(f"✅ {candidate['index']} 段合并完成，耗时 {time.time() - candidate['start']:.0f}秒")
+                elif time.time() - candidate['start'] > self.task_timeout:
+                    running.pop(task_id)
+                    failed += 1
+                    log(f"⚠️ {candidate['index']} 段合并超时，不再等待")
+
+            if pending and len(running) < self.max_parallel:
+                reason = self.is_overloaded()
+                load_failures = load_failures + 1 if reason == LOAD_UNAVAILABLE else 0
+                if load_failures >= self.max_load_failures:
+                    log(f"❌ 连续 {load_failures} 次无法获取节点负载，停止提交")
+                    break
+                if reason:
+                    log(f"⏸️  节点负载过高 ({reason})，{self.pause_interval}秒后重试")
+                    time.sleep(self.pause_interval)
+                    continue
+
+                candidate = pending.pop(0)
+                submit = self.manager.make_request(
+                    f"{candidate['index']}/_forcemerge?max_num_segments=1&wait_for_completion=false", "POST"
+                )
+                if submit and submit.get('task'):
+                    candidate['start'] = time.time()
+                    running[submit['task']] = candidate
+                    log(f"🔧 开始合并 {candidate['index']} ({candidate['segments']} 段, {format_bytes(candidate['size'])})")
+                else:
+                    failed += 1
+                    log(f"❌ {candidate['index']} 段合并提交失败: {submit}")
+                continue
+
+            time.sleep(self.poll_interval)
+
+        if pending:
+            log(f"⏸️  未提交的索引 {len(pending)} 个: {', '.join(c['index'] for c in pending)}")
+        if running:
+            log(f"⏳ 仍在合并的索引 {len(running)} 个 (任务继续在ES中执行): "
+                f"{', '.join(c['index'] for c in running.values())}")
+        log(f"=== 段合并完成: 成功 {merged} 个, 失败 {failed} 个 ===")
+        return {'merged': merged, 'failed': failed,
+                'pending': [c['index'] for c in pending], 'running': [c['index'] for c in running.values()]}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES段合并调度")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("--days", type=int, default=7, help="合并N天前的索引 (默认7)")
+    parser.add_argument("--date", help="指定合并日期 YYYY-MM-DD，优先于 --days")
+    parser.add_argument("--max-parallel", type=int, default=2, help="同时合并的索引数 (默认2)")
+    parser.add_argument("--max-cpu", type=float, default=70, help="节点CPU超过该值时暂停 (默认70)")
+    parser.add_argument("--max-heap", type=float, default=80, help="节点堆内存超过该值时暂停 (默认80)")
+    parser.add_argument("--max-runtime", type=float, default=4, help="最长运行小时数，超过后停止提交 (默认4)")
+    parser.add_argument("--dry-run", action="store_true", help="只列出待合并索引，不执行")
+    args = parser.parse_args()
+
+    merge_date = args.date or (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+    scheduler = ForceMergeScheduler(ESManager(args.es_url), max_parallel=args.max_parallel,
+                                    max_cpu=args.max_cpu, max_heap=args.max_heap,
+                                    max_runtime=args.max_runtime * 3600)
+    log(f"段合并日期: {merge_date}")
+    result = scheduler.run(f"*{merge_date}*", dry_run=args.dry_run)
+    if result['pending'] or result['running']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求耗时统计
+ESTransport 每次请求结束、decode_json 每次解析响应后调用已注册的钩子；
+默认钩子按接口记录请求往返耗时、ES返回的 took、响应字节数、JSON解析耗时和重试次数到内存直方图，
+可导出为 Prometheus 文本格式 (node_exporter textfile) 或 JSON；
+Profile 把一条命令的总耗时拆分为 ES端 / 网络 / JSON解析 / Python处理
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+from es_request_spec import iter_response_array, json_loads
+
+# 耗时分桶 (秒)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 响应大小分桶 (字节)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+# 直方图: 名称 -> (Prometheus 指标名, 说明, 分桶)
+HISTOGRAMS = {
+    "wall": ("es_request_duration_seconds", "请求往返耗时 (含网络和响应体下载)", DURATION_BUCKETS),
+    "server": ("es_server_took_seconds", "ES 返回的 took", DURATION_BUCKETS),
+    "decode": ("es_json_decode_seconds", "响应 JSON 解析耗时", DURATION_BUCKETS),
+    "bytes": ("es_response_bytes", "响应体字节数 (解压后)", SIZE_BUCKETS),
+}
+
+# 计数器: 名称 -> (Prometheus 指标名, 说明)
+COUNTERS = {
+    "errors": ("es_request_errors_total", "请求异常或非 2xx 响应数"),
+    "retries": ("es_request_retries_total", "请求重试次数"),
+}
+
+# 这些接口的第二段路径也作为接口名的一部分 (如 _cat/indices)
+_GROUPED_APIS = {"_cat", "_cluster", "_nodes"}
+
+
+def endpoint_key(endpoint: str) -> str:
+    """把请求路径归并为接口名，去掉索引名和参数：*2025-07-28*/_search -> _search"""
+    parts = endpoint.split('?', 1)[0].strip('/').split('/')
+    for i, part in enumerate(parts):
+        if part.startswith('_'):
+            if part in _GROUPED_APIS and i + 1 < len(parts):
+                return f"{part}/{parts[i + 1]}"
+            return part
+    return "/"
+
+
+class Histogram:
+    """固定分桶的直方图，分位数按桶上界估算"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95)}
+
+
+class RequestMetrics:
+    """按接口汇总的直方图和计数器，多线程并发请求时共用"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, name: str, endpoint: str, value: float):
+        with self.lock:
+            histogram = self.histograms.get((name, endpoint))
+            if histogram is None:
+                histogram = self.histograms[(name, endpoint)] = Histogram(HISTOGRAMS[name][2])
+            histogram.observe(value)
+
+    def increment(self, name: str, endpoint: str, value: int = 1):
+        with self.lock:
+            self.counters[(name, endpoint)] = self.counters.get((name, endpoint), 0) + value
+
+    def record(self, event: Dict[str, Any]):
+        """默认钩子：把请求事件或解析事件记录到直方图"""
+        endpoint = event['endpoint']
+        for name in HISTOGRAMS:
+            if event.get(name) is not None:
+                self.observe(name, endpoint, event[name])
+        if event.get('error'):
+            self.increment("errors", endpoint)
+        if event.get('retries'):
+            self.increment("retries", endpoint, event['retries'])
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def endpoints(self) -> List[str]:
+        with self.lock:
+            return sorted({endpoint for _, endpoint in self.histograms} | {endpoint for _, endpoint in self.counters})
+
+    def histogram(self, name: str, endpoint: str) -> Optional[Histogram]:
+        return self.histograms.get((name, endpoint))
+
+    def total(self, name: str) -> float:
+        """某个直方图所有接口的总和"""
+        with self.lock:
+            return sum(h.sum for (metric, _), h in self.histograms.items() if metric == name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON 概况: {接口: {wall: {...}, server: {...}, ..., errors: n, retries: n}}"""
+        result: Dict[str, Dict[str, Any]] = {}
+        with self.lock:
+            for (name, endpoint), histogram in sorted(self.histograms.items()):
+                result.setdefault(endpoint, {})[name] = histogram.to_dict()
+            for (name, endpoint), value in sorted(self.counters.items()):
+                result.setdefault(endpoint, {})[name] = value
+        return result
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        with self.lock:
+            for name, (metric, help_text, buckets) in HISTOGRAMS.items():
+                series = sorted((endpoint, h) for (n, endpoint), h in self.histograms.items() if n == name)
+                if not series:
+                    continue
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for endpoint, histogram in series:
+                    cumulative = 0
+                    for bound, count in zip(buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{endpoint="{endpoint}",le="{bound:g}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{endpoint="{endpoint}"}} {histogram.sum:g}')
+                    lines.append(f'{metric}_count{{endpoint="{endpoint}"}} {histogram.count}')
+            for name, (metric, help_text) in COUNTERS.items():
+                series = sorted((endpoint, v) for (n, endpoint), v in self.counters.items() if n == name)
+                if not series:
+                    continue
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for endpoint, value in series:
+                    lines.append(f'{metric}{{endpoint="{endpoint}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """写入文件：.json 结尾时写 JSON 概况，否则写 Prometheus 文本；先写临时文件再替换"""
+        if path.endswith(".json"):
+            content = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        else:
+            content = self.to_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+# 进程内共享的统计
+METRICS = RequestMetrics()
+
+_hooks: List[Callable[[Dict[str, Any]], None]] = [METRICS.record]
+
+
+def add_hook(hook: Callable[[Dict[str, Any]], None]):
+    """注册钩子，每次请求/解析后以事件字典调用"""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Dict[str, Any]], None]):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def emit(event: Dict[str, Any]):
+    """通知所有钩子，钩子异常不影响请求本身"""
+    for hook in list(_hooks):
+        try:
+            hook(event)
+        except Exception:
+            pass
+
+
+def decode_json(response) -> Any:
+    """解析响应JSON，记录解析耗时和 ES 返回的 took"""
+    start_time = time.perf_counter()
+    result = json_loads(response.content)
+    elapsed = time.perf_counter() - start_time
+    took = result.get('took') if isinstance(result, dict) else None
+    emit({
+        'endpoint': endpoint_key(response.request.path_url if response.request else response.url),
+        'decode': elapsed,
+        'server': took / 1000 if isinstance(took, (int, float)) else None,
+    })
+    return result
+
+
+class _TimedResponse:
+    """包装 stream=True 的响应，累计读取响应体的耗时和字节数"""
+
+    def __init__(self, response):
+        self.response = response
+        self.encoding = response.encoding
+        self.read_time = 0.0
+        self.bytes = 0
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        chunks = self.response.iter_content(chunk_size)
+        while True:
+            start_time = time.perf_counter()
+            chunk = next(chunks, None)
+            self.read_time += time.perf_counter() - start_time
+            if chunk is None:
+                return
+            self.bytes += len(chunk)
+            yield chunk
+
+
+def stream_json_array(response) -> Iterator[Any]:
+    """同 iter_response_array，读取结束后记录往返耗时 (响应头 + 读取响应体) 和字节数；
+    解析与调用方的处理交错进行，不单独计时"""
+    timed = _TimedResponse(response)
+    try:
+        yield from iter_response_array(timed)
+    finally:
+        emit({
+            'endpoint': endpoint_key(response.request.path_url),
+            'method': response.request.method,
+            'status': response.status_code,
+            'wall': response.elapsed.total_seconds() + timed.read_time,
+            'bytes': timed.bytes,
+            'retries': getattr(response, 'retries', 0),
+        })
+
+
+class Profile:
+    """一条命令的耗时拆分；用 with 或 start()/stop() 包住命令，命令中的用户输入用 input() 以扣除等待时间"""
+
+    def __init__(self, enabled: bool = True, file=None):
+        self.enabled = enabled
+        # 单独的统计，只在命令执行期间作为钩子接收事件，不影响进程内累计的 METRICS
+        self.metrics = RequestMetrics()
+        self.file = file
+        self.started = 0.0
+        self.idle = 0.0
+
+    def start(self) -> 'Profile':
+        if self.enabled:
+            self.metrics.reset()
+            self.idle = 0.0
+            add_hook(self.metrics.record)
+            self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        """显示耗时分析，命令没有发出请求时不显示"""
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - self.started - self.idle
+        remove_hook(self.metrics.record)
+        if self.metrics.endpoints():
+            self.print_breakdown(elapsed)
+
+    def __enter__(self) -> 'Profile':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def input(self, prompt: str = "") -> str:
+        start_time = time.perf_counter()
+        try:
+            return input(prompt)
+        finally:
+            self.idle += time.perf_counter() - start_time
+
+    def breakdown(self, elapsed: float) -> Dict[str, float]:
+        """各阶段耗时 (秒)；没有 took 的接口其耗时全部计入网络"""
+        wall = self.metrics.total("wall")
+        server = self.metrics.total("server")
+        decode = self.metrics.total("decode")
+        return {
+            'total': elapsed,
+            'es': server,
+            'network': max(wall - server, 0.0),
+            'decode': decode,
+            'python': max(elapsed - wall - decode, 0.0),
+        }
+
+    def print_breakdown(self, elapsed: float):
+        out = self.file or sys.stdout
+        phases = self.breakdown(elapsed)
+        labels = [("es", "ES端 (took)"), ("network", "网络及传输"), ("decode", "JSON解析"), ("python", "Python处理/格式化")]
+
+        print("\n⏱️  耗时分析", file=out)
+        print("-" * 80, file=out)
+        for key, label in labels:
+            share = phases[key] / elapsed * 100 if elapsed > 0 else 0
+            print(f"   {label:<18} {phases[key] * 1000:>10.1f} ms  {share:>5.1f}%", file=out)
+        print(f"   {'总计':<18} {elapsed * 1000:>10.1f} ms", file=out)
+
+        endpoints = self.metrics.endpoints()
+        if endpoints:
+            print("-" * 80, file=out)
+            print(f"   {'接口':<24} {'次数':>4} {'p50(ms)':>9} {'max(ms)':>9} {'took(ms)':>9} {'解析(ms)':>9} {'字节':>10} {'重试':>4}", file=out)
+            for endpoint in endpoints:
+                wall = self.metrics.histogram("wall", endpoint)
+                server = self.metrics.histogram("server", endpoint)
+                decode = self.metrics.histogram("decode", endpoint)
+                size = self.metrics.histogram("bytes", endpoint)
+                retries = self.metrics.counters.get(("retries", endpoint), 0)
+                print(f"   {endpoint:<24} {wall.count if wall else 0:>4} "
+                      f"{(wall.quantile(0.5) if wall else 0) * 1000:>9.1f} {(wall.max if wall else 0) * 1000:>9.1f} "
+                      f"{(server.sum if server else 0) * 1000:>9.1f} {(decode.sum if decode else 0) * 1000:>9.1f} "
+                      f"{int(size.sum) if size else 0:>10,} {retries:>4}", file=out)
+        if self.metrics.total("wall") > elapsed:
+            print("   (并发请求的耗时之和超过总耗时)", file=out)
+        print("-" * 80, file=out)
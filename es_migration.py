@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES冷热数据迁移
+替代 es定时任务/es-migration.sh 一次性把N天前的全部索引改为 warm 的做法：
+按 _cat/shards?bytes=b 估算每个索引的迁移字节数，按"在途字节预算"分批下发 allocation 设置，
+每批之前检查 _cluster/health 的 relocating_shards 和目标节点磁盘水位，迁移完成的索引释放预算后再下发下一批。
+--catch-up 时规划阈值日期当天及更早、仍未设置为目标类型的全部索引，补上之前超时或被暂缓而未下发的索引
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
+
+from es_cat_model import format_bytes, to_bytes
+from es_transport import pack_index_names
+
+DEFAULT_MIGRATION_URL = "http://192.168.0.95:9200"
+
+# 节点属性名，与模板中 routing.allocation.require.node-type 一致
+NODE_ATTR = "node-type"
+ALLOCATION_SETTING = f"index.routing.allocation.require.{NODE_ATTR}"
+
+# 无法读取集群水位设置时使用 ES 的默认低水位
+DEFAULT_LOW_WATERMARK = 85.0
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+
+def log(message: str):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def parse_watermark(value: str) -> float:
+    """解析 "85%" / "0.85" 形式的水位为百分比，按字节配置的水位无法换算时返回默认值"""
+    if not value:
+        return DEFAULT_LOW_WATERMARK
+    value = str(value).strip()
+    try:
+        if value.endswith('%'):
+            return float(value[:-1])
+        ratio = float(value)
+        return ratio * 100 if ratio <= 1 else DEFAULT_LOW_WATERMARK
+    except ValueError:
+        return DEFAULT_LOW_WATERMARK
+
+
+class MigrationPlanner:
+    def __init__(self, manager, target: str = "warm", budget_bytes: int = 50 * 1024 ** 3,
+                 max_relocating: int = 4, disk_limit: float = None, interval: float = 30):
+        self.manager = manager
+        self.target = target
+        self.budget_bytes = budget_bytes
+        self.max_relocating = max_relocating
+        self.disk_limit = disk_limit
+        self.interval = interval
+        self.target_nodes: List[str] = []
+
+    def load_target_nodes(self) -> List[str]:
+        """_cat/nodeattrs 中 node-type 等于目标类型的节点"""
+        rows = self.manager.make_request("_cat/nodeattrs?format=json&h=node,attr,value")
+        if not isinstance(rows, list):
+            rows = []
+        self.target_nodes = sorted(row['node'] for row in rows
+                                   if row.get('attr') == NODE_ATTR and row.get('value') == self.target)
+        return self.target_nodes
+
+    def load_disk_limit(self) -> float:
+        """未指定上限时使用集群的低水位 (超过后ES不再向该节点分配分片)"""
+        if self.disk_limit is None:
+            settings = self.manager.make_request(
+                "_cluster/settings?include_defaults=true&flat_settings=true"
+                "&filter_path=*.cluster.routing.allocation.disk.watermark.low"
+            ) or {}
+            value = None
+            for scope in ("transient", "persistent", "defaults"):
+                value = value or settings.get(scope, {}).get("cluster.routing.allocation.disk.watermark.low")
+            self.disk_limit = parse_watermark(value)
+        return self.disk_limit
+
+    def plan(self, pattern: str, before: str = None) -> List[Tuple[str, int]]:
+        """列出匹配的、尚未设置为目标类型的索引及其全部分片副本的字节数，按大小降序
+
+        指定 before (YYYY-MM-DD) 时只保留索引名日期不晚于该日期的索引
+        """
+        settings = self.manager.make_request(
+            f"{pattern}/_settings?filter_path=*.settings.{ALLOCATION_SETTING}&flat_settings=true"
+        ) or {}
+        shards = self.manager.make_request(f"_cat/shards/{pattern}?format=json&h=index,store&bytes=b") or []
+
+        sizes: Dict[str, int] = {}
+        for row in shards:
+            if before:
+                date_match = DATE_PATTERN.search(row['index'])
+                if not date_match or date_match.group(1) > before:
+                    continue
+            sizes[row['index']] = sizes.get(row['index'], 0) + to_bytes(row.get('store'))
+
+        pending = [
+            (index, size) for index, size in sizes.items()
+            if settings.get(index, {}).get('settings', {}).get(ALLOCATION_SETTING) != self.target
+        ]
+        pending.sort(key=lambda item: item[1], reverse=True)
+        return pending
+
+    def cluster_ready(self) -> Tuple[bool, str]:
+        """是否可以下发下一批：正在迁移的分片数和目标节点磁盘使用率都低于上限"""
+        health = self.manager.request("health") or {}
+        relocating = health.get('relocating_shards', 0)
+        if relocating > self.max_relocating:
+            return False, f"正在迁移 {relocating} 个分片"
+
+        rows = self.manager.make_request("_cat/allocation?format=json&h=node,disk.percent") or []
+        disks = {row['node']: float(row['disk.percent']) for row in rows
+                 if row.get('node') in self.target_nodes and row.get('disk.percent') is not None}
+        if disks:
+            node, percent = max(disks.items(), key=lambda item: item[1])
+            if percent >= self.disk_limit:
+                return False, f"{node} 磁盘使用率 {percent:.0f}% 超过上限 {self.disk_limit:.0f}%"
+        return True, ""
+
+    def finished(self, names: List[str]) -> List[str]:
+        """已全部位于目标节点且状态为 STARTED 的索引；查询失败的批次视为都未完成"""
+        located: Dict[str, bool] = {}
+        for batch in pack_index_names(names):
+            rows = self.manager.make_request(f"_cat/shards/{','.join(batch)}?format=json&h=index,state,node")
+            if not isinstance(rows, list):
+                continue
+            for row in rows:
+                done = row.get('state') == 'STARTED' and row.get('node') in self.target_nodes
+                located[row.get('index')] = located.get(row.get('index'), True) and done
+        return [name for name in names if located.get(name)]
+
+    def release(self, names: List[str]) -> List[str]:
+        """下发 allocation 设置，返回设置失败的索引"""
+        failed = []
+        for batch in pack_index_names(names):
+            result = self.manager.make_request(f"{','.join(batch)}/_settings", "PUT", {ALLOCATION_SETTING: self.target})
+            if not result.get('acknowledged'):
+                failed.extend(batch)
+        return failed
+
+    def run(self, pending: List[Tuple[str, int]], timeout: float = 6 * 3600) -> Dict[str, Any]:
+        """按在途字节预算逐步下发，直到全部迁移完成或超时"""
+        queue = list(pending)
+        in_flight: Dict[str, int] = {}
+        done: List[str] = []
+        failed: List[str] = []
+        start_time = time.time()
+
+        while queue or in_flight:
+            if in_flight:
+                for name in self.finished(list(in_flight)):
+                    log(f"✅ {name} 已迁移完成 ({format_bytes(in_flight.pop(name))})")
+                    done.append(name)
+
+            ready, reason = self.cluster_ready() if queue else (False, "")
+            if queue and not ready:
+                log(f"⏸️  暂缓下发: {reason}")
+            elif queue:
+                # 在途字节不超过预算；单个索引超过预算时在没有在途索引时单独下发
+                wave = []
+                budget = self.budget_bytes - sum(in_flight.values())
+                while queue and (queue[0][1] <= budget or not (in_flight or wave)):
+                    name, size = queue.pop(0)
+                    wave.append((name, size))
+                    budget -= size
+                    if budget <= 0:
+                        break
+                # 大索引占满预算时用剩余预算填入较小的索引
+                for item in list(queue):
+                    if item[1] <= budget:
+                        queue.remove(item)
+                        wave.append(item)
+                        budget -= item[1]
+
+                if wave:
+                    rejected = self.release([name for name, _ in wave])
+                    released = [(name, size) for name, size in wave if name not in rejected]
+                    if released:
+                        in_flight.update(released)
+                        log(f"🚚 下发 {len(released)} 个索引 ({format_bytes(sum(size for _, size in released))})，"
+                            f"在途 {format_bytes(sum(in_flight.values()))}，剩余 {len(queue)} 个")
+                    if rejected:
+                        failed.extend(rejected)
+                        log(f"❌ 设置失败: {', '.join(rejected)}")
+
+            if not queue and not in_flight:
+                break
+            if time.time() - start_time > timeout:
+                log(f"⏰ 超时，仍有 {len(in_flight)} 个索引迁移中、{len(queue)} 个未下发")
+                break
+            time.sleep(self.interval)
+
+        return {'done': done, 'in_flight': list(in_flight), 'not_started': [name for name, _ in queue],
+                'failed': failed, 'elapsed': time.time() - start_time}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES冷热数据迁移 (按在途字节预算分批)")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_MIGRATION_URL, help="ES地址")
+    parser.add_argument("--days-ago", type=int, default=3, help="迁移N天前的索引 (默认3)")
+    parser.add_argument("--date", help="迁移指定日期的索引 (YYYY-MM-DD)，优先于 --days-ago")
+    parser.add_argument("--catch-up", action="store_true", help="同时迁移该日期之前仍未迁移的索引")
+    parser.add_argument("--target", default="warm", help="目标节点类型 (默认warm)")
+    parser.add_argument("--budget", default="50gb", help="同时迁移中的最大字节数 (默认50gb)")
+    parser.add_argument("--max-relocating", type=int, default=4, help="正在迁移的分片数超过该值时暂缓下发 (默认4)")
+    parser.add_argument("--disk-limit", type=float, help="目标节点磁盘使用率上限%% (默认取集群低水位)")
+    parser.add_argument("--interval", type=float, default=30, help="检查间隔秒数 (默认30)")
+    parser.add_argument("--timeout", type=float, default=6, help="最长运行小时数 (默认6)")
+    parser.add_argument("--dry-run", action="store_true", help="只显示计划，不执行")
+    args = parser.parse_args()
+
+    date = args.date or (datetime.now() - timedelta(days=args.days_ago)).strftime("%Y-%m-%d")
+    if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', date):
+        log("❌ 日期格式错误，请使用 YYYY-MM-DD 格式")
+        return
+
+    from es_manager import ESManager
+    planner = MigrationPlanner(ESManager(args.es_url), target=args.target, budget_bytes=to_bytes(args.budget),
+                               max_relocating=args.max_relocating, disk_limit=args.disk_limit,
+                               interval=args.interval)
+
+    if args.catch_up:
+        pending = planner.plan("*", before=date)
+    else:
+        pending = planner.plan(f"*{date}*")
+    total = sum(size for _, size in pending)
+    log(f"📋 {date}{' 及更早' if args.catch_up else ''}: {len(pending)} 个索引待迁移到 {args.target}，共 {format_bytes(total)}，"
+        f"在途预算 {format_bytes(planner.budget_bytes)}")
+    if not pending:
+        log("✅ 没有需要迁移的索引")
+        return
+    if not planner.load_target_nodes():
+        log(f"❌ 没有 {NODE_ATTR}={args.target} 的节点")
+        sys.exit(1)
+    log(f"🎯 目标节点: {', '.join(planner.target_nodes)}, 磁盘上限 {planner.load_disk_limit():.0f}%")
+
+    if args.dry_run:
+        for name, size in pending:
+            log(f"   {name:<70} {format_bytes(size):>10}")
+        return
+
+    result = planner.run(pending, timeout=args.timeout * 3600)
+    log(f"{'✅' if not (result['failed'] or result['in_flight'] or result['not_started']) else '⚠️'} "
+        f"迁移完成 {len(result['done'])}/{len(pending)}, 耗时 {result['elapsed'] / 60:.1f} 分钟")
+    if result['failed']:
+        log(f"❌ 设置失败的索引: {', '.join(result['failed'])}")
+    if result['in_flight']:
+        log(f"⏳ 仍在迁移的索引: {', '.join(result['in_flight'])}")
+    if result['not_started']:
+        log(f"⏸️  未下发的索引: {', '.join(result['not_started'])}")
+    if result['failed'] or result['in_flight'] or result['not_started']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
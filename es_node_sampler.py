@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES节点指标采样
+按固定间隔轮询 _nodes/stats (filter_path 只取用到的字段)，
+每个节点的指标保存在定长数组环形缓冲区中，
+根据计数器差值计算索引/查询/GC/段合并速率，并给出窗口内的分位数和堆内存趋势
+"""
+
+import argparse
+import math
+import time
+from array import array
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from es_cat_model import format_bytes
+from es_request_spec import RequestSpec
+from es_transport import DEFAULT_ES_URL
+
+SAMPLE_FIELDS = [
+    "nodes.*.name",
+    "nodes.*.timestamp",
+    "nodes.*.os.cpu.percent",
+    "nodes.*.jvm.mem.heap_used_percent",
+    "nodes.*.jvm.gc.collectors.*.collection_time_in_millis",
+    "nodes.*.fs.total.total_in_bytes",
+    "nodes.*.fs.total.available_in_bytes",
+    "nodes.*.indices.indexing.index_total",
+    "nodes.*.indices.search.query_total",
+    "nodes.*.indices.merges.total_size_in_bytes",
+]
+
+SAMPLE_SPEC = RequestSpec("_nodes/stats/os,jvm,fs,indices", fields=SAMPLE_FIELDS)
+
+PROCESSORS_SPEC = RequestSpec("_nodes/os", fields=["nodes.*.os.allocated_processors"])
+
+# 直接读取的瞬时值和由计数器差值得到的速率
+GAUGES = ("cpu", "heap", "disk")
+RATES = ("index_rate", "search_rate", "gc_ms", "merge_bytes")
+METRICS = ("time",) + GAUGES + RATES
+
+
+class RingBuffer:
+    """定长环形缓冲区，写满后覆盖最旧的数据，缺失值以 NaN 表示"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = array('d', [math.nan]) * capacity
+        self.head = 0
+        self.count = 0
+
+    def append(self, value: float):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def values(self) -> List[float]:
+        """按时间顺序返回窗口内的值"""
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return self.data[start:start + self.count].tolist()
+        return self.data[start:].tolist() + self.data[:self.head].tolist()
+
+    def last(self) -> float:
+        if not self.count:
+            return math.nan
+        return self.data[(self.head - 1) % self.capacity]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """线性插值分位数，忽略 NaN"""
+    valid = sorted(v for v in values if not math.isnan(v))
+    if not valid:
+        return math.nan
+    rank = (len(valid) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(valid) - 1)
+    return valid[low] + (valid[high] - valid[low]) * (rank - low)
+
+
+def slope_per_minute(times: List[float], values: List[float]) -> float:
+    """最小二乘拟合每分钟的变化量，用于判断堆内存上升趋势"""
+    points = [(t, v) for t, v in zip(times, values) if not math.isnan(v)]
+    if len(points) < 2:
+        return math.nan
+    mean_t = sum(t for t, _ in points) / len(points)
+    mean_v = sum(v for _, v in points) / len(points)
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    if var_t == 0:
+        return math.nan
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return cov / var_t * 60
+
+
+class NodeHistory:
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.series = {metric: RingBuffer(capacity) for metric in METRICS}
+        self.counters: Optional[Dict[str, float]] = None
+
+    def add(self, node: Dict[str, Any]):
+        """记录一次采样；计数器变小 (节点重启) 时本次速率记为缺失"""
+        timestamp = node.get('timestamp', time.time() * 1000) / 1000
+        fs_total = node.get('fs', {}).get('total', {})
+        disk_total = fs_total.get('total_in_bytes', 0)
+        disk_available = fs_total.get('available_in_bytes', 0)
+        collectors = node.get('jvm', {}).get('gc', {}).get('collectors', {})
+        indices = node.get('indices', {})
+
+        counters = {
+            'time': timestamp,
+            'index_rate': indices.get('indexing', {}).get('index_total', 0),
+            'search_rate': indices.get('search', {}).get('query_total', 0),
+            'gc_ms': sum(c.get('collection_time_in_millis', 0) for c in collectors.values()),
+            'merge_bytes': indices.get('merges', {}).get('total_size_in_bytes', 0),
+        }
+
+        self.series['time'].append(timestamp)
+        self.series['cpu'].append(node.get('os', {}).get('cpu', {}).get('percent', math.nan))
+        self.series['heap'].append(node.get('jvm', {}).get('mem', {}).get('heap_used_percent', math.nan))
+        self.series['disk'].append((disk_total - disk_available) / disk_total * 100 if disk_total else math.nan)
+
+        previous = self.counters
+        elapsed = counters['time'] - previous['time'] if previous else 0
+        for metric in RATES:
+            delta = counters[metric] - previous[metric] if previous else -1
+            self.series[metric].append(delta / elapsed if elapsed > 0 and delta >= 0 else math.nan)
+        self.counters = counters
+
+    def summary(self) -> Dict[str, float]:
+        values = {metric: self.series[metric].values() for metric in METRICS}
+        result = {}
+        for metric in GAUGES + RATES:
+            result[metric] = self.series[metric].last()
+            result[f"{metric}_p50"] = percentile(values[metric], 50)
+            result[f"{metric}_p95"] = percentile(values[metric], 95)
+        result['heap_trend'] = slope_per_minute(values['time'], values['heap'])
+        return result
+
+
+class NodeSampler:
+    def __init__(self, manager, interval: float = 10, window: int = 60):
+        self.manager = manager
+        self.interval = interval
+        self.window = window
+        self.nodes: Dict[str, NodeHistory] = {}
+        self.processors: Dict[str, int] = {}
+        self.samples = 0
+
+    def load_processors(self):
+        """读取各节点的处理器数，用于计算加权平均CPU"""
+        info = self.manager.make_request(PROCESSORS_SPEC.endpoint())
+        for node_id, node in (info.get('nodes', {}) if info else {}).items():
+            self.processors[node_id] = node.get('os', {}).get('allocated_processors', 1)
+
+    def sample(self) -> bool:
+        """采样一次，返回是否成功"""
+        stats = self.manager.make_request(SAMPLE_SPEC.endpoint())
+        nodes = stats.get('nodes', {}) if stats else {}
+        if not nodes:
+            return False
+        for node_id, node in nodes.items():
+            history = self.nodes.get(node_id)
+            if history is None:
+                history = self.nodes[node_id] = NodeHistory(node.get('name', node_id), self.window)
+            history.add(node)
+        self.samples += 1
+        return True
+
+    def report(self):
+        """显示各节点当前值、窗口分位数和速率"""
+        print("=" * 132)
+        print(f"🖥️  节点采样 {datetime.now().strftime('%H:%M:%S')}  "
+              f"(第 {self.samples} 次, 间隔 {self.interval:g}秒, 窗口 {min(self.samples, self.window)} 个样本)")
+        print("=" * 132)
+        print(f"{'节点名称':<15} {'CPU%':>6} {'CPU p95':>8} {'堆%':>6} {'堆 p95':>7} {'堆趋势/分':>9} {'磁盘%':>6} "
+              f"{'索引/s':>9} {'查询/s':>9} {'GC ms/s':>8} {'合并/s':>10}")
+        print("-" * 132)
+
+        summaries = {node_id: history.summary() for node_id, history in sorted(
+            self.nodes.items(), key=lambda item: item[1].name)}
+        for node_id, s in summaries.items():
+            merge = format_bytes(s['merge_bytes']) if not math.isnan(s['merge_bytes']) else "-"
+            print(f"{self.nodes[node_id].name:<15} {fmt(s['cpu']):>6} {fmt(s['cpu_p95']):>8} {fmt(s['heap']):>6} "
+                  f"{fmt(s['heap_p95']):>7} {fmt(s['heap_trend'], '+.2f'):>9} {fmt(s['disk']):>6} "
+                  f"{fmt(s['index_rate'], ',.0f'):>9} {fmt(s['search_rate'], ',.0f'):>9} "
+                  f"{fmt(s['gc_ms'], '.0f'):>8} {merge:>10}")
+        print("=" * 132)
+
+        # CPU 按处理器数加权，各节点核数不同时比简单平均更能反映集群负载
+        weighted = [(s['cpu'], self.processors.get(node_id, 1)) for node_id, s in summaries.items()
+                    if not math.isnan(s['cpu'])]
+        total_weight = sum(w for _, w in weighted)
+        if total_weight:
+            print(f"📊 集群加权CPU: {sum(c * w for c, w in weighted) / total_weight:.1f}%")
+
+        totals = {metric: sum(s[metric] for s in summaries.values() if not math.isnan(s[metric])) for metric in RATES}
+        print(f"📊 集群速率: 索引 {totals['index_rate']:,.0f}/s, 查询 {totals['search_rate']:,.0f}/s, "
+              f"GC {totals['gc_ms']:,.0f} ms/s, 段合并 {format_bytes(totals['merge_bytes'])}/s")
+
+        rising = [(self.nodes[node_id].name, s) for node_id, s in summaries.items()
+                  if s['heap_trend'] > 1 and s['heap_p95'] > 75]
+        for name, s in rising:
+            print(f"   ⚠️  {name} 堆内存持续上升: {s['heap_trend']:+.2f}%/分, p95 {s['heap_p95']:.1f}%")
+
+    def run(self, count: int = None, report_every: int = 1):
+        """持续采样，count 为空时运行到 Ctrl+C"""
+        self.load_processors()
+        try:
+            while count is None or self.samples < count:
+                started = time.time()
+                if not self.sample():
+                    print("❌ 无法获取节点统计数据")
+                elif self.samples % report_every == 0:
+                    self.report()
+                if count is not None and self.samples >= count:
+                    break
+                time.sleep(max(0, self.interval - (time.time() - started)))
+        except KeyboardInterrupt:
+            print("\n⏹️  采样已停止")
+            if self.samples:
+                self.report()
+
+
+def fmt(value: float, spec: str = '.1f') -> str:
+    return "-" if math.isnan(value) else format(value, spec)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES节点指标采样")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("--interval", type=float, default=10, help="采样间隔秒数 (默认10)")
+    parser.add_argument("--window", type=int, default=60, help="每个节点保留的样本数 (默认60)")
+    parser.add_argument("--count", type=int, help="采样次数，默认持续运行到 Ctrl+C")
+    parser.add_argument("--report-every", type=int, default=1, help="每N次采样显示一次 (默认1)")
+    args = parser.parse_args()
+
+    from es_manager import ESManager
+    sampler = NodeSampler(ESManager(args.es_url), interval=args.interval, window=args.window)
+    sampler.run(args.count, args.report_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES索引重索引收缩工具
+替代 es定时任务/es-reindex-shrink-optimized.sh：
+异步提交 _reindex (slices=auto)，通过 _tasks 接口自适应轮询，
+按集群负载控制并发数，重索引前后的校验合并为一次 _cat/indices 请求
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+from es_cat_model import format_bytes, to_bytes, to_int
+from es_history_store import SHRUNK_SUFFIX
+from es_manager import ESManager
+from es_transport import DEFAULT_ES_URL, pack_index_names
+
+# 不需要收缩的索引
+DEFAULT_EXCLUDE_PATTERNS = [
+    "logstash-loghub-logs-iroom-prd-",
+    "logstash-loghub-logs-platform-int-int-",
+    "logstash-loghub-logs-guardian-prd-",
+    "logstash-loghub-logs-website-platform-api-common-",
+    "logstash-loghub-logs-product-room-api-prd-",
+]
+
+NEW_INDEX_SETTINGS = {
+    "settings": {
+        "index.number_of_shards": 1,
+        "index.number_of_replicas": 0,
+        "index.codec": "best_compression"
+    }
+}
+
+
+def log(message: str):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+class ReindexShrinkOrchestrator:
+    def __init__(self, manager: ESManager, max_concurrency: int = 3,
+                 exclude_patterns: List[str] = None, task_timeout: int = 3600):
+        self.manager = manager
+        self.max_concurrency = max_concurrency
+        self.exclude_patterns = DEFAULT_EXCLUDE_PATTERNS if exclude_patterns is None else exclude_patterns
+        self.task_timeout = task_timeout
+
+    def concurrency_cap(self) -> int:
+        """根据节点最高 CPU / 堆内存使用率决定当前允许的并发数"""
+        load = self.manager.get_cluster_load()
+        if not load:
+            return 1
+        if load['max_cpu'] >= 80 or load['max_heap'] >= 85:
+            return 1
+        if load['max_cpu'] >= 60 or load['max_heap'] >= 75:
+            return max(1, self.max_concurrency // 2)
+        return self.max_concurrency
+
+    def find_candidates(self, shrink_date: str) -> List[Dict[str, Any]]:
+        """一次 _cat/indices 请求找出该日期需要收缩的多分片索引"""
+        rows = self.manager.make_request(
+            f"_cat/indices/*{shrink_date}*?format=json&bytes=b&h=index,pri,docs.count,store.size,health&s=index"
+        )
+        if not rows:
+            return []
+
+        existing = {row.get('index') for row in rows}
+        candidates = []
+        for row in rows:
+            index_name = row.get('index', '')
+            if index_name.endswith(SHRUNK_SUFFIX) or to_int(row.get('pri')) <= 1:
+                continue
+
+            excluded = next((p for p in self.exclude_patterns if p in index_name), None)
+            if excluded:
+                log(f"跳过排除的索引: {index_name} (匹配模式: {excluded}*)")
+                continue
+            if index_name + SHRUNK_SUFFIX in existing:
+                log(f"新索引 {index_name}{SHRUNK_SUFFIX} 已存在，跳过")
+                continue
+
+            candidates.append({
+                'index': index_name,
+                'docs': to_int(row.get('docs.count')),
+                'size': to_bytes(row.get('store.size')),
+                'pri': to_int(row.get('pri')),
+            })
+        return candidates
+
+    def reindex_one(self, candidate: Dict[str, Any]) -> bool:
+        """创建目标索引并异步重索引，完成后返回是否成功"""
+        index_name = candidate['index']
+        new_index = index_name + SHRUNK_SUFFIX
+        log(f"=== 处理索引: {index_name} ({candidate['docs']:,} 文档, {format_bytes(candidate['size'])}, {candidate['pri']} 分片) ===")
+
+        result = self.manager.make_request(new_index, "PUT", NEW_INDEX_SETTINGS)
+        if not result.get('acknowledged'):
+            log(f"❌ {new_index} 创建失败: {result}")
+            return False
+
+        health = self.manager.make_request(f"_cluster/health/{new_index}?wait_for_status=yellow&timeout=60s")
+        if not health or health.get('timed_out'):
+            log(f"❌ {new_index} 分片未就绪")
+            self.manager.make_request(new_index, "DELETE")
+            return False
+
+        submit = self.manager.make_request(
+            "_reindex?wait_for_completion=false&slices=auto", "POST",
+            {"source": {"index": index_name}, "dest": {"index": new_index}}
+        )
+        task_id = submit.get('task') if submit else None
+        if not task_id:
+            log(f"❌ {index_name} 重索引提交失败: {submit}")
+            self.manager.make_request(new_index, "DELETE")
+            return False
+
+        log(f"✅ {index_name} 重索引已提交，任务: {task_id}")
+        start_time = time.time()
+        task = self.manager.wait_for_task(task_id, self.task_timeout, index_name)
+        if task is None:
+            log(f"❌ {index_name} 重索引超时")
+            self.manager.make_request(f"_tasks/{task_id}/_cancel", "POST")
+            self.manager.make_request(new_index, "DELETE")
+            return False
+
+        response = task.get('response', {})
+        if task.get('error') or response.get('failures'):
+            log(f"❌ {index_name} 重索引失败: {task.get('error') or response.get('failures')}")
+            self.manager.make_request(new_index, "DELETE")
+            return False
+
+        log(f"✅ {index_name} 重索引完成，耗时: {time.time() - start_time:.0f}秒")
+        return True
+
+    def verify(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """刷新全部新索引后，用一次 _cat/indices 请求校验文档数和健康状态"""
+        new_indices = [c['index'] + SHRUNK_SUFFIX for c in candidates]
+        rows = []
+        for batch in pack_index_names(new_indices):
+            joined = ",".join(batch)
+            self.manager.make_request(f"{joined}/_refresh", "POST")
+            rows.extend(self.manager.make_request(
+                f"_cat/indices/{joined}?format=json&bytes=b&h=index,docs.count,health,store.size"
+            ) or [])
+        stats = {row.get('index'): row for row in rows}
+
+        verified = []
+        for candidate in candidates:
+            new_index = candidate['index'] + SHRUNK_SUFFIX
+            row = stats.get(new_index, {})
+            new_docs = to_int(row.get('docs.count'))
+            new_health = row.get('health')
+            if new_docs != candidate['docs'] or new_health != 'green':
+                log(f"❌ 验证失败: {candidate['index']} 文档数 {candidate['docs']} vs {new_docs}, 健康: {new_health}")
+                self.manager.make_request(new_index, "DELETE")
+                continue
+
+            candidate['new_size'] = to_bytes(row.get('store.size'))
+            verified.append(candidate)
+        return verified
+
+    def finalize_one(self, candidate: Dict[str, Any]) -> bool:
+        """段合并、迁移到 warm 节点，并用别名原子替换原索引"""
+        index_name = candidate['index']
+        new_index = index_name + SHRUNK_SUFFIX
+
+        submit = self.manager.make_request(
+            f"{new_index}/_forcemerge?max_num_segments=1&wait_for_completion=false", "POST"
+        )
+        if submit and submit.get('task'):
+            if self.manager.wait_for_task(submit['task'], self.task_timeout, f"{new_index} 段合并") is None:
+                log(f"⚠️ {new_index} 段合并超时，但重索引成功")
+
+        migrate = self.manager.make_request(
+            f"{new_index}/_settings", "PUT", {"index.routing.allocation.require.node-type": "warm"}
+        )
+        if not migrate.get('acknowledged'):
+            log(f"⚠️ {new_index} 迁移失败，但优化成功")
+
+        # 删除原索引和添加别名在同一个请求中完成，查询端不会出现空窗
+        swap = self.manager.make_request("_aliases", "POST", {
+            "actions": [
+                {"remove_index": {"index": index_name}},
+                {"add": {"index": new_index, "alias": index_name}}
+            ]
+        })
+        if not swap.get('acknowledged'):
+            log(f"❌ {index_name} 替换失败: {swap}")
+            return False
+
+        log(f"✅ 索引 {index_name} 收缩完成: {format_bytes(candidate['size'])} → {format_bytes(candidate.get('new_size', 0))}, "
+            f"分片 {candidate['pri']} → 1")
+        return True
+
+    def run_pool(self, func, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按集群负载动态控制并发执行，返回执行成功的索引"""
+        pending = list(candidates)
+        running = {}
+        succeeded = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            while pending or running:
+                cap = self.concurrency_cap()
+                while pending and len(running) < cap:
+                    candidate = pending.pop(0)
+                    running[executor.submit(func, candidate)] = candidate
+
+                done, _ = wait(list(running), timeout=30, return_when=FIRST_COMPLETED)
+                for future in done:
+                    candidate = running.pop(future)
+                    try:
+                        if future.result():
+                            succeeded.append(candidate)
+                    except Exception as e:
+                        log(f"❌ {candidate['index']} 处理异常: {e}")
+        return succeeded
+
+    def run(self, shrink_date: str, dry_run: bool = False) -> Dict[str, int]:
+        """执行收缩流程"""
+        log(f"收缩日期: {shrink_date}, 最大并发: {self.max_concurrency}")
+        candidates = self.find_candidates(shrink_date)
+        if not candidates:
+            log("没有需要收缩的索引")
+            return {'processed': 0, 'success': 0, 'failed': 0}
+
+        log(f"共 {len(candidates)} 个索引需要收缩")
+        if dry_run:
+            for candidate in candidates:
+                log(f"   {candidate['index']} ({candidate['pri']} 分片, {format_bytes(candidate['size'])})")
+            return {'processed': 0, 'success': 0, 'failed': 0}
+
+        reindexed = self.run_pool(self.reindex_one, candidates)
+        verified = self.verify(reindexed) if reindexed else []
+        finished = self.run_pool(self.finalize_one, verified)
+
+        summary = {
+            'processed': len(candidates),
+            'success': len(finished),
+            'failed': len(candidates) - len(finished),
+        }
+        log("=== 批量处理完成 ===")
+        log(f"总计处理: {summary['processed']} 个索引")
+        log(f"成功收缩: {summary['success']} 个索引")
+        log(f"失败跳过: {summary['failed']} 个索引")
+        return summary
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES索引重索引收缩")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("--days", type=int, default=7, help="收缩N天前的索引 (默认7)")
+    parser.add_argument("--date", help="指定收缩日期 YYYY-MM-DD，优先于 --days")
+    parser.add_argument("--max-concurrency", type=int, default=3, help="最大并发索引数 (默认3)")
+    parser.add_argument("--dry-run", action="store_true", help="只列出待收缩索引，不执行")
+    args = parser.parse_args()
+
+    shrink_date = args.date or (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+    orchestrator = ReindexShrinkOrchestrator(ESManager(args.es_url), max_concurrency=args.max_concurrency)
+    orchestrator.run(shrink_date, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES请求声明
+每个管理命令声明自己用到的字段，由此生成 filter_path (JSON接口) 或 h= (_cat接口) 参数，
+只传输和解析需要的数据；安装 orjson 时用它解析响应，
+返回大数组的接口 (如 _cat/shards) 可边接收边逐个元素解析
+"""
+
+import codecs
+import json
+import re
+from typing import List, Dict, Any, Union, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """解析JSON响应，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# 数组元素之间的空白和逗号
+_SEPARATORS = re.compile(r'[\s,]*')
+_DELIMITERS = {',', ']', ' ', '\t', '\r', '\n'}
+
+# 流式读取响应时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """从分块到达的文本中逐个解析顶层JSON数组的元素，缓冲区只保留未解析完的部分
+
+    每块先把到最后一个 } 为止的内容作为一批整体解析 (截断处不在元素边界时必然解析失败)，
+    失败时退回逐个元素 raw_decode
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("响应不是JSON数组")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+
+            cut = buffer.rfind('}', pos) + 1
+            if cut:
+                try:
+                    batch = json_loads('[' + buffer[pos:cut] + ']')
+                except ValueError:
+                    pass
+                else:
+                    yield from batch
+                    pos = cut
+                    continue
+
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # 元素不完整，等待后续数据
+            if not isinstance(value, (dict, list, str)) and buffer[end:end + 1] not in _DELIMITERS:
+                break  # 数字/常量后面还没有分隔符时可能在块边界被截断
+            yield value
+            pos = end
+        buffer = buffer[pos:]
+    raise ValueError("JSON数组不完整")
+
+
+def iter_response_array(response, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """流式解析 stream=True 的响应中的JSON数组，gzip 由 requests 解压，内存占用与数组长度无关"""
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+    chunks = (decoder.decode(chunk) for chunk in response.iter_content(chunk_size))
+    return iter_json_array(chunks)
+
+
+class RequestSpec:
+    """一个请求的声明：路径模板、用到的字段 (filter_path) 或列 (h=) 以及固定参数
+
+    路径中的 {target} 为可选的索引名/模式，不传时连同相邻的 / 一起省略
+    """
+
+    def __init__(self, path: str, fields: List[str] = None, columns: List[str] = None,
+                 params: Dict[str, str] = None, method: str = "GET"):
+        self.path = path
+        self.fields = fields or []
+        self.columns = columns or []
+        self.params = params or {}
+        self.method = method
+
+    def endpoint(self, target: str = None, **params) -> str:
+        """生成请求路径，额外参数覆盖声明中的固定参数"""
+        if target:
+            path = self.path.replace("{target}", target)
+        else:
+            path = self.path.replace("/{target}", "").replace("{target}/", "")
+
+        query = {}
+        if self.columns:
+            query["format"] = "json"
+            query["h"] = ",".join(self.columns)
+        if self.fields:
+            query["filter_path"] = ",".join(self.fields)
+        query.update(self.params)
+        query.update({key: value for key, value in params.items() if value is not None})
+
+        if not query:
+            return path
+        return path + "?" + "&".join(f"{key}={value}" for key, value in query.items())
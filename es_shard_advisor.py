@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES分片规划建议
+按 es索引模板/索引模板优化方案.md 的策略 (>50GB 3分片、30-50GB 2分片、其余1分片)，
+汇总最近N天各服务每日索引大小，按增长趋势预估后给出建议分片数，
+检查现有模板的实际分片数是否符合策略，并生成模板修改的 diff
+"""
+
+import argparse
+import copy
+import difflib
+import json
+import os
+from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from typing import List, Dict, Any, Optional, Tuple
+
+from es_cat_model import IndexTable, cat_indices_endpoint
+from es_history_store import DATE_SUFFIX_PATTERN, SHRUNK_SUFFIX, index_series
+from es_transport import DEFAULT_ES_URL
+
+INDEX_PREFIX = "logstash-loghub-"
+
+# (每日大小下限GB, 分片数, 模板名, 模板order)，按下限从高到低匹配
+SHARD_TIERS = [
+    (50, 3, "logstash-super-volume-prd", 10),
+    (30, 2, "logstash-large-volume-prd", 8),
+]
+DEFAULT_SHARDS = 1
+
+# 新建分级模板时复制其 settings/mappings 的基础模板
+BASE_TEMPLATE = "logstash-loghub-month-tpl"
+
+# 汇总时按日期通配合并查询的最大天数
+MAX_DAYS = 60
+
+
+def recommend_shards(size_gb: float) -> int:
+    """按策略返回每日索引大小对应的分片数"""
+    for min_gb, shards, _, _ in SHARD_TIERS:
+        if size_gb > min_gb:
+            return shards
+    return DEFAULT_SHARDS
+
+
+def template_shards(template: Dict[str, Any]) -> Optional[int]:
+    """模板中设置的分片数，未设置时返回 None"""
+    settings = template.get('settings', {})
+    value = settings.get('index', {}).get('number_of_shards', settings.get('index.number_of_shards'))
+    return int(value) if value is not None else None
+
+
+def effective_template(index_name: str, templates: Dict[str, Dict[str, Any]]) -> Tuple[int, Optional[str]]:
+    """新建索引时生效的分片数和来源模板：匹配的模板中 order 最高且设置了分片数的一个"""
+    matched = [
+        (template.get('order', 0), name) for name, template in templates.items()
+        if template_shards(template) is not None
+        and any(fnmatchcase(index_name, pattern) for pattern in template.get('index_patterns', []))
+    ]
+    if not matched:
+        return DEFAULT_SHARDS, None
+    _, name = max(matched)
+    return template_shards(templates[name]), name
+
+
+def linear_fit(values: List[float]) -> Tuple[float, float]:
+    """最小二乘拟合 (斜率/天, 最后一天的拟合值)"""
+    n = len(values)
+    if n < 2:
+        return 0.0, values[-1] if values else 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    var_x = sum((x - mean_x) ** 2 for x in range(n))
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) / var_x
+    return slope, mean_y + slope * (n - 1 - mean_x)
+
+
+class ShardAdvisor:
+    def __init__(self, manager, days: int = 7, horizon: int = 30, prefix: str = INDEX_PREFIX):
+        self.manager = manager
+        self.days = min(days, MAX_DAYS)
+        self.horizon = horizon
+        self.prefix = prefix
+
+    def window_dates(self) -> List[str]:
+        """最近N个完整的自然日 (不含今天)"""
+        today = datetime.now().date()
+        return [(today - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(self.days, 0, -1)]
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """一次请求获取窗口内的索引，按服务汇总每日大小，并记录最近一天索引的分片数
+
+        窗口最早的一天可能已被 es_reindex_shrink.py 收缩为 <原索引名>-shrunk，
+        收缩后的索引按原索引名计入；收缩过程中原索引仍存在时只计原索引
+        """
+        dates = self.window_dates()
+        pattern = ",".join(f"{self.prefix}*{date}*" for date in dates)
+        rows = self.manager.make_request(cat_indices_endpoint(pattern, sort="index"))
+        indices = IndexTable.from_rows(rows or [])
+
+        existing = set(indices.names)
+        services: Dict[str, Dict[str, Any]] = {}
+        for i, index_name in enumerate(indices.names):
+            shrunk = index_name.endswith(SHRUNK_SUFFIX)
+            name = index_name[:-len(SHRUNK_SUFFIX)] if shrunk else index_name
+            if shrunk and name in existing:
+                continue
+            match = DATE_SUFFIX_PATTERN.search(name)
+            if not match:
+                continue
+            date = match.group(0).lstrip('-').replace('.', '-')
+            series = index_series(name)
+            service = services.setdefault(series, {'sizes': {}, 'latest': '', 'shards': 0, 'index': name})
+            service['sizes'][date] = service['sizes'].get(date, 0) + indices.size_gb(i)
+            # 收缩后的分片数不代表模板的分片数，只在没有其它日期时使用
+            if date >= service['latest'] and not (shrunk and service['latest']):
+                service['latest'] = date
+                service['shards'] = indices.pri[i]
+                service['index'] = name
+        return services
+
+    def analyze(self, services: Dict[str, Dict[str, Any]], templates: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """计算每个服务的增长趋势、预估大小和建议分片数，并与模板生效的分片数对比"""
+        dates = self.window_dates()
+        results = []
+        for series, service in services.items():
+            # 窗口内没有索引的日期按 0 处理，中途上线的服务从第一天有数据开始计算
+            first = min(service['sizes'])
+            values = [service['sizes'].get(date, 0.0) for date in dates if date >= first]
+            slope, fitted = linear_fit(values)
+            projected = max(max(values), fitted + max(slope, 0) * self.horizon)
+            configured, template = effective_template(service['index'], templates)
+            recommended = recommend_shards(projected)
+            results.append({
+                'series': series,
+                'days': len(values),
+                'avg_gb': sum(values) / len(values),
+                'max_gb': max(values),
+                'latest_gb': values[-1],
+                'growth_gb': slope,
+                'projected_gb': projected,
+                'current': service['shards'],
+                'configured': configured,
+                'template': template,
+                'recommended': recommended,
+            })
+        results.sort(key=lambda r: r['projected_gb'], reverse=True)
+        return results
+
+    def load_templates(self) -> Dict[str, Dict[str, Any]]:
+        """获取日志索引相关的全部 legacy 模板"""
+        return self.manager.make_request("_template/logstash*") or {}
+
+    def propose(self, results: List[Dict[str, Any]],
+                templates: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """生成使所有服务符合策略的模板：分级模板只包含对应级别的服务，其余模板改为1分片
+
+        分级模板的 order 会高于其它所有设置了分片数的模板，保证优先生效
+        """
+        observed = {r['series'] for r in results}
+        proposed = copy.deepcopy(templates)
+
+        # 非分级模板中超过1分片的一律改为1分片
+        tier_names = {name for _, _, name, _ in SHARD_TIERS}
+        for name, template in proposed.items():
+            if name not in tier_names and (template_shards(template) or DEFAULT_SHARDS) > DEFAULT_SHARDS:
+                template['settings'].setdefault('index', {})['number_of_shards'] = str(DEFAULT_SHARDS)
+
+        other_orders = [t.get('order', 0) for name, t in templates.items()
+                        if name not in tier_names and template_shards(t) is not None]
+        next_order = max(other_orders, default=0) + 1
+
+        base = templates.get(BASE_TEMPLATE) or {'settings': {'index': {}}, 'mappings': {}, 'aliases': {}}
+        for min_gb, shards, name, order in reversed(SHARD_TIERS):
+            current = proposed.get(name)
+            if current is None:
+                current = copy.deepcopy(base)
+                current['index_patterns'] = []
+            # 窗口内没有数据的服务保留原有匹配规则，避免误删
+            kept = [p for p in current.get('index_patterns', [])
+                    if not any(fnmatchcase(f"{series}-", p) for series in observed)]
+            patterns = sorted(kept + [f"{r['series']}-*" for r in results if r['recommended'] == shards])
+            if not patterns:
+                proposed.pop(name, None)  # 没有服务需要该级别时删除模板
+                continue
+            current['index_patterns'] = patterns
+            current['order'] = max(order, next_order, current.get('order', 0))
+            current['settings'].setdefault('index', {})['number_of_shards'] = str(shards)
+            proposed[name] = current
+            next_order = current['order'] + 1
+        return proposed
+
+    def check(self, results: List[Dict[str, Any]], proposed: Dict[str, Dict[str, Any]]) -> List[str]:
+        """用建议模板模拟新建索引，返回分片数仍不符合建议的服务"""
+        return [r['series'] for r in results
+                if effective_template(f"{r['series']}-2000-01-01", proposed)[0] != r['recommended']]
+
+
+def template_diff(name: str, current: Optional[Dict[str, Any]], proposed: Optional[Dict[str, Any]]) -> str:
+    """两个模板版本的 unified diff"""
+    before = json.dumps(current, indent=2, sort_keys=True, ensure_ascii=False).splitlines() if current else []
+    after = json.dumps(proposed, indent=2, sort_keys=True, ensure_ascii=False).splitlines() if proposed else []
+    return "\n".join(difflib.unified_diff(before, after, f"_template/{name} (当前)", f"_template/{name} (建议)",
+                                          lineterm=""))
+
+
+def print_report(results: List[Dict[str, Any]], days: int, horizon: int):
+    """显示各服务的大小、增长和分片建议"""
+    print("=" * 130)
+    print(f"📐 分片规划建议 (最近 {days} 天, 按 {horizon} 天增长预估)")
+    print("=" * 130)
+    print(f"{'服务':<55} {'平均GB':>8} {'最大GB':>8} {'增长GB/天':>9} {'预估GB':>8} {'当前':>4} {'模板':>4} {'建议':>4}  来源模板")
+    print("-" * 130)
+    for r in results:
+        mark = "✅" if r['configured'] == r['recommended'] else "❌"
+        print(f"{r['series'][:55]:<55} {r['avg_gb']:>8.1f} {r['max_gb']:>8.1f} {r['growth_gb']:>+9.2f} "
+              f"{r['projected_gb']:>8.1f} {r['current']:>4} {r['configured']:>4} {r['recommended']:>4}  "
+              f"{mark} {r['template'] or '-'}")
+    print("=" * 130)
+
+    violations = [r for r in results if r['configured'] != r['recommended']]
+    current_total = sum(r['configured'] for r in results)
+    recommended_total = sum(r['recommended'] for r in results)
+    print(f"📊 服务数: {len(results)}, 不符合策略: {len(violations)}")
+    print(f"📊 每日新建主分片: 当前 {current_total} 个 → 建议 {recommended_total} 个")
+    for r in violations:
+        print(f"   ⚠️  {r['series']}: {r['template'] or '默认'} 设置 {r['configured']} 分片, "
+              f"预估 {r['projected_gb']:.1f}GB 应为 {r['recommended']} 分片")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ES分片规划建议")
+    parser.add_argument("es_url", nargs="?", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("--days", type=int, default=7, help=f"汇总最近N天 (默认7，最多{MAX_DAYS})")
+    parser.add_argument("--horizon", type=int, default=30, help="按增长趋势预估N天后的大小 (默认30)")
+    parser.add_argument("--prefix", default=INDEX_PREFIX, help=f"索引前缀 (默认{INDEX_PREFIX})")
+    parser.add_argument("--diff", action="store_true", help="显示模板修改的 diff")
+    parser.add_argument("--output", help="将建议的模板保存到该目录 (每个模板一个JSON文件)")
+    args = parser.parse_args()
+
+    from es_manager import ESManager
+    advisor = ShardAdvisor(ESManager(args.es_url), days=args.days, horizon=args.horizon, prefix=args.prefix)
+
+    services = advisor.collect()
+    if not services:
+        print(f"❌ 最近 {advisor.days} 天没有找到 {args.prefix}* 索引")
+        return
+    templates = advisor.load_templates()
+    results = advisor.analyze(services, templates)
+    print_report(results, advisor.days, advisor.horizon)
+
+    proposed = advisor.propose(results, templates)
+    changed = sorted(name for name in set(templates) | set(proposed) if templates.get(name) != proposed.get(name))
+    unresolved = advisor.check(results, proposed)
+    if unresolved:
+        print(f"⚠️  以下服务在建议模板下仍不符合策略，请检查模板匹配规则: {', '.join(unresolved)}")
+    if not changed:
+        print("✅ 模板已符合策略，无需修改")
+        return
+
+    print(f"\n🔧 需要修改的模板 (按 order 从高到低执行): ")
+    for name in sorted(changed, key=lambda n: proposed.get(n, templates.get(n, {})).get('order', 0), reverse=True):
+        if name not in proposed:
+            print(f"   删除 {name}")
+            continue
+        action = "新增" if name not in templates else "修改"
+        print(f"   {action} {name} (order: {proposed[name].get('order', 0)}, "
+              f"分片: {template_shards(proposed[name])})")
+
+    if args.diff:
+        for name in changed:
+            print()
+            print(template_diff(name, templates.get(name), proposed.get(name)))
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for name in changed:
+            if name not in proposed:
+                print(f"🗑️  curl -X DELETE \"{args.es_url.rstrip('/')}/_template/{name}\"")
+                continue
+            path = os.path.join(args.output, f"{name}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(proposed[name], f, indent=2, ensure_ascii=False)
+            print(f"💾 {path}  (curl -X PUT \"{args.es_url.rstrip('/')}/_template/{name}\" "
+                  f"-H 'Content-Type: application/json' -d @{path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ES HTTP 传输层
+基于 requests.Session 的连接池，供 ESManager、ESIndexLogger、SMSQuery 共用，
+避免每次请求都重新建立 TCP 连接；
+429/503 和连接失败时按带抖动的指数退避重试 (优先使用 Retry-After)，并依次切换到同一集群的其它协调节点，
+连续失败的节点熔断一段时间，期间直接跳过，不再为每次请求等待连接超时
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Tuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from es_metrics import emit, endpoint_key
+
+DEFAULT_ES_URL = "http://192.168.0.93:9201"
+
+# 连接池大小，可通过环境变量 ES_POOL_SIZE 调整
+DEFAULT_POOL_SIZE = int(os.environ.get("ES_POOL_SIZE", "10"))
+
+# ES 默认 http.max_initial_line_length 为 4KB，逗号拼接索引名时留出余量
+MAX_PATH_LENGTH = 3000
+
+# 可重试的状态码: 429 (线程池队列已满被拒绝)、503 (节点不可用或没有主节点)
+RETRY_STATUSES = {429, 503}
+
+# 最多重试次数，可通过环境变量 ES_MAX_RETRIES 调整
+DEFAULT_MAX_RETRIES = int(os.environ.get("ES_MAX_RETRIES", "3"))
+
+# 退避基数和单次等待上限 (秒)，Retry-After 超过上限时也只等待上限
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 10.0
+
+# 连续失败 BREAKER_THRESHOLD 次后熔断，BREAKER_COOLDOWN 秒后放行一次试探请求
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 30.0
+
+# 方法本身可重复执行，连接中断 (请求可能已发出) 时也可以重试
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+# 按接口配置超时 (连接超时, 读取超时)，匹配时优先使用更长的关键字
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_TIMEOUTS = {
+    "_cluster/health": (5, 10),
+    "_cat/indices": (5, 60),
+    "_cat/shards": (5, 120),
+    "_nodes/stats": (5, 30),
+    "_search": (5, 30),
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """所有协调节点都处于熔断状态，请求未发出"""
+
+
+class CircuitBreaker:
+    """单个节点的熔断状态：连续失败达到阈值后打开，冷却结束后放行一次试探请求，成功则关闭"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # 试探请求期间其它请求继续跳过该节点
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """节点的熔断状态，同一进程内按地址共享"""
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = CircuitBreaker()
+        return breaker
+
+
+def load_coordinators(es_url: str, spec: str = None) -> List[str]:
+    """同一集群可互相替代的协调节点，es_url 排在第一位
+
+    环境变量 ES_COORDINATORS 每组为一个集群的地址 (逗号分隔)，多组用分号分隔；
+    不在任何一组中的地址只使用自身，避免切换到其它集群
+    """
+    es_url = es_url.rstrip('/')
+    spec = spec if spec is not None else os.environ.get("ES_COORDINATORS", "")
+    for group in spec.split(";"):
+        urls = [url.strip().rstrip('/') for url in group.split(",") if url.strip()]
+        if es_url in urls:
+            return [es_url] + [url for url in urls if url != es_url]
+    return [es_url]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头 (秒数或 HTTP 日期)，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """第 attempt 次重试前的等待秒数：有 Retry-After 时按其等待，否则为 [0, 基数*2^attempt] 内的随机值"""
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def is_unsent(error: requests.exceptions.RequestException) -> bool:
+    """连接未建立、请求肯定没有发出的异常"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class ESTransport:
+    def __init__(self, es_url: str = DEFAULT_ES_URL, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeouts: Dict[str, Tuple[float, float]] = None, coordinators: List[str] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        self.es_url = es_url.rstrip('/')
+        self.pool_size = pool_size
+        self.coordinators = coordinators or load_coordinators(self.es_url)
+        self.max_retries = max_retries
+        # 最近一次成功的协调节点，后续请求优先使用
+        self.active = 0
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # 要求 ES 对响应做 gzip 压缩 (需集群开启 http.compression，7.x 默认开启)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip",
+            "Content-Type": "application/json",
+        })
+
+    def get_timeout(self, endpoint: str) -> Tuple[float, float]:
+        """根据接口路径选择超时时间"""
+        path = endpoint.split('?', 1)[0]
+        for key in sorted(self.timeouts, key=len, reverse=True):
+            if key in path:
+                return self.timeouts[key]
+        return DEFAULT_TIMEOUT
+
+    def choose_coordinator(self, tried: List[int]) -> Optional[int]:
+        """从最近成功的节点开始，选出未熔断且本次请求尚未尝试过的节点；都尝试过时允许再次使用"""
+        order = [(self.active + i) % len(self.coordinators) for i in range(len(self.coordinators))]
+        for candidates in ([i for i in order if i not in tried], order):
+            for i in candidates:
+                if get_breaker(self.coordinators[i]).allow():
+                    return i
+        return None
+
+    def request(self, endpoint: str, method: str = "GET", data: dict = None,
+                params: dict = None, timeout: Optional[Tuple[float, float]] = None,
+                stream: bool = False) -> requests.Response:
+        """发送请求并返回原始响应，异常由调用方处理；stream=True 时响应体需由调用方读取并关闭
+
+        429/503 和连接失败时退避重试并切换协调节点，所有节点都熔断时抛出 CircuitOpenError
+        """
+        key = endpoint_key(endpoint)
+        start_time = time.perf_counter()
+        tried: List[int] = []
+        attempt = 0
+        response = None
+        while True:
+            index = self.choose_coordinator(tried)
+            if index is None and response is not None:
+                # 重试过程中节点被熔断，返回最后一次的 429/503 响应
+                attempt -= 1
+                break
+            if index is None:
+                error = CircuitOpenError(f"所有协调节点均已熔断: {', '.join(self.coordinators)}")
+                emit({'endpoint': key, 'method': method, 'error': type(error).__name__,
+                      'wall': time.perf_counter() - start_time, 'retries': attempt})
+                raise error
+            tried.append(index)
+            base_url = self.coordinators[index]
+            breaker = get_breaker(base_url)
+
+            try:
+                response = self.session.request(
+                    method,
+                    f"{base_url}/{endpoint}",
+                    json=data,
+                    params=params,
+                    timeout=timeout or self.get_timeout(endpoint),
+                    stream=stream,
+                )
+            except requests.exceptions.RequestException as e:
+                failed_node = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                if failed_node:
+                    breaker.record_failure()
+                # 读取超时不重试，避免单个请求的耗时成倍增加
+                retryable = isinstance(e, requests.exceptions.ConnectionError) and (
+                    is_unsent(e) or method in IDEMPOTENT_METHODS)
+                if not retryable or attempt >= self.max_retries:
+                    emit({'endpoint': key, 'method': method, 'error': type(e).__name__,
+                          'wall': time.perf_counter() - start_time, 'retries': attempt})
+                    raise
+                # 还有未尝试的节点时立即切换，所有节点都失败过后再退避
+                if len(tried) >= len(self.coordinators):
+                    time.sleep(backoff_delay(attempt))
+                attempt += 1
+                response = None
+                continue
+
+            if response.status_code == 503:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                # 先读完错误响应体再释放连接，熔断后可能作为最终结果返回
+                response.content
+                response.close()
+                # 429 是整个集群的背压，总是等待；503 时有未尝试的节点则立即切换
+                if response.status_code == 429 or len(tried) >= len(self.coordinators):
+                    time.sleep(backoff_delay(attempt, parse_retry_after(response.headers.get("Retry-After"))))
+                attempt += 1
+                continue
+
+            if response.ok:
+                self.active = index
+            break
+
+        response.retries = attempt
+
+        # stream=True 时响应体尚未读取，由 es_metrics.stream_json_array 读取完后记录
+        if stream and response.ok:
+            return response
+        emit({
+            'endpoint': key,
+            'method': method,
+            'status': response.status_code,
+            'error': None if response.ok else str(response.status_code),
+            'wall': time.perf_counter() - start_time,
+            'bytes': len(response.content),
+            'retries': attempt,
+        })
+        return response
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+
+def pack_index_names(names: List[str], max_length: int = MAX_PATH_LENGTH) -> List[List[str]]:
+    """将索引名按逗号拼接后的长度分组，保证每组拼出的URL路径不超过 max_length"""
+    batches = []
+    batch = []
+    length = 0
+    for name in names:
+        extra = len(name) + (1 if batch else 0)
+        if batch and length + extra > max_length:
+            batches.append(batch)
+            batch = []
+            extra = len(name)
+            length = 0
+        batch.append(name)
+        length += extra
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+_transports: Dict[Tuple[str, int], ESTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(es_url: str = DEFAULT_ES_URL, pool_size: int = DEFAULT_POOL_SIZE) -> ESTransport:
+    """获取指定地址共享的传输对象，同一进程内相同地址复用同一个连接池"""
+    key = (es_url.rstrip('/'), pool_size)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = ESTransport(es_url, pool_size=pool_size)
+            _transports[key] = transport
+        return transport
@@ -1,13 +1,14 @@
 #!/bin/bash
 echo "#######################################################################"
-echo "es-close-data run time: $(date)"  
+echo "es-close-data run time: $(date)"
 
-# 42天前的数据关闭（这些数据在7天时已经被收缩到1分片）
-time1=`date -d "42 days ago" "+%Y-%m-%d"`
-
-echo "关闭日期: $time1"
+# 关闭逻辑已迁移到 es_lifecycle.py:
+#   - 一次 _cat/indices 快照规划，只关闭阈值当天仍处于 open 状态的索引
+#   - 前几天漏关的索引由 es-close-missed-indices.sh 手动处理 (或手动加 --catch-up)
+#   - 索引名按URL长度打包成批次，多批并发执行，失败的索引单独重试
+cd "$(dirname "$0")/.." || exit 1
 
-# 关闭索引（现在都是1分片，元数据压力大幅减少）
-curl -XPOST http://192.168.0.95:9200/*${time1}*/_close -H "Content-Type: application/json" -d' {}'
+# 42天前的数据关闭（这些数据在7天时已经被收缩到1分片）
+python3 es_lifecycle.py "http://192.168.0.95:9200" --action close --close-days 42 --yes "$@"
 
 echo "es-close-data 任务完成: $(date)"
@@ -1,6 +1,9 @@
-# two weeks
-delete_time=`date -d "180 days ago" "+%Y-%m-%d"`
+#!/bin/bash
+# 删除逻辑已迁移到 es_lifecycle.py，按快照规划后分批删除，失败的索引单独重试
+# 只删除阈值当天的索引；需要补删更早漏掉的索引时手动加 --catch-up
+cd "$(dirname "$0")/.." || exit 1
 
-curl -XDELETE http://192.168.0.93:9200/*${delete_time}*
+# 180天前的数据删除
+python3 es_lifecycle.py "http://192.168.0.93:9200" --action delete --delete-days 180 --yes "$@"
 
 echo "es-delete-data run ok!"
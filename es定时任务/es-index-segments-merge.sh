@@ -1,9 +1,11 @@
-#/bin/bash
-# 按索引创建策略来调整段合并策略
-#   因为现在都是按天新建索引的，所以对两天前的索引进行段合并
-echo "#######################################################################"
-echo "es-index-segments-merge run start time: $(date)"
-segments_merge_time=`date -d "7 days ago" "+%Y-%m-%d"`
-echo -e "\n segments-merge: logstash-loghub-*-$segments_merge_time"
-curl -XPOST http://192.168.0.94:9200/*${segments_merge_time}*/_forcemerge?max_num_segments=1
-echo "es-index-segments-merge run end time: $(date)"
+#!/bin/bash
+# 按索引创建策略来调整段合并策略
+#   因为现在都是按天新建索引的，所以对7天前的索引进行段合并
+#   段合并调度已迁移到 es_merge_scheduler.py: 按段数收益排序，每次只合并少量索引，
+#   节点 CPU/堆内存/段合并队列过高时自动暂停，避免一次性通配合并拖慢整个上午的查询
+#   超过 --max-runtime (默认4小时) 或连续无法获取节点负载时停止提交并退出，不会一直挂起
+echo "#######################################################################"
+echo "es-index-segments-merge run start time: $(date)"
+cd "$(dirname "$0")/.." || exit 1
+python3 es_merge_scheduler.py "http://192.168.0.94:9200" --days 7 --max-parallel "${MERGE_PARALLEL:-2}" "$@"
+echo "es-index-segments-merge run end time: $(date)"
@@ -1,9 +1,16 @@
-#/bin/bash
-echo "#######################################################################"
-echo "cold-hot-data-migration run time: $(date)"  
-time1=`date -d "3 days ago" "+%Y-%m-%d"`
-
-curl -XPUT http://192.168.0.95:9200/*${time1}*/_settings?pretty -H "Content-Type: application/json" -d'
-{
-  "index.routing.allocation.require.node-type": "warm"
-}'
+#!/bin/bash
+echo "#######################################################################"
+echo "cold-hot-data-migration run time: $(date)"
+
+# 迁移逻辑已迁移到 es_migration.py:
+#   - 按 _cat/shards?bytes=b 估算每个索引的迁移量，按在途字节预算分批设置 node-type: warm
+#   - 每批之前检查正在迁移的分片数和 warm 节点磁盘水位，避免与热节点写入争抢资源
+#   - --catch-up 同时补迁之前超时或被暂缓的索引；未全部完成时退出码为 1
+cd "$(dirname "$0")/.." || exit 1
+
+# 3天前及更早仍未迁移的数据迁移到 warm 节点
+python3 es_migration.py "http://192.168.0.95:9200" --days-ago 3 --catch-up --budget "${MIGRATION_BUDGET:-50gb}" "$@"
+status=$?
+
+echo "cold-hot-data-migration 任务完成: $(date)"
+exit $status
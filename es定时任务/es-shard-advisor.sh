@@ -0,0 +1,12 @@
+#!/bin/bash
+echo "#######################################################################"
+echo "es-shard-advisor run time: $(date)"
+
+# 按 es索引模板/索引模板优化方案.md 的分片策略定期复核模板:
+#   - 汇总最近7天各服务每日索引大小，按增长趋势预估30天后的大小给出建议分片数
+#   - 列出模板分片数不符合策略的服务，建议的模板保存到 shard-advisor/ 供人工确认后执行
+cd "$(dirname "$0")/.." || exit 1
+
+python3 es_shard_advisor.py "http://192.168.0.93:9201" --days 7 --horizon 30 --diff --output shard-advisor "$@"
+
+echo "es-shard-advisor 任务完成: $(date)"
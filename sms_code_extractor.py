@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+验证码提取器
+将全部验证码模式预编译为一个带优先级的正则，单次扫描即可得到结果；
+支持批量处理查询结果页或 es_log_export.py 导出的 NDJSON 文件
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Optional
+
+# 常见验证码模式，越靠前优先级越高
+CODE_PATTERNS = [
+    r'验证码[：:是为]\s*(\d{4,8})',
+    r'验证码是[：:]\s*(\d{4,8})',
+    r'验证码为[：:]\s*(\d{4,8})',
+    r'动态密码[：:]\s*(\d{4,8})',
+    r'短信验证码[：:]\s*(\d{4,8})',
+    r'(\d{4,8})\s*为您的验证码',
+    r'您的验证码是\s*(\d{4,8})',
+    r'验证码\s*(\d{4,8})',
+    r'code[：:]\s*(\d{4,8})',
+    r'验证码.*?(\d{4,8})',  # 更宽泛的匹配
+]
+
+# 每个模式都包含其中一个关键字或 code (不区分大小写)，都不含的短信直接走兜底匹配
+CODE_KEYWORDS = ("验证码", "动态密码")
+
+# 各模式可能的首字符，扫描时先用字符类过滤，减少逐位置尝试全部分支的开销
+CODE_FIRST_CHARS = r"[验动短您\dc]"
+
+# 没有匹配到任何模式时，取第一个4-8位数字
+FALLBACK_PATTERN = r'\b\d{4,8}\b'
+
+NOT_FOUND = "未找到"
+NOT_RECOGNIZED = "未识别"
+
+
+def get_message_content(source: Dict[str, Any]) -> Tuple[str, str]:
+    """从文档中取出短信内容和接收人，优先解析 msgObj.object.requestBody"""
+    message_content = 'N/A'
+    receiver = 'N/A'
+    msg_obj = source.get('msgObj', {})
+
+    if isinstance(msg_obj, dict) and 'object' in msg_obj:
+        obj = msg_obj['object']
+        if isinstance(obj, dict) and 'requestBody' in obj:
+            try:
+                request_body = json.loads(obj['requestBody'])
+                message_content = request_body.get('content', 'N/A')
+                receiver = request_body.get('receiver', 'N/A')
+            except (json.JSONDecodeError, TypeError, AttributeError):
+                pass
+
+    if message_content == 'N/A':
+        message_content = source.get('message', 'N/A')
+    return message_content, receiver
+
+
+class CodeExtractor:
+    def __init__(self, patterns: List[str] = None):
+        """patterns 按优先级排列，每个模式包含一个捕获组；自定义模式时不使用关键字预过滤"""
+        self.patterns = CODE_PATTERNS if patterns is None else patterns
+        self.keywords = CODE_KEYWORDS if patterns is None else None
+        self.gate = f"(?={CODE_FIRST_CHARS})" if patterns is None else ""
+        # combined[n] 只包含前 n 个模式，找到一个命中后只需继续查找优先级更高的模式
+        self.combined = [None] + [self._compile_branches(n) for n in range(1, len(self.patterns) + 1)]
+        self.group_names = [f"c{i}" for i in range(len(self.patterns))]
+        # 绝大多数短信命中最高优先级的模式，单独编译后可利用字面量前缀快速查找
+        self.primary = re.compile(self.patterns[0], re.IGNORECASE)
+        self.fallback = re.compile(FALLBACK_PATTERN)
+
+    def _compile_branches(self, n: int) -> re.Pattern:
+        """每个模式放在零宽前瞻的分支里，search 会返回最左位置上优先级最高的命中分支"""
+        branches = "|".join(f"(?P<p{i}>{self._name_group(i, p)})" for i, p in enumerate(self.patterns[:n]))
+        return re.compile(f"{self.gate}(?=(?:{branches}))", re.IGNORECASE)
+
+    @staticmethod
+    def _name_group(i: int, pattern: str) -> str:
+        """把模式中的捕获组改写为命名组 c<i>，避免多个模式合并后组号冲突"""
+        return re.sub(r'(?<!\\)\((?!\?)', f'(?P<c{i}>', pattern, count=1)
+
+    def _may_match(self, message: str) -> bool:
+        if self.keywords is None:
+            return True
+        for keyword in self.keywords:
+            if keyword in message:
+                return True
+        return "code" in message.lower()
+
+    def extract(self, message: str) -> str:
+        """从短信内容中提取验证码，结果与依次尝试各模式一致"""
+        if not message:
+            return NOT_FOUND
+
+        if self._may_match(message):
+            primary = self.primary.search(message)
+            if primary:
+                return primary.group(1)
+
+            # 最高优先级未命中时从左向右扫描其余模式，每次命中后只在其后查找优先级更高的模式
+            best_code = None
+            regex = self.combined[-1]
+            position = 0
+            while True:
+                match = regex.search(message, position)
+                if match is None:
+                    break
+                priority = int(match.lastgroup[1:])
+                best_code = match.group(self.group_names[priority])
+                if priority <= 1:
+                    break
+                regex = self.combined[priority]
+                position = match.start() + 1
+            if best_code is not None:
+                return best_code
+
+        match = self.fallback.search(message)
+        if match:
+            return match.group(0)
+        return NOT_RECOGNIZED
+
+    def extract_many(self, messages: Iterable[str]) -> Iterator[str]:
+        """批量提取，按输入顺序逐条返回"""
+        extract = self.extract
+        for message in messages:
+            yield extract(message)
+
+    def extract_hits(self, hits: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """处理一页查询结果 (或任意 _source 文档流)，返回时间、接收人、验证码和内容"""
+        for hit in hits:
+            source = hit.get('_source', hit)
+            content, receiver = get_message_content(source)
+            yield {
+                'time': source.get('time', source.get('@timestamp', source.get('timestamp', 'N/A'))),
+                'receiver': receiver,
+                'code': self.extract(content) if content and content != 'N/A' else NOT_FOUND,
+                'content': content,
+            }
+
+    def scan_ndjson(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """逐行处理 NDJSON 导出内容，跳过无法解析的行"""
+        def sources() -> Iterator[Dict[str, Any]]:
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        return self.extract_hits(sources())
+
+
+_default_extractor: Optional[CodeExtractor] = None
+
+
+def get_extractor() -> CodeExtractor:
+    """获取默认模式的共享提取器，正则只编译一次"""
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = CodeExtractor()
+    return _default_extractor
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="从 NDJSON 导出文件中批量提取验证码")
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON 文件 (默认读取标准输入)")
+    parser.add_argument("-o", "--output", help="输出 CSV 文件 (默认输出到标准输出)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    total = 0
+    recognized = 0
+    try:
+        writer = csv.writer(output)
+        writer.writerow(["time", "receiver", "code", "content"])
+        for record in get_extractor().scan_ndjson(source):
+            total += 1
+            if record['code'] not in (NOT_FOUND, NOT_RECOGNIZED):
+                recognized += 1
+            writer.writerow([record['time'], record['receiver'], record['code'], record['content']])
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"✅ 共处理 {total:,} 条，识别出验证码 {recognized:,} 条", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
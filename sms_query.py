@@ -5,16 +5,93 @@
 通过手机号查询过去15分钟内的验证码短信
 """
 
-import requests
-import json
+import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 import datetime as dt
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Callable
+
+from es_metrics import Profile, decode_json
+from es_request_spec import RequestSpec
+from es_transport import get_transport
+from sms_code_extractor import get_extractor, get_message_content
+
+# 短信日志索引按天滚动，如 logstash-loghub-logs-message-center-prd-2025-07-21
+SMS_INDEX_PREFIX = "*message-center*"
+
+# 可能的时间字段，按优先级排列
+TIME_FIELDS = ["@timestamp", "time", "timestamp"]
+
+# 短信内容所在字段
+TEXT_FIELDS = ["message", "msgObj.object.requestBody"]
+
+# 当天索引可能尚未创建，忽略不存在的索引
+INDEX_OPTIONS = {"ignore_unavailable": "true", "allow_no_indices": "true"}
+
+FIELD_CAPS_SPEC = RequestSpec("{target}/_field_caps", fields=["fields"],
+                              params=dict(INDEX_OPTIONS, fields=",".join(TIME_FIELDS + TEXT_FIELDS)))
+SEARCH_SPEC = RequestSpec("{target}/_search", fields=["took", "hits.total", "hits.hits._source"],
+                          params=INDEX_OPTIONS, method="POST")
+
+# 查询结果缓存时间 (秒)
+DEFAULT_CACHE_TTL = float(os.environ.get("SMS_CACHE_TTL", "5"))
+
+class TTLCache:
+    """带过期时间的LRU缓存，同一个键的并发加载只执行一次，其余调用等待同一结果"""
+    
+    def __init__(self, maxsize: int = 256, ttl: float = DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+    
+    def get_or_load(self, key: Any, loader: Callable[[], Any]) -> Tuple[Any, bool]:
+        """返回 (值, 是否未执行 loader)；loader 抛出的异常不缓存，并传给所有等待者"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                return item[1], True
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not owner:
+            return future.result(), True
+        
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self.ttl > 0:
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        future.set_result(value)
+        return value, False
 
 class SMSQuery:
-    def __init__(self, es_url: str = "http://192.168.0.93:9201"):
+    def __init__(self, es_url: str = "http://192.168.0.93:9201", cache_ttl: float = DEFAULT_CACHE_TTL):
         self.es_url = es_url.rstrip('/')
+        self.transport = get_transport(self.es_url)
+        # 多人短时间内查询同一手机号时复用结果
+        self.cache = TTLCache(ttl=cache_ttl)
+        # _field_caps 探测结果，首次查询时填充
+        self.fields = None
     
     def clean_phone_number(self, phone: str) -> str:
         """清理手机号：去除空格、换行、制表符等空白字符"""
@@ -45,6 +122,102 @@ class SMSQuery:
         
         return start_time_str, end_time_str
     
+    def get_index_patterns(self, minutes: int = 15) -> List[str]:
+        """根据索引名中的日期，只查询覆盖过去N分钟的索引
+        
+        logstash 按 UTC 日期滚动索引，同时包含本地日期以防按本地时间命名
+        """
+        now = datetime.now(dt.timezone.utc)
+        dates = set()
+        for moment in (now - timedelta(minutes=minutes), now):
+            dates.add(moment.strftime("%Y-%m-%d"))
+            dates.add((moment + timedelta(hours=8)).strftime("%Y-%m-%d"))
+        return [f"{SMS_INDEX_PREFIX}{date}*" for date in sorted(dates)]
+    
+    def detect_fields(self, indices: str) -> Dict[str, Any]:
+        """通过 _field_caps 确定时间字段和内容字段，结果缓存在实例上"""
+        if self.fields is not None:
+            return self.fields
+        
+        endpoint = FIELD_CAPS_SPEC.endpoint(indices)
+        try:
+            response = self.transport.request(endpoint)
+            caps = decode_json(response).get('fields', {}) if response.status_code == 200 else None
+        except Exception as e:
+            print(f"⚠️ 字段探测失败: {e}")
+            caps = None
+        
+        if caps is None:
+            # 探测失败时不缓存，下次查询重试
+            return {'time': None, 'text': []}
+        
+        time_field = next((f for f in TIME_FIELDS if 'date' in caps.get(f, {})), None)
+        text_fields = [f for f in TEXT_FIELDS if f in caps]
+        # 当天索引尚未创建时字段为空，也不缓存
+        if time_field or text_fields:
+            self.fields = {'time': time_field, 'text': text_fields}
+        return {'time': time_field, 'text': text_fields}
+    
+    def build_query(self, phone: str, start_time: str, end_time: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """构建查询，全部条件放在 filter 上下文中，不计算相关性评分"""
+        time_fields = [fields['time']] if fields.get('time') else TIME_FIELDS
+        time_filter = {
+            "bool": {
+                "should": [{"range": {f: {"gte": start_time, "lte": end_time}}} for f in time_fields],
+                "minimum_should_match": 1
+            }
+        }
+        
+        def phrase(text: str) -> Dict[str, Any]:
+            if fields.get('text'):
+                return {
+                    "bool": {
+                        "should": [{"match_phrase": {f: text}} for f in fields['text']],
+                        "minimum_should_match": 1
+                    }
+                }
+            return {"multi_match": {"query": text, "type": "phrase", "lenient": True}}
+        
+        query = {
+            "query": {
+                "bool": {
+                    "filter": [time_filter, phrase(phone), phrase("验证码")]
+                }
+            },
+            "size": 20
+        }
+        if fields.get('time'):
+            query["sort"] = [{fields['time']: {"order": "desc", "unmapped_type": "date"}}]
+        return query
+    
+    def query_sms_codes(self, cleaned_phone: str, minutes: int = 15) -> Dict[str, Any]:
+        """执行查询并返回结果，不做任何输出；ES返回错误时抛出 RuntimeError"""
+        start_time, end_time = self.get_time_range(minutes)
+        indices = ",".join(self.get_index_patterns(minutes))
+        fields = self.detect_fields(indices)
+        query = self.build_query(cleaned_phone, start_time, end_time, fields)
+        endpoint = SEARCH_SPEC.endpoint(indices)
+        
+        response = self.transport.request(endpoint, SEARCH_SPEC.method, query)
+        if response.status_code != 200:
+            raise RuntimeError(f"查询失败: {response.status_code} {response.text}")
+        
+        result = decode_json(response)
+        hits = result.get('hits', {}).get('hits', [])
+        total = result.get('hits', {}).get('total', {})
+        return {
+            'phone': cleaned_phone,
+            'start_time': start_time,
+            'end_time': end_time,
+            'endpoint': endpoint,
+            'total': total.get('value', 0) if isinstance(total, dict) else total,
+            'hits': hits,
+        }
+    
+    def lookup(self, cleaned_phone: str, minutes: int = 15) -> Tuple[Dict[str, Any], bool]:
+        """带缓存的查询，返回 (结果, 是否来自缓存或合并的并发请求)"""
+        return self.cache.get_or_load((cleaned_phone, minutes), lambda: self.query_sms_codes(cleaned_phone, minutes))
+    
     def search_sms_codes(self, phone: str) -> List[Dict[str, Any]]:
         """搜索验证码短信"""
         # 清理手机号
@@ -66,130 +239,23 @@ class SMSQuery:
             
         print(f"📱 查询范围: 过去15分钟内的验证码短信")
         
-        # 获取时间范围
-        start_time, end_time = self.get_time_range(15)
-        print(f"⏰ 时间范围: {start_time} ~ {end_time}")
-        
-        # 构建查询 - 尝试多个可能的时间字段
-        query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {
-                            "bool": {
-                                "should": [
-                                    {
-                                        "range": {
-                                            "@timestamp": {
-                                                "from": start_time,
-                                                "to": end_time,
-                                                "include_lower": True,
-                                                "include_upper": True
-                                            }
-                                        }
-                                    },
-                                    {
-                                        "range": {
-                                            "time": {
-                                                "from": start_time,
-                                                "to": end_time,
-                                                "include_lower": True,
-                                                "include_upper": True
-                                            }
-                                        }
-                                    },
-                                    {
-                                        "range": {
-                                            "timestamp": {
-                                                "from": start_time,
-                                                "to": end_time,
-                                                "include_lower": True,
-                                                "include_upper": True
-                                            }
-                                        }
-                                    }
-                                ],
-                                "minimum_should_match": 1
-                            }
-                        },
-                        {
-                            "query_string": {
-                                "query": f"{cleaned_phone} AND 验证码",
-                                "default_operator": "and"
-                            }
-                        }
-                    ]
-                }
-            },
-            # 先不排序，避免字段不存在的问题
-            "size": 20
-        }
-        
         try:
-            # 发送搜索请求
-            url = f"{self.es_url}/*message-center*/_search"
-            headers = {'Content-Type': 'application/json'}
-            
-            print(f"🌐 请求地址: {url}")
-            
-            response = requests.post(url, 
-                                   headers=headers, 
-                                   data=json.dumps(query), 
-                                   timeout=30)
-            
-            print(f"📊 响应状态: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                hits = result.get('hits', {}).get('hits', [])
-                total = result.get('hits', {}).get('total', {})
-                
-                if isinstance(total, dict):
-                    total_count = total.get('value', 0)
-                else:
-                    total_count = total
-                
-                print(f"✅ 查询成功! 找到 {total_count} 条相关记录")
-                return hits
-            else:
-                print(f"❌ 查询失败: {response.status_code}")
-                print(f"错误信息: {response.text}")
-                return []
-                
+            result, cached = self.lookup(cleaned_phone, 15)
         except Exception as e:
             print(f"❌ 请求异常: {e}")
             return []
+        
+        print(f"⏰ 时间范围: {result['start_time']} ~ {result['end_time']}")
+        if cached:
+            print(f"⚡ 使用 {self.cache.ttl:g} 秒内的查询结果")
+        else:
+            print(f"🌐 请求地址: {self.es_url}/{result['endpoint']}")
+        print(f"✅ 查询成功! 找到 {result['total']} 条相关记录")
+        return result['hits']
     
     def extract_verification_code(self, message: str) -> str:
         """从短信内容中提取验证码"""
-        if not message:
-            return "未找到"
-        
-        # 常见验证码模式
-        patterns = [
-            r'验证码[：:是为]\s*(\d{4,8})',
-            r'验证码是[：:]\s*(\d{4,8})',
-            r'验证码为[：:]\s*(\d{4,8})',
-            r'动态密码[：:]\s*(\d{4,8})',
-            r'短信验证码[：:]\s*(\d{4,8})',
-            r'(\d{4,8})\s*为您的验证码',
-            r'您的验证码是\s*(\d{4,8})',
-            r'验证码\s*(\d{4,8})',
-            r'code[：:]\s*(\d{4,8})',
-            r'验证码.*?(\d{4,8})',  # 更宽泛的匹配
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        
-        # 如果没有匹配到，查找所有4-8位数字
-        numbers = re.findall(r'\b\d{4,8}\b', message)
-        if numbers:
-            return numbers[0]
-        
-        return "未识别"
+        return get_extractor().extract(message)
     
     def display_results(self, hits: List[Dict[str, Any]]):
         """显示查询结果"""
@@ -208,24 +274,7 @@ class SMSQuery:
             # 提取关键信息 - 适配实际ES数据结构
             timestamp = source.get('time', source.get('@timestamp', source.get('timestamp', 'N/A')))
             # 优先从msgObj中获取内容，然后尝试message字段
-            message_content = 'N/A'
-            receiver = 'N/A'
-            msg_obj = source.get('msgObj', {})
-            
-            if isinstance(msg_obj, dict) and 'object' in msg_obj:
-                obj = msg_obj['object']
-                if isinstance(obj, dict) and 'requestBody' in obj:
-                    try:
-                        # 解析requestBody中的JSON
-                        request_body = json.loads(obj['requestBody'])
-                        message_content = request_body.get('content', 'N/A')
-                        receiver = request_body.get('receiver', 'N/A')
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-            
-            # 如果没有找到，尝试其他字段
-            if message_content == 'N/A':
-                message_content = source.get('message', 'N/A')
+            message_content, receiver = get_message_content(source)
             
             # 调试信息：显示实际的字段（可选）
             # if i == 1:  # 只在第一条记录时显示
@@ -271,8 +320,8 @@ class SMSQuery:
         
         print("=" * 120)
     
-    def interactive_query(self):
-        """交互式查询"""
+    def interactive_query(self, profile: bool = False):
+        """交互式查询，profile=True 时每次查询后显示耗时分析"""
         print("📱 手机号验证码查询工具")
         print("=" * 50)
         print("💡 提示: 支持自动清理空格、分隔符等格式")
@@ -300,8 +349,9 @@ class SMSQuery:
                     continue
                 
                 # 执行查询
-                hits = self.search_sms_codes(phone)
-                self.display_results(hits)
+                with Profile(profile):
+                    hits = self.search_sms_codes(phone)
+                    self.display_results(hits)
                 
             except KeyboardInterrupt:
                 print("\n👋 再见!")
@@ -313,16 +363,34 @@ def main():
     """主函数"""
     import sys
     
-    if len(sys.argv) > 1:
-        # 命令行模式
-        phone = sys.argv[1]
+    # --profile: 每次查询后显示耗时分析
+    profile = "--profile" in sys.argv
+    argv = [arg for arg in sys.argv[1:] if arg != "--profile"]
+    
+    service_url = os.environ.get("SMS_SERVICE_URL")
+    if argv and service_url:
+        # 通过常驻查询服务查询，共用服务端的缓存和连接池
+        from sms_service import fetch_from_service
         sms_query = SMSQuery()
-        hits = sms_query.search_sms_codes(phone)
+        phone = sms_query.clean_phone_number(argv[0])
+        print(f"🔍 查询手机号: {phone} (服务: {service_url})")
+        try:
+            hits = fetch_from_service(service_url, phone)
+        except Exception as e:
+            print(f"❌ 请求异常: {e}")
+            hits = []
         sms_query.display_results(hits)
+    elif argv:
+        # 命令行模式
+        phone = argv[0]
+        sms_query = SMSQuery()
+        with Profile(profile):
+            hits = sms_query.search_sms_codes(phone)
+            sms_query.display_results(hits)
     else:
         # 交互模式
         sms_query = SMSQuery()
-        sms_query.interactive_query()
+        sms_query.interactive_query(profile)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+验证码查询服务
+常驻进程包装 SMSQuery，多名客服共用同一份结果缓存和 ES 连接池：
+    GET /sms?phone=13812345678[&minutes=15]
+    GET /metrics  (ES请求耗时统计，Prometheus 文本格式)
+设置环境变量 SMS_SERVICE_URL 后，sms_query.py 会改为通过该服务查询
+"""
+
+import argparse
+import json
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any
+from urllib.parse import urlparse, parse_qs
+
+from es_metrics import METRICS
+from es_transport import DEFAULT_ES_URL, get_transport
+from sms_code_extractor import get_message_content
+from sms_query import SMSQuery, DEFAULT_CACHE_TTL
+
+DEFAULT_PORT = 8765
+
+# 允许查询的最大时间窗口 (分钟)
+MAX_MINUTES = 60
+
+
+def make_handler(sms_query: SMSQuery):
+    """生成绑定到指定 SMSQuery 的请求处理类"""
+
+    class SMSRequestHandler(BaseHTTPRequestHandler):
+        def send_json(self, code: int, body: Dict[str, Any]):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self.send_json(200, {"status": "ok"})
+            if url.path == "/metrics":
+                data = METRICS.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            if url.path != "/sms":
+                return self.send_json(404, {"error": "not found"})
+
+            params = parse_qs(url.query)
+            phone = sms_query.clean_phone_number(params.get("phone", [""])[0])
+            if not sms_query.validate_phone_number(phone):
+                return self.send_json(400, {"error": f"手机号格式不正确: {phone}"})
+            try:
+                minutes = min(max(int(params.get("minutes", ["15"])[0]), 1), MAX_MINUTES)
+            except ValueError:
+                return self.send_json(400, {"error": "minutes 必须是整数"})
+
+            try:
+                result, cached = sms_query.lookup(phone, minutes)
+            except Exception as e:
+                return self.send_json(502, {"error": str(e)})
+
+            codes = []
+            for hit in result['hits']:
+                content, _ = get_message_content(hit.get('_source', {}))
+                codes.append(sms_query.extract_verification_code(content) if content != 'N/A' else None)
+            self.send_json(200, dict(result, cached=cached, codes=codes))
+
+        def log_message(self, format, *args):
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {self.address_string()} {format % args}", flush=True)
+
+    return SMSRequestHandler
+
+
+def fetch_from_service(service_url: str, phone: str, minutes: int = 15) -> List[Dict[str, Any]]:
+    """通过查询服务获取命中文档，失败时抛出 RuntimeError"""
+    transport = get_transport(service_url)
+    response = transport.request("sms", params={"phone": phone, "minutes": minutes}, timeout=(3, 30))
+    body = response.json()
+    if response.status_code != 200:
+        raise RuntimeError(body.get("error", response.status_code))
+    print(f"✅ 查询成功! 找到 {body['total']} 条相关记录{' (缓存)' if body.get('cached') else ''}")
+    return body['hits']
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="验证码查询服务")
+    parser.add_argument("--es-url", default=DEFAULT_ES_URL, help="ES地址")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口 (默认{DEFAULT_PORT})")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL, help="结果缓存秒数")
+    args = parser.parse_args()
+
+    sms_query = SMSQuery(args.es_url, cache_ttl=args.cache_ttl)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(sms_query))
+    print(f"📱 验证码查询服务已启动: http://{args.host}:{args.port}/sms?phone=<手机号>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 服务已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()